@@ -1,10 +1,38 @@
-from flask import Flask
+import os
+import time
+from flask import Flask, Response, abort, g, make_response, request
 from flask_restx import Api
+from models.base_model import data_manager
+from persistence import instrumentation
+from persistence.codecs import codec
+from persistence.indexes import UniqueConstraintError
+from persistence.instrumentation import serializing
+from api.metrics import profile_summary, request_metrics, server_timing, start_profiler
+
+# Status and message of the routes checking each unique index, for conflicts only found at commit
+UNIQUE_CONFLICTS = {
+    ('User', 'email'): (400, "Email address is already in use"),
+    ('Amenity', 'name'): (409, "Amenity name already exists"),
+}
 
 app = Flask(__name__)
+# ?profile=1 returns a cProfile summary of the request only when HBNB_PROFILING is 1
+app.config['PROFILING'] = os.environ.get('HBNB_PROFILING', '0') == '1'
 api = Api(app, version='1.0', title='User Management API',
           description='A simple User Management API')
 
+@api.representation('application/json')
+def output_json(data, code, headers=None):
+    """
+    Serialize a response with the JSON codec shared with the storage.
+    """
+    with serializing():
+        body = codec.dumps(data) + b'\n'
+    response = make_response(body, code)
+    response.headers.update(headers or {})
+    response.mimetype = 'application/json'
+    return response
+
 from api import review_routes, user_routes, country_city_routes, amenity_routes, place_routes
 
 # Add namespaces to the API
@@ -14,3 +42,96 @@ api.add_namespace(country_city_routes.ns_countries)
 api.add_namespace(country_city_routes.ns_cities)
 api.add_namespace(amenity_routes.ns_amenity)
 api.add_namespace(review_routes.ns_review)
+
+@app.route('/metrics')
+def metrics():
+    """
+    Expose the aggregated request histograms and the cache and flush statistics to Prometheus.
+    """
+    return Response(request_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Registered before the unit of work hooks, so a request is measured including its commit
+@app.before_request
+def start_request_profile():
+    """
+    Time the request and count the work it makes the storage do. With ?profile=1 the request is
+    also run under cProfile.
+    """
+    if request.endpoint == 'metrics':
+        return
+    g.request_started = time.perf_counter()
+    instrumentation.start()
+    if app.config['PROFILING'] and request.args.get('profile') == '1':
+        g.profiler = start_profiler()
+        if g.profiler is None:
+            abort(409, "Another request is being profiled")
+
+@app.after_request
+def finish_request_profile(response):
+    """
+    Report the profile of the request in the Server-Timing header and add it to the metrics.
+    A profiled request is answered with the cProfile summary instead of its body.
+    """
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    profiler = g.pop('profiler', None)
+    if profiler:
+        profiler.disable()
+    stats = instrumentation.stop()
+    seconds = time.perf_counter() - started
+    response.headers['Server-Timing'] = server_timing(seconds, stats)
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    request_metrics.observe(request.method, endpoint, seconds, stats)
+    if profiler:
+        response.set_data(profile_summary(profiler))
+        response.mimetype = 'text/plain'
+        # The summary is not a representation of the resource
+        response.headers.pop('ETag', None)
+        response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.teardown_request
+def stop_request_profile(exc):
+    """
+    Stop measuring a request that failed before producing a response.
+    """
+    profiler = g.pop('profiler', None)
+    if profiler:
+        profiler.disable()
+    if g.pop('request_started', None) is not None:
+        instrumentation.stop()
+
+@app.before_request
+def begin_unit_of_work():
+    """
+    Collect every save and delete of the request in a single unit of work.
+    """
+    g.unit_of_work = data_manager.unit_of_work().begin()
+
+@app.after_request
+def commit_unit_of_work(response):
+    """
+    Flush the changes of the request to the storage and report how many flushes it took.
+    The changes of a request answered with an error are discarded. When a concurrent request took
+    a unique value first, the storage rejects the commit and the request is answered as the route
+    answers a conflict it detects itself.
+    """
+    uow = g.pop('unit_of_work', None)
+    if uow:
+        try:
+            uow.end(commit=response.status_code < 400)
+        except UniqueConstraintError as e:
+            status, message = UNIQUE_CONFLICTS.get((e.obj_class, e.field), (409, str(e)))
+            response = output_json({'message': message}, status)
+        response.headers['X-Storage-Flushes'] = str(uow.flushes)
+    return response
+
+@app.teardown_request
+def rollback_unit_of_work(exc):
+    """
+    Discard the changes of a request that failed before producing a response.
+    """
+    uow = g.pop('unit_of_work', None)
+    if uow:
+        uow.end(commit=False)
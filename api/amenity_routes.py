@@ -1,6 +1,8 @@
 from flask import request, abort
 from flask_restx import Namespace, Resource, fields
 from models.amenity import Amenity
+from api.caching import cached_collection, cached_object
+from api.pagination import EXPAND_PARAMS, LIST_PARAMS, paginate, represent
 
 ns_amenity = Namespace('amenities', description='Amenity operations')
 
@@ -9,36 +11,39 @@ amenity_model = ns_amenity.model('Amenity', {
     'id': fields.String(readOnly=True, description='The unique identifier of an amenity'),
     'name': fields.String(required=True, description='The amenity name'),
     'created_at': fields.DateTime(readOnly=True, description='The date and time the amenity was created'),
-    'updated_at': fields.DateTime(readOnly=True, description='The date and time the amenity was last updated')
+    'updated_at': fields.DateTime(readOnly=True, description='The date and time the amenity was last updated'),
+    'place_ids': fields.List(fields.String, readOnly=True, description='The IDs of the places with the amenity')
 })
 
-def validate_amenity_data(data):
+def validate_amenity_data(data, amenity_id=None):
     """
     Validate the data for an Amenity.
     If the data is invalid, this function will abort the request with an error message.
+
+    :param data: The data to validate
+    :param amenity_id: The ID of the Amenity being updated, if any
     """
     if 'name' not in data or not isinstance(data['name'], str) or not data['name'].strip():
         abort(400, description="Amenity name must be a non-empty string")
-    all_amenities = Amenity.load_all()
-    for amenity in all_amenities:
-        if amenity.name == data['name']:
-            abort(409, description="Amenity name already exists")
+    existing = Amenity.find_one_by('name', data['name'])
+    if existing and str(existing.id) != str(amenity_id):
+        abort(409, description="Amenity name already exists")
 
 @ns_amenity.route('/')
 class AmenityList(Resource):
     """
     Resource for getting a list of all Amenities and creating new Amenities.
     """
-    @ns_amenity.doc('list_amenities')
-    @ns_amenity.marshal_list_with(amenity_model)
+    @cached_collection(Amenity)
+    @ns_amenity.doc('list_amenities', params=LIST_PARAMS)
+    @ns_amenity.response(200, 'Success', [amenity_model])
     def get(self):
-        """Return a list of all Amenities."""
-        amenities = Amenity.load_all()
-        return amenities
+        """Return a page of Amenities."""
+        return paginate(Amenity, amenity_model)
 
     @ns_amenity.doc('create_amenity')
     @ns_amenity.expect(amenity_model)
-    @ns_amenity.marshal_with(amenity_model, code=201)
+    @ns_amenity.response(201, 'Created', amenity_model)
     def post(self):
         """Create a new Amenity."""
         if not request.json:
@@ -46,7 +51,7 @@ class AmenityList(Resource):
         data = request.json
         validate_amenity_data(data)
         amenity = Amenity(name=data['name'])
-        return amenity, 201
+        return represent(amenity), 201
 
 @ns_amenity.route('/<string:amenity_id>')
 @ns_amenity.response(404, 'Amenity not found')
@@ -55,18 +60,19 @@ class AmenityResource(Resource):
     """
     Resource for getting, updating, and deleting individual Amenities.
     """
-    @ns_amenity.doc('get_amenity')
-    @ns_amenity.marshal_with(amenity_model)
+    @cached_object(Amenity.load)
+    @ns_amenity.doc('get_amenity', params=EXPAND_PARAMS)
+    @ns_amenity.response(200, 'Success', amenity_model)
     def get(self, amenity_id):
         """Return the Amenity with the given ID."""
         amenity = Amenity.load(amenity_id)
         if not amenity:
             abort(404, description="Amenity not found")
-        return amenity
+        return represent(amenity)
 
     @ns_amenity.doc('update_amenity')
     @ns_amenity.expect(amenity_model)
-    @ns_amenity.marshal_with(amenity_model)
+    @ns_amenity.response(200, 'Success', amenity_model)
     def put(self, amenity_id):
         """Update the Amenity with the given ID."""
         amenity = Amenity.load(amenity_id)
@@ -77,9 +83,9 @@ class AmenityResource(Resource):
             abort(400, description="Request payload must be JSON")
 
         data = request.json
-        validate_amenity_data(data)
-        amenity.update_details(name=data['name'])
-        return amenity
+        validate_amenity_data(data, amenity_id)
+        amenity = amenity.update(name=data['name'])
+        return represent(amenity)
 
     @ns_amenity.doc('delete_amenity')
     @ns_amenity.response(204, 'Amenity deleted')
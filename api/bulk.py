@@ -0,0 +1,128 @@
+from flask import request, abort
+from werkzeug.exceptions import HTTPException
+from models.base_model import data_manager
+from persistence.codecs import codec
+
+MAX_BULK_ITEMS = 10000 # Largest batch accepted by a bulk endpoint
+BULK_MODES = ('atomic', 'best_effort')
+
+# Query string parameters shared by every bulk endpoint
+BULK_PARAMS = {
+    'mode': "'atomic' (default) writes nothing if any item fails, 'best_effort' writes the valid items",
+}
+
+def read_items():
+    """
+    Read the items of a bulk request, sent either as a JSON array or as NDJSON.
+    Aborts with a 400 status code if the body cannot be read.
+
+    :return: A list of item dictionaries
+    """
+    if request.mimetype == 'application/x-ndjson':
+        items = []
+        for number, line in enumerate(request.get_data().splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                items.append(codec.loads(line))
+            except ValueError:
+                abort(400, description=f"Line {number} is not valid JSON")
+    else:
+        items = request.get_json(silent=True)
+        if not isinstance(items, list):
+            abort(400, description="Request payload must be a JSON array or NDJSON")
+    if not items:
+        abort(400, description="Request payload must contain at least one item")
+    if len(items) > MAX_BULK_ITEMS:
+        abort(400, description=f"A bulk request accepts at most {MAX_BULK_ITEMS} items")
+    return items
+
+def parse_mode():
+    """
+    Read the mode query parameter. Aborts with a 400 status code if it is unknown.
+
+    :return: 'atomic' or 'best_effort'
+    """
+    mode = request.args.get('mode', 'atomic')
+    if mode not in BULK_MODES:
+        abort(400, description=f"Mode must be one of {', '.join(BULK_MODES)}")
+    return mode
+
+def validation_error(validate, item):
+    """
+    Run a single-item validation function that aborts on invalid data and capture its message.
+
+    :param validate: The validation function of the single-item endpoint
+    :param item: The item to validate
+    :return: The error message, or None if the item is valid
+    """
+    if not isinstance(item, dict):
+        return "Item must be a JSON object"
+    try:
+        validate(item)
+    except HTTPException as e:
+        return e.description
+    return None
+
+def load_related(cls, ids):
+    """
+    Load the objects referenced by a batch, each distinct ID once.
+
+    :param cls: The class of the referenced objects
+    :param ids: The referenced IDs, possibly repeated
+    :return: A dictionary mapping each ID to its object, or to None if it does not exist
+    """
+    ids = {obj_id for obj_id in ids if obj_id is not None}
+    objs, _ = cls.load_many(ids)
+    loaded = {str(obj.id): obj for obj in objs}
+    return {obj_id: loaded.get(str(obj_id)) for obj_id in ids}
+
+def bulk_create(items, errors, create):
+    """
+    Create the items of a bulk request and write them to the storage in a single flush.
+    In atomic mode nothing is written if any item fails. In best effort mode the valid items are
+    written and the invalid ones are reported.
+
+    :param items: The items of the request
+    :param errors: The validation error of each item, or None for valid items
+    :param create: A function creating the object of a valid item, which may raise ValueError
+    :return: A (body, status) tuple with the result of every item
+    """
+    mode = parse_mode()
+    results = []
+    # In atomic mode an invalid item means no item is created
+    failed = mode == 'atomic' and any(error is not None for error in errors)
+    with data_manager.unit_of_work() as uow:
+        for index, (item, error) in enumerate(zip(items, errors)):
+            if error is None and not (failed and mode == 'atomic'):
+                savepoint = uow.savepoint()
+                try:
+                    obj = create(item)
+                    results.append({'index': index, 'status': 'created', 'id': str(obj.id)})
+                    continue
+                except ValueError as e:
+                    # Models save themselves before their fields are set, so a failed item may be registered already
+                    uow.restore(savepoint)
+                    error = str(e)
+            if error is not None:
+                failed = True
+                results.append({'index': index, 'status': 'error', 'error': error})
+            else:
+                results.append({'index': index, 'status': 'skipped'})
+        if failed and mode == 'atomic':
+            uow.rollback()
+            results = [{'index': result['index'], 'status': 'skipped'} if result['status'] == 'created' else result
+                       for result in results]
+            status = 400
+        else:
+            try:
+                uow.commit()
+                status = 207 if failed else 201
+            except ValueError as e:
+                # The storage rejected the batch as a whole, so none of its items were written
+                uow.rollback()
+                results = [{'index': result['index'], 'status': 'error', 'error': str(e)} if result['status'] == 'created' else result
+                           for result in results]
+                status = 409
+    created = sum(1 for result in results if result['status'] == 'created')
+    return {'mode': mode, 'created': created, 'failed': len(results) - created, 'results': results}, status
@@ -0,0 +1,194 @@
+import os
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from flask import Response, request
+from flask_restx.utils import unpack
+from models.base_model import data_manager
+from models.serializer import serializer
+from persistence.codecs import codec
+from persistence.instrumentation import serializing
+from api.streaming import wants_stream
+from api.pagination import MAX_DEPTH
+
+class ResponseCache:
+    """
+    ResponseCache keeps the serialized body of successful GET responses next to their ETag.
+    Entries are tagged with the objects and classes they were built from, and dropped when the
+    data manager reports that one of them was written. It holds at most max_size entries and
+    evicts the least recently used one when full.
+    """
+
+    def __init__(self, max_size=1024):
+        """
+        Initialize an empty ResponseCache.
+
+        :param max_size: The maximum number of responses kept. 0 disables the cache.
+        """
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, etag):
+        """
+        Get a cached response if it was built for the given ETag.
+
+        :param key: The cache key of the request.
+        :param etag: The current ETag of the resource.
+        :return: A (body, status, headers) tuple, or None.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != etag:
+                return None
+            self.entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, key, etag, tags, response):
+        """
+        Cache a response.
+
+        :param key: The cache key of the request.
+        :param etag: The ETag of the response.
+        :param tags: The class names and (class name, id) pairs the response was built from.
+        :param response: A (body, status, headers) tuple.
+        """
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self.entries[key] = (etag, frozenset(tags), response)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, objs):
+        """
+        Drop the responses built from written objects or from their classes.
+
+        :param objs: The objects saved or deleted.
+        """
+        tags = set()
+        for obj in objs:
+            tags.add(obj.__class__.__name__)
+            tags.add((obj.__class__.__name__, str(obj.id)))
+        with self._lock:
+            for key in [key for key, entry in self.entries.items() if entry[1] & tags]:
+                del self.entries[key]
+
+    def clear(self):
+        """
+        Drop every cached response.
+        """
+        with self._lock:
+            self.entries.clear()
+
+response_cache = ResponseCache(int(os.environ.get('HBNB_RESPONSE_CACHE_SIZE', '1024')))
+data_manager.add_observer(response_cache.invalidate)
+
+def make_etag(*parts):
+    """
+    Build a strong ETag from the values a representation depends on.
+
+    :param parts: The values, such as an ID, an updated_at timestamp and version stamps
+    :return: The ETag, without quotes
+    """
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+def _conditional_response(etag, tags, handler):
+    """
+    Answer a GET request from the If-None-Match header or the response cache, or call the handler
+    and cache its response.
+
+    :param etag: The current ETag of the resource
+    :param tags: The tags of the response in the cache
+    :param handler: A function producing the response as returned by a Resource method
+    :return: A Response
+    """
+    headers = {'ETag': f'"{etag}"'}
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=headers)
+    key = (request.path, request.query_string)
+    cached = response_cache.get(key, etag)
+    if cached is None:
+        data, status, extra_headers = unpack(handler())
+        with serializing():
+            body = codec.dumps(data) + b'\n'
+        cached = (body, status, dict(extra_headers or {}))
+        if status == 200:
+            response_cache.put(key, etag, tags, cached)
+    body, status, extra_headers = cached
+    if status != 200:
+        return Response(body, status=status, headers=extra_headers, mimetype='application/json')
+    return Response(body, status=status, headers=dict(extra_headers, **headers), mimetype='application/json')
+
+def versions(classes):
+    """
+    Get the version stamps of model classes.
+
+    :param classes: The model classes
+    :return: A list of version stamps
+    """
+    return [data_manager.collection_version(cls) for cls in classes]
+
+def embedded_classes(cls, related=()):
+    """
+    Get the model classes a representation of a class depends on: the classes expand and depth
+    can reach from it, and the classes the resource also reads.
+
+    :param cls: The model class of the representation
+    :param related: Other model classes the resource reads, such as the parent of a nested collection
+    :return: A tuple of model classes, sorted by name
+    """
+    classes = serializer(cls).related_classes(MAX_DEPTH) | set(related)
+    classes.discard(cls)
+    return tuple(sorted(classes, key=lambda model: model.__name__))
+
+def cached_object(load, related=()):
+    """
+    Decorate the GET method of a single-object resource with ETags, conditional GET and the response cache.
+    The ETag is derived from the ID and updated_at of the object, the version stamps of the classes
+    its representation can embed, and the query string.
+
+    :param load: A function loading the object from the arguments of the method
+    :param related: Other model classes the resource reads
+    :return: The decorator
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(resource, *args, **kwargs):
+            # Routes pass their arguments by keyword, the loaders take them in order
+            obj = load(*args, *kwargs.values())
+            if obj is None:
+                return method(resource, *args, **kwargs)
+            obj_class = obj.__class__.__name__
+            classes = embedded_classes(obj.__class__, related)
+            etag = make_etag(obj_class, obj.id, obj.updated_at.isoformat(), *versions(classes), request.query_string)
+            tags = [(obj_class, str(obj.id))] + [cls.__name__ for cls in classes]
+            return _conditional_response(etag, tags, lambda: method(resource, *args, **kwargs))
+        return wrapper
+    return decorator
+
+def cached_collection(cls, related=()):
+    """
+    Decorate the GET method of a collection resource with ETags, conditional GET and the response cache.
+    The ETag is derived from the version stamps of the class of the collection and of the classes
+    its representation can embed, the arguments of the method and the query string.
+    Streamed responses are never cached.
+
+    :param cls: The model class of the collection
+    :param related: Other model classes the resource reads, such as the parent of a nested collection
+    :return: The decorator
+    """
+    classes = (cls,) + embedded_classes(cls, related)
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(resource, *args, **kwargs):
+            if wants_stream():
+                return method(resource, *args, **kwargs)
+            etag = make_etag(cls.__name__, *versions(classes), args, sorted(kwargs.items()), request.query_string)
+            tags = [model.__name__ for model in classes]
+            return _conditional_response(etag, tags, lambda: method(resource, *args, **kwargs))
+        return wrapper
+    return decorator
@@ -0,0 +1,199 @@
+import bisect
+import cProfile
+import io
+import pstats
+import threading
+from models.base_model import data_manager
+
+# Data manager methods counted per request, in the order they are reported
+DATA_MANAGER_CALLS = ('save', 'save_many', 'delete', 'delete_many', 'load', 'load_many', 'load_all', 'find_by', 'query',
+                      'iterate')
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000, 10000)
+BYTES_BUCKETS = (0, 1024, 10240, 102400, 1048576, 10485760, 104857600)
+
+PROFILE_LINES = 40 # Functions listed in a ?profile=1 summary
+
+def _labels(names, values):
+    """
+    Format the labels of a sample in the Prometheus text format.
+
+    :param names: The label names
+    :param values: The label values
+    :return: The labels, as {name="value",...}
+    """
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+def _number(value):
+    """
+    Format a number in the Prometheus text format.
+
+    :param value: The number
+    :return: The number as a string
+    """
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """
+    Histogram counts observed values in cumulative buckets, per combination of label values, and
+    renders them in the Prometheus text format.
+    """
+
+    def __init__(self, name, description, buckets, label_names):
+        """
+        Initialize an empty Histogram.
+
+        :param name: The metric name
+        :param description: The help text of the metric
+        :param buckets: The upper bounds of the buckets, in increasing order
+        :param label_names: The names of the labels of the observations
+        """
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """
+        Record an observation.
+
+        :param value: The observed value
+        :param label_values: The values of the labels, in the order of the label names
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                # One count per bucket, then the +Inf bucket, then the sum
+                series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self):
+        """
+        Render the Histogram in the Prometheus text format.
+
+        :return: A list of lines
+        """
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = sorted((values, list(counts)) for values, counts in self.series.items())
+        for values, counts in series:
+            total = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                total += count
+                labels = _labels(self.label_names + ('le',), values + (_number(bound) if bound != '+Inf' else bound,))
+                lines.append(f'{self.name}_bucket{labels} {total}')
+            labels = _labels(self.label_names, values)
+            lines.append(f'{self.name}_sum{labels} {_number(counts[-1])}')
+            lines.append(f'{self.name}_count{labels} {total}')
+        return lines
+
+class RequestMetrics:
+    """
+    RequestMetrics aggregates the profile of every request into histograms per endpoint and method.
+    """
+
+    def __init__(self):
+        """
+        Initialize the histograms.
+        """
+        labels = ('method', 'endpoint')
+        self.duration = Histogram('hbnb_request_duration_seconds', "Wall time of the requests.", DURATION_BUCKETS, labels)
+        self.serialization = Histogram('hbnb_request_serialization_seconds',
+                                       "Time spent serializing the responses.", DURATION_BUCKETS, labels)
+        self.calls = Histogram('hbnb_request_data_manager_calls', "Data manager calls per request, by method.",
+                               COUNT_BUCKETS, labels + ('call',))
+        self.hydrated = Histogram('hbnb_request_objects_hydrated', "Objects built from the storage per request.",
+                                  COUNT_BUCKETS, labels)
+        self.bytes_written = Histogram('hbnb_request_storage_bytes_written', "Bytes written by the storage per request.",
+                                       BYTES_BUCKETS, labels)
+
+    def observe(self, method, endpoint, seconds, stats):
+        """
+        Record the profile of a request.
+
+        :param method: The HTTP method of the request
+        :param endpoint: The URL rule the request matched
+        :param seconds: The wall time of the request
+        :param stats: The RequestStats recorded during the request
+        """
+        self.duration.observe(seconds, method, endpoint)
+        self.serialization.observe(stats.serialize_seconds, method, endpoint)
+        for call in DATA_MANAGER_CALLS:
+            self.calls.observe(stats.calls.get(call, 0), method, endpoint, call)
+        self.hydrated.observe(stats.hydrated, method, endpoint)
+        self.bytes_written.observe(stats.bytes_written, method, endpoint)
+
+    def render(self):
+        """
+        Render the histograms, and the statistics of the identity map and of the storage flushes,
+        in the Prometheus text format.
+
+        :return: The metrics as a string
+        """
+        lines = []
+        for histogram in (self.duration, self.serialization, self.calls, self.hydrated, self.bytes_written):
+            lines.extend(histogram.render())
+        cache = data_manager.cache_stats()
+        for key, kind in (('hits', 'counter'), ('misses', 'counter'), ('evictions', 'counter'),
+                          ('size', 'gauge'), ('max_size', 'gauge')):
+            name = f'hbnb_identity_map_{key}' + ('_total' if kind == 'counter' else '')
+            lines += [f'# TYPE {name} {kind}', f'{name} {cache[key]}']
+        flush_stats = getattr(data_manager.storage, 'flush_stats', None)
+        if flush_stats is not None:
+            flushes = flush_stats()
+            for key, name, kind in (('pending_records', 'hbnb_storage_pending_records', 'gauge'),
+                                    ('lag_seconds', 'hbnb_storage_flush_lag_seconds', 'gauge'),
+                                    ('flushes', 'hbnb_storage_flushes_total', 'counter'),
+                                    ('last_flush_seconds', 'hbnb_storage_last_flush_seconds', 'gauge')):
+                if flushes.get(key) is not None:
+                    lines += [f'# TYPE {name} {kind}', f'{name} {_number(flushes[key])}']
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
+
+def server_timing(seconds, stats):
+    """
+    Build the Server-Timing header of a request. The durations are in milliseconds, and the counts
+    are reported as the description of their metric. The save, load and load_all calls are always
+    reported, the other calls of the data manager only when the request made them.
+
+    :param seconds: The wall time of the request
+    :param stats: The RequestStats recorded during the request
+    :return: The value of the header
+    """
+    metrics = [f'total;dur={seconds * 1000:.3f}', f'serialize;dur={stats.serialize_seconds * 1000:.3f}']
+    metrics += [f'{call.replace("_", "-")};desc={stats.calls.get(call, 0)}' for call in DATA_MANAGER_CALLS
+                if call in ('save', 'load', 'load_all') or stats.calls.get(call)]
+    metrics += [f'hydrated;desc={stats.hydrated}', f'bytes-written;desc={stats.bytes_written}']
+    return ', '.join(metrics)
+
+def profile_summary(profiler):
+    """
+    Summarize a cProfile run: the functions that took the most cumulative time.
+
+    :param profiler: The cProfile.Profile that ran, disabled
+    :return: The summary as a string
+    """
+    output = io.StringIO()
+    pstats.Stats(profiler, stream=output).strip_dirs().sort_stats('cumulative').print_stats(PROFILE_LINES)
+    return output.getvalue()
+
+def start_profiler():
+    """
+    Start profiling the current request with cProfile.
+
+    :return: The running cProfile.Profile, or None if another profiler is already active
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Python 3.12 allows a single active profiler for the whole process
+        return None
+    return profiler
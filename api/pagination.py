@@ -0,0 +1,177 @@
+import base64
+import binascii
+from urllib.parse import urlencode
+from datetime import datetime
+from flask import request, abort
+from models.serializer import serialize_many, serializer
+from persistence.query import Condition
+from api.streaming import stream, wants_stream
+
+DEFAULT_LIMIT = 50 # Number of objects returned when no limit is given
+MAX_LIMIT = 500 # Largest page a client can ask for
+MAX_DEPTH = 3 # Most levels of related objects a client can expand
+
+# Query string parameters shared by every endpoint returning objects
+EXPAND_PARAMS = {
+    'expand': 'A comma-separated list of the relations to embed, such as places,reviews. Relations are returned as IDs otherwise',
+    'depth': f'The number of levels of relations to embed (default 1, at most {MAX_DEPTH}). Without expand, every relation is embedded',
+}
+
+# Query string parameters shared by every collection endpoint
+LIST_PARAMS = {
+    **EXPAND_PARAMS,
+    'limit': f'The maximum number of objects to return (default {DEFAULT_LIMIT}, at most {MAX_LIMIT})',
+    'cursor': 'The next_cursor of the previous page, sent in the X-Next-Cursor header, or in the body with envelope=1',
+    'envelope': 'Set to 1 to return {"items": [...], "next_cursor": ...} instead of a bare list. next_cursor is null on the last page',
+    'fields': 'A comma-separated list of the attributes to return',
+    'stream': 'Set to 1 to stream every matching object as NDJSON instead of a page',
+}
+
+def encode_cursor(obj):
+    """
+    Encode the position of an object in a collection as an opaque cursor.
+
+    :param obj: The last object of a page
+    :return: The cursor string
+    """
+    position = f"{obj.created_at.isoformat()}|{obj.id}"
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor. Aborts with a 400 status code if it is invalid.
+
+    :param cursor: The cursor string, or None
+    :return: The (created_at, id) position, or None
+    """
+    if not cursor:
+        return None
+    try:
+        created_at, obj_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), obj_id
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        abort(400, description="Invalid cursor")
+
+def parse_limit():
+    """
+    Read the limit query parameter. Aborts with a 400 status code if it is invalid.
+
+    :return: The number of objects to return
+    """
+    limit = request.args.get('limit', DEFAULT_LIMIT)
+    try:
+        limit = int(limit)
+    except ValueError:
+        abort(400, description="Limit must be an integer")
+    if not 1 <= limit <= MAX_LIMIT:
+        abort(400, description=f"Limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+def parse_fields(model):
+    """
+    Read the fields query parameter. Aborts with a 400 status code if it names an unknown attribute.
+
+    :param model: The API model of the collection
+    :return: The names of the requested attributes, or None to return them all
+    """
+    names = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()]
+    if not names:
+        return None
+    unknown = [name for name in names if name not in model]
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(unknown)}")
+    if 'id' in model and 'id' not in names:
+        names.insert(0, 'id')
+    return names
+
+def parse_expand(cls):
+    """
+    Read the expand and depth query parameters. Aborts with a 400 status code if depth is invalid
+    or expand names a relation that cannot be reached from the class within depth levels.
+
+    :param cls: The model class of the objects returned
+    :return: A (relation names, depth) tuple. No relation is expanded by default
+    """
+    names = [name.strip() for name in request.args.get('expand', '').split(',') if name.strip()]
+    if 'depth' not in request.args and not names:
+        return (), 0
+    try:
+        depth = int(request.args.get('depth', 1))
+    except ValueError:
+        abort(400, description="Depth must be an integer")
+    if not 0 <= depth <= MAX_DEPTH:
+        abort(400, description=f"Depth must be between 0 and {MAX_DEPTH}")
+    reachable = serializer(cls).relation_names(depth)
+    unknown = [name for name in names if name not in reachable]
+    if unknown:
+        abort(400, description=f"Unknown relations: {', '.join(unknown)}")
+    return (names or reachable), depth
+
+def represent(obj):
+    """
+    Serialize an object for a response, expanding the relations the query string asks for.
+
+    :param obj: The model instance
+    :return: The object as a dictionary
+    """
+    expand, depth = parse_expand(obj.__class__)
+    return serialize_many(obj.__class__, [obj], expand, depth)[0]
+
+def parse_filters(filters):
+    """
+    Build the conditions of the filters present in the query string.
+    Aborts with a 400 status code if a value cannot be converted.
+
+    :param filters: A dictionary mapping query parameters to (field, operator, type) tuples
+    :return: A list of Conditions
+    """
+    conditions = []
+    for param, (field, op, value_type) in filters.items():
+        if param not in request.args:
+            continue
+        try:
+            value = value_type(request.args[param])
+        except ValueError:
+            abort(400, description=f"Invalid value for {param}")
+        conditions.append(Condition(field, op, value))
+    return conditions
+
+def paginate(cls, model, filters=None, conditions=(), query=None):
+    """
+    Build the response of a collection endpoint.
+    A single page of objects is loaded, ordered by creation time and ID, and the objects of each
+    relation the client expands are loaded in one batch for the whole page. When more objects follow,
+    the cursor of the next page is returned in the X-Next-Cursor header and a Link header. The body
+    is the list of objects, or with envelope=1 an object holding them under items and the cursor
+    under next_cursor.
+    Clients asking for a stream get every matching object as NDJSON instead, and the limit
+    and cursor are ignored.
+
+    :param cls: The model class of the collection
+    :param model: The API model of the collection
+    :param filters: The filters the client can use, as accepted by parse_filters
+    :param conditions: Conditions always applied, such as the parent of a nested collection
+    :param query: The function loading a page, taking (conditions, after, limit). Defaults to cls.query
+    :return: A (body, status, headers) tuple, or a streamed Response
+    """
+    only = parse_fields(model)
+    expand, depth = parse_expand(cls)
+    conditions = list(conditions) + parse_filters(filters or {})
+    if wants_stream():
+        return stream(cls, conditions, expand, depth, only)
+    limit = parse_limit()
+    after = decode_cursor(request.args.get('cursor'))
+    # Load one extra object to know whether another page follows
+    objs = (query or cls.query)(conditions, after, limit + 1)
+    page = objs[:limit]
+    body = serialize_many(cls, page, expand, depth, only)
+    headers = {}
+    next_cursor = None
+    if len(objs) > limit:
+        next_cursor = encode_cursor(page[-1])
+        args = dict(request.args.to_dict(), cursor=next_cursor)
+        headers['X-Next-Cursor'] = next_cursor
+        headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    if request.args.get('envelope') == '1':
+        body = {'items': body, 'next_cursor': next_cursor}
+    return body, 200, headers
@@ -4,6 +4,12 @@ from models.place import Place
 from models.user import User
 from models.city import City
 from models.review import Review
+from models.amenity import Amenity
+from models.serializer import serialize_many
+from api.pagination import EXPAND_PARAMS, LIST_PARAMS, DEFAULT_LIMIT, MAX_LIMIT, paginate, parse_expand, parse_fields, parse_filters, represent
+from persistence.spatial import HALF_CIRCUMFERENCE_KM
+from api.caching import cached_collection, cached_object
+from api.bulk import BULK_PARAMS, bulk_create, load_related, read_items, validation_error
 
 ns_place = Namespace('places', description='Place operations')
 
@@ -22,6 +28,7 @@ place_model = ns_place.model('Place', {
     'price_per_night': fields.Float(required=True, description='The price per night'),
     'max_guests': fields.Integer(required=True, description='The maximum number of guests'),
     'amenity_ids': fields.List(fields.String, required=True, description='The list of amenity IDs'),
+    'review_ids': fields.List(fields.String, readOnly=True, description='The IDs of the reviews of the place'),
     'reviews': fields.List(fields.Nested(ns_place.model('Review', {
         'id': fields.String(readOnly=True, description='The unique identifier of a review'),
         'comment': fields.String(required=True, description='The review text'),
@@ -35,6 +42,87 @@ place_model = ns_place.model('Place', {
     'updated_at': fields.DateTime(readOnly=True, description='The date and time the place was last updated')
 }) 
 
+# Filters accepted by the list of places, mapping query parameters to (field, operator, type)
+PLACE_FILTERS = {
+    'city_id': ('city_id', 'eq', str),
+    'host_id': ('host_id', 'eq', str),
+    'min_price': ('price_per_night', 'gte', float),
+    'max_price': ('price_per_night', 'lte', float),
+    'min_guests': ('max_guests', 'gte', int),
+}
+
+# Filters accepted by the search of places, evaluated over the columns of place_columns
+PLACE_SEARCH_FILTERS = dict(PLACE_FILTERS, **{
+    'max_guests': ('max_guests', 'lte', int),
+    'min_rooms': ('number_of_rooms', 'gte', int),
+    'max_rooms': ('number_of_rooms', 'lte', int),
+    'min_bathrooms': ('number_of_bathrooms', 'gte', int),
+    'max_bathrooms': ('number_of_bathrooms', 'lte', int),
+    'min_latitude': ('latitude', 'gte', float),
+    'max_latitude': ('latitude', 'lte', float),
+    'min_longitude': ('longitude', 'gte', float),
+    'max_longitude': ('longitude', 'lte', float),
+})
+
+# Documentation of the search filters, shared by the search endpoints
+SEARCH_PARAMS = dict(city_id='Only places in this city', host_id='Only places of this host',
+                     min_price='The lowest price per night', max_price='The highest price per night',
+                     min_guests='The number of guests the place must accommodate',
+                     max_guests='The largest capacity of the place',
+                     min_rooms='The fewest rooms', max_rooms='The most rooms',
+                     min_bathrooms='The fewest bathrooms', max_bathrooms='The most bathrooms')
+
+BOX_PARAMS = dict(min_latitude='The southern edge of the box', max_latitude='The northern edge of the box',
+                  min_longitude='The western edge of the box', max_longitude='The eastern edge of the box')
+
+POINT_PARAMS = dict(latitude='The latitude of the point', longitude='The longitude of the point')
+
+DEFAULT_NEAREST = 10 # Number of places returned by a nearest search when no k is given
+
+# A place with its distance from the point of a search
+place_distance_model = ns_place.clone('PlaceDistance', place_model, {
+    'distance_km': fields.Float(readOnly=True, description='The distance from the point searched, in kilometers')
+})
+
+def parse_number(name, low, high, value_type=float, default=None):
+    """
+    Read a numeric query parameter. Aborts with a 400 status code if it is missing or out of range.
+
+    :param name: The name of the parameter
+    :param low: The lowest accepted value
+    :param high: The highest accepted value
+    :param value_type: The type of the value
+    :param default: The value when the parameter is absent, or None if it is required
+    :return: The value
+    """
+    value = request.args.get(name)
+    if value is None:
+        if default is None:
+            abort(400, description=f"{name} is required")
+        return default
+    try:
+        value = value_type(value)
+    except ValueError:
+        abort(400, description=f"Invalid value for {name}")
+    if not low <= value <= high:
+        abort(400, description=f"{name} must be between {low} and {high}")
+    return value
+
+def distance_response(found):
+    """
+    Build the response of a distance search.
+
+    :param found: A list of (place, distance in kilometers) pairs
+    :return: The places with their distance, as a list
+    """
+    only = parse_fields(place_distance_model)
+    expand, depth = parse_expand(Place)
+    items = serialize_many(Place, [place for place, _ in found], expand, depth, only)
+    if only is None or 'distance_km' in only:
+        for item, (_, distance) in zip(items, found):
+            item['distance_km'] = round(distance, 6)
+    return items
+
 def validate_place_data(data):
     """
     Validate the data for a place. If any of the data is invalid, abort with a 400 status code.
@@ -71,20 +159,22 @@ class PlaceList(Resource):
     """
     Resource for getting a list of all places and creating new places.
     """
-    @ns_place.doc('list_places')
-    @ns_place.marshal_list_with(place_model)
+    @cached_collection(Place)
+    @ns_place.doc('list_places', params=dict(LIST_PARAMS, city_id='Only places in this city', host_id='Only places of this host',
+                                             min_price='The lowest price per night', max_price='The highest price per night',
+                                             min_guests='The number of guests the place must accommodate'))
+    @ns_place.response(200, 'Success', [place_model])
     def get(self):
         """
-        Get a list of all places.
+        Get a page of places.
 
-        :return: A list of all places
+        :return: A list of places
         """
-        places = Place.load_all()
-        return [place.to_dict() for place in places]
+        return paginate(Place, place_model, PLACE_FILTERS)
 
     @ns_place.doc('create_place')
     @ns_place.expect(place_model)
-    @ns_place.marshal_with(place_model, code=201)
+    @ns_place.response(201, 'Created', place_model)
     def post(self):
         """
         Create a new place.
@@ -115,7 +205,124 @@ class PlaceList(Resource):
         host = User.load(place.host_id)
         if host:
             host.add_place(place) # Add the place to the host's list of places
-        return place.to_dict(), 201
+        return represent(place), 201
+
+@ns_place.route('/search')
+class PlaceSearch(Resource):
+    """
+    Resource for searching places by price, capacity, rooms, bathrooms, city and host.
+    """
+    @cached_collection(Place)
+    @ns_place.doc('search_places', params=dict(LIST_PARAMS, **SEARCH_PARAMS, **BOX_PARAMS))
+    @ns_place.response(200, 'Success', [place_model])
+    def get(self):
+        """
+        Search places. The filters are evaluated over in-memory columns and only the places of the page are loaded.
+
+        :return: A list of places
+        """
+        return paginate(Place, place_model, PLACE_SEARCH_FILTERS, query=Place.search)
+
+@ns_place.route('/within')
+class PlaceWithin(Resource):
+    """
+    Resource for finding the places in a latitude/longitude box.
+    """
+    @cached_collection(Place)
+    @ns_place.doc('places_within', params=dict(LIST_PARAMS, **SEARCH_PARAMS, **BOX_PARAMS))
+    @ns_place.response(200, 'Success', [place_model])
+    def get(self):
+        """
+        Get a page of the places in a box, found through the spatial index of the place columns.
+
+        :return: A list of places
+        """
+        missing = [name for name in BOX_PARAMS if name not in request.args]
+        if missing:
+            abort(400, description=f"Missing box edges: {', '.join(missing)}")
+        return paginate(Place, place_model, PLACE_SEARCH_FILTERS, query=Place.search)
+
+@ns_place.route('/nearby')
+class PlaceNearby(Resource):
+    """
+    Resource for finding the places within a distance of a point.
+    """
+    @cached_collection(Place)
+    @ns_place.doc('places_nearby', params=dict(SEARCH_PARAMS, **POINT_PARAMS, radius_km='The greatest distance in kilometers',
+                                               limit='The maximum number of places to return', fields=LIST_PARAMS['fields'], **EXPAND_PARAMS))
+    @ns_place.response(200, 'Success', [place_distance_model])
+    def get(self):
+        """
+        Get the places within a distance of a point, nearest first.
+
+        :return: A list of places with their distance
+        """
+        latitude = parse_number('latitude', -90.0, 90.0)
+        longitude = parse_number('longitude', -180.0, 180.0)
+        radius_km = parse_number('radius_km', 0.0, HALF_CIRCUMFERENCE_KM)
+        limit = parse_number('limit', 1, MAX_LIMIT, int, DEFAULT_LIMIT)
+        conditions = parse_filters(PLACE_SEARCH_FILTERS)
+        return distance_response(Place.nearest(latitude, longitude, limit, conditions, radius_km))
+
+@ns_place.route('/nearest')
+class PlaceNearest(Resource):
+    """
+    Resource for finding the places closest to a point.
+    """
+    @cached_collection(Place)
+    @ns_place.doc('places_nearest', params=dict(SEARCH_PARAMS, **POINT_PARAMS, k='The number of places to return',
+                                                fields=LIST_PARAMS['fields'], **EXPAND_PARAMS))
+    @ns_place.response(200, 'Success', [place_distance_model])
+    def get(self):
+        """
+        Get the k places closest to a point, nearest first.
+
+        :return: A list of places with their distance
+        """
+        latitude = parse_number('latitude', -90.0, 90.0)
+        longitude = parse_number('longitude', -180.0, 180.0)
+        k = parse_number('k', 1, MAX_LIMIT, int, DEFAULT_NEAREST)
+        conditions = parse_filters(PLACE_SEARCH_FILTERS)
+        return distance_response(Place.nearest(latitude, longitude, k, conditions))
+
+@ns_place.route('/bulk')
+class PlaceBulk(Resource):
+    """
+    Resource for creating many places in a single request.
+    """
+    @ns_place.doc('bulk_create_places', params=BULK_PARAMS)
+    @ns_place.expect([place_model])
+    def post(self):
+        """
+        Create places from a JSON array or NDJSON body.
+
+        :return: The result of every item
+        """
+        items = read_items()
+        errors = [validation_error(validate_place_data, item) for item in items]
+        hosts = load_related(User, [item['host_id'] for item, error in zip(items, errors) if error is None])
+
+        def create(data):
+            place = Place(
+                name=data['name'],
+                description=data['description'],
+                address=data['address'],
+                city_id=data['city_id'],
+                latitude=data['latitude'],
+                longitude=data['longitude'],
+                host_id=data['host_id'],
+                number_of_rooms=data['number_of_rooms'],
+                number_of_bathrooms=data['number_of_bathrooms'],
+                price_per_night=data['price_per_night'],
+                max_guests=data['max_guests'],
+                amenity_ids=data['amenity_ids']
+            )
+            host = hosts.get(data['host_id'])
+            if host:
+                host.add_place(place)
+            return place
+
+        return bulk_create(items, errors, create)
 
 @ns_place.route('/<string:place_id>')
 @ns_place.response(404, 'Place not found')
@@ -124,8 +331,9 @@ class PlaceResource(Resource):
     """
     Resource for getting, updating, and deleting a single place.
     """
-    @ns_place.doc('get_place')
-    @ns_place.marshal_with(place_model)
+    @cached_object(Place.load)
+    @ns_place.doc('get_place', params=EXPAND_PARAMS)
+    @ns_place.response(200, 'Success', place_model)
     def get(self, place_id):
         """
         Get a single place.
@@ -136,11 +344,11 @@ class PlaceResource(Resource):
         place = Place.load(place_id) # Load the place from the database
         if not place:
             abort(404, description="Place not found")
-        return place.to_dict()
+        return represent(place)
 
     @ns_place.doc('update_place')
     @ns_place.expect(place_model)
-    @ns_place.marshal_with(place_model)
+    @ns_place.response(200, 'Success', place_model)
     def put(self, place_id):
         """
         Update a single place.
@@ -160,13 +368,9 @@ class PlaceResource(Resource):
         if data.get('host_id') and place.host_id and place.host_id != data['host_id']: # Check if the place already has a host
             abort(400, description="Listing already has a host")
 
-        # Only update the fields that are present in the request data
-        for key in data.keys():
-            if hasattr(place, key):
-                setattr(place, key, data[key])
-
-        place.save()
-        return place.to_dict()
+        # Only the editable fields present in the request data are updated
+        place = place.update(**{key: value for key, value in data.items() if key in Place.__editable__})
+        return represent(place)
 
     @ns_place.doc('delete_place')
     @ns_place.response(204, 'Place deleted')
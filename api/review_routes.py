@@ -3,6 +3,10 @@ from flask_restx import Namespace, Resource, fields
 from models.review import Review
 from models.place import Place
 from models.user import User
+from api.pagination import EXPAND_PARAMS, LIST_PARAMS, paginate, represent
+from api.caching import cached_collection, cached_object
+from api.bulk import BULK_PARAMS, bulk_create, load_related, read_items, validation_error
+from persistence.query import Condition
 
 ns_review = Namespace('', description='Review operations')
 
@@ -17,6 +21,13 @@ review_model = ns_review.model('Review', {
     'updated_at': fields.DateTime(readOnly=True, description='The date and time the review was last updated')
 })
 
+# Filters accepted by the lists of reviews, mapping query parameters to (field, operator, type)
+REVIEW_FILTERS = {
+    'min_rating': ('rating', 'gte', int),
+    'max_rating': ('rating', 'lte', int),
+}
+REVIEW_PARAMS = dict(LIST_PARAMS, min_rating='The lowest rating', max_rating='The highest rating')
+
 def validate_review_data(data):
     """
     Validates the review data. If any of the data is invalid, abort with a 400 status code.
@@ -37,23 +48,24 @@ class PlaceReviewList(Resource):
     """
     Resource for getting a list of all reviews for a place and creating new reviews for a place.
     """
-    @ns_review.doc('list_reviews_for_place')
-    @ns_review.marshal_list_with(review_model)
+    @cached_collection(Review, related=(Place,))
+    @ns_review.doc('list_reviews_for_place', params=REVIEW_PARAMS)
+    @ns_review.response(200, 'Success', [review_model])
     def get(self, place_id):
         """
-        Get a list of all reviews for a place.
+        Get a page of the reviews for a place.
 
         :param place_id: The ID of the place to get reviews for
-        :return: A list of all reviews for the place
+        :return: A list of reviews for the place
         """
         place = Place.load(place_id)
         if not place:
             abort(404, description="Place not found")
-        return [review.to_dict() for review in place.reviews]
+        return paginate(Review, review_model, REVIEW_FILTERS, [Condition('place_id', 'eq', place.id)])
 
     @ns_review.doc('create_review_for_place')
     @ns_review.expect(review_model)
-    @ns_review.marshal_with(review_model, code=201)
+    @ns_review.response(201, 'Created', review_model)
     def post(self, place_id):
         """
         Create a new review for a place.
@@ -91,7 +103,7 @@ class PlaceReviewList(Resource):
 
             place.add_review(review)
             user.add_review(review)
-            return review.to_dict(), 201
+            return represent(review), 201
         except ValueError as e:
             abort(400, description=str(e))
 
@@ -100,19 +112,62 @@ class UserReviewList(Resource):
     """
     Resource for getting a list of all reviews by a user.
     """
-    @ns_review.doc('list_reviews_for_user')
-    @ns_review.marshal_list_with(review_model)
+    @cached_collection(Review, related=(User,))
+    @ns_review.doc('list_reviews_for_user', params=REVIEW_PARAMS)
+    @ns_review.response(200, 'Success', [review_model])
     def get(self, user_id):
         """
-        Get a list of all reviews by a user.
+        Get a page of the reviews by a user.
 
         :param user_id: The ID of the user to get reviews for
-        :return: A list of all reviews by the user
+        :return: A list of reviews by the user
         """
         user = User.load(user_id)
         if not user:
             abort(404, description="User not found")
-        return [review.to_dict() for review in user.reviews]
+        return paginate(Review, review_model, REVIEW_FILTERS, [Condition('user_id', 'eq', user.id)])
+
+@ns_review.route('/reviews/bulk')
+class ReviewBulk(Resource):
+    """
+    Resource for creating many reviews in a single request.
+    """
+    @ns_review.doc('bulk_create_reviews', params=BULK_PARAMS)
+    @ns_review.expect([review_model])
+    def post(self):
+        """
+        Create reviews from a JSON array or NDJSON body.
+
+        :return: The result of every item
+        """
+        items = read_items()
+        errors = [validation_error(validate_review_data, item) for item in items]
+        valid = [item for item, error in zip(items, errors) if error is None]
+        places = load_related(Place, [item['place_id'] for item in valid])
+        users = load_related(User, [item['user_id'] for item in valid])
+        for index, item in enumerate(items):
+            if errors[index] is not None:
+                continue
+            place, user = places[item['place_id']], users[item['user_id']]
+            if not place:
+                errors[index] = "Place not found"
+            elif not user:
+                errors[index] = "User not found"
+            elif str(place.host_id) == str(user.id):
+                errors[index] = "A host cannot review their own listing"
+
+        def create(data):
+            review = Review(
+                place_id=data['place_id'],
+                user_id=data['user_id'],
+                rating=data['rating'],
+                comment=data['comment']
+            )
+            places[data['place_id']].add_review(review)
+            users[data['user_id']].add_review(review)
+            return review
+
+        return bulk_create(items, errors, create)
 
 @ns_review.route('/reviews/<string:review_id>')
 @ns_review.response(404, 'Review not found')
@@ -121,8 +176,9 @@ class ReviewResource(Resource):
     """
     Resource for getting, updating, and deleting a single review.
     """
-    @ns_review.doc('get_review')
-    @ns_review.marshal_with(review_model)
+    @cached_object(Review.load)
+    @ns_review.doc('get_review', params=EXPAND_PARAMS)
+    @ns_review.response(200, 'Success', review_model)
     def get(self, review_id):
         """
         Get a single review.
@@ -133,11 +189,11 @@ class ReviewResource(Resource):
         review = Review.load(review_id)
         if not review:
             abort(404, description="Review not found")
-        return review.to_dict()
+        return represent(review)
 
     @ns_review.doc('update_review')
     @ns_review.expect(review_model)
-    @ns_review.marshal_with(review_model)
+    @ns_review.response(200, 'Success', review_model)
     def put(self, review_id):
         """
         Update a single review.
@@ -156,11 +212,8 @@ class ReviewResource(Resource):
         validate_review_data(data)
         
         # Update the review
-        review.update_details(
-            rating=data.get('rating'),
-            comment=data.get('comment')
-        )
-        return review.to_dict()
+        review = review.update(**{key: data[key] for key in Review.__editable__ if key in data})
+        return represent(review)
 
     @ns_review.doc('delete_review')
     @ns_review.response(204, 'Review deleted')
@@ -0,0 +1,58 @@
+import itertools
+from flask import Response, request, stream_with_context
+from models.serializer import serialize_many
+from persistence.codecs import codec
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+ROWS_PER_CHUNK = 100 # Rows written to the socket at once after the first one
+
+def wants_stream():
+    """
+    Check whether the client asked for a streamed collection, with ?stream=1 or an Accept header
+    preferring NDJSON.
+
+    :return: True if the collection should be streamed
+    """
+    if request.args.get('stream') in ('1', 'true'):
+        return True
+    # JSON is offered first so that clients accepting anything keep getting pages
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_rows(cls, objs, expand=(), depth=0, only=None):
+    """
+    Serialize objects into NDJSON lines as they are consumed.
+    The first row is sent on its own to keep the time to first byte low, the following ones are
+    grouped into chunks to limit the number of writes. Each chunk is serialized at once, so the
+    objects its rows expand are loaded in one batch per relation.
+
+    :param cls: The model class of the objects
+    :param objs: An iterator of model instances
+    :param expand: The relations embedded in the representation of the objects
+    :param depth: The number of levels of relations to embed
+    :param only: The names of the requested attributes, or None for all of them
+    :return: An iterator of bytes
+    """
+    objs = iter(objs)
+    size = 1
+    while True:
+        chunk = list(itertools.islice(objs, size))
+        if not chunk:
+            return
+        yield b''.join(codec.dumps(row) + b'\n' for row in serialize_many(cls, chunk, expand, depth, only))
+        size = ROWS_PER_CHUNK
+
+def stream(cls, conditions=(), expand=(), depth=0, only=None):
+    """
+    Build a streamed NDJSON response with every object of a collection.
+    Objects are loaded from the storage one at a time while the response is written,
+    so memory use does not grow with the size of the collection.
+
+    :param cls: The model class of the collection
+    :param conditions: The Conditions the objects must satisfy
+    :param expand: The relations embedded in the representation of the objects
+    :param depth: The number of levels of relations to embed
+    :param only: The names of the requested attributes, or None for all of them
+    :return: A streamed Response
+    """
+    rows = ndjson_rows(cls, cls.iterate(conditions), expand, depth, only)
+    return Response(stream_with_context(rows), mimetype=NDJSON_MIMETYPE)
@@ -4,7 +4,13 @@ from models.user import User
 from models.city import City
 from models.country import Country
 from models.place import Place
+from models.review import Review
+from models.amenity import Amenity
 from werkzeug.security import generate_password_hash
+from api.pagination import EXPAND_PARAMS, LIST_PARAMS, paginate, represent
+from api.caching import cached_collection, cached_object
+from api.bulk import BULK_PARAMS, bulk_create, read_items, validation_error
+from persistence.indexes import normalize_email
 
 ns_user = Namespace('users', description='User operations')
 
@@ -18,6 +24,8 @@ user_model = ns_user.model('User', {
     'country_code': fields.String(required=False, description='The country code the user is associated with'),
     'created_at': fields.DateTime(readOnly=True, description='The date and time the user was created'),
     'updated_at': fields.DateTime(readOnly=True, description='The date and time the user was last updated'),
+    'place_ids': fields.List(fields.String, readOnly=True, description='The IDs of the places of the user'),
+    'review_ids': fields.List(fields.String, readOnly=True, description='The IDs of the reviews of the user'),
     'places': fields.List(fields.Nested(ns_user.model('Place', {
         'id': fields.String(readOnly=True, description='The unique identifier of a place'),
         'name': fields.String(required=True, description='The place name'),
@@ -69,6 +77,9 @@ def validate_user_data(data):
     """
     if 'email' not in data or not isinstance(data['email'], str) or not data['email'].strip():
         abort(400, description="Email must be a non-empty string")
+    # Check if the email address is already in use
+    if not User.unique_email(data['email']):
+        abort(400, description="Email address is already in use")
     if 'first_name' not in data or not isinstance(data['first_name'], str) or not data['first_name'].strip():
         abort(400, description="First name must be a non-empty string")
     if 'last_name' not in data or not isinstance(data['last_name'], str) or not data['last_name'].strip():
@@ -87,20 +98,23 @@ class UserList(Resource):
     """
     Resource for getting a list of all users and creating new users.
     """
-    @ns_user.doc('list_users')
-    @ns_user.marshal_list_with(user_model)
+    @cached_collection(User)
+    @ns_user.doc('list_users', params=dict(LIST_PARAMS, city_id='Only users of this city', country_code='Only users of this country'))
+    @ns_user.response(200, 'Success', [user_model])
     def get(self):
         """
-        Get a list of all users.
+        Get a page of users.
 
-        :return: A list of all users
+        :return: A list of users
         """
-        users = User.load_all()
-        return [user.to_dict() for user in users]
+        return paginate(User, user_model, {
+            'city_id': ('city_id', 'eq', str),
+            'country_code': ('country_code', 'eq', str),
+        })
 
     @ns_user.doc('create_user')
     @ns_user.expect(user_model)
-    @ns_user.marshal_with(user_model, code=201)
+    @ns_user.response(201, 'Created', user_model)
     def post(self):
         """
         Create a new user.
@@ -111,9 +125,6 @@ class UserList(Resource):
             abort(400, description="Request payload must be JSON")
         data = request.json
         validate_user_data(data)
-        # Check if the email address is already in use
-        if not User.unique_email(data['email']):
-            abort(400, description="Email address is already in use")
         # Create the user
         user = User(
             email=data['email'],
@@ -122,7 +133,42 @@ class UserList(Resource):
             city_id=data.get('city_id'),
             country_code=data.get('country_code')
         )
-        return user.to_dict(), 201
+        return represent(user), 201
+
+@ns_user.route('/bulk')
+class UserBulk(Resource):
+    """
+    Resource for creating many users in a single request.
+    """
+    @ns_user.doc('bulk_create_users', params=BULK_PARAMS)
+    @ns_user.expect([user_model])
+    def post(self):
+        """
+        Create users from a JSON array or NDJSON body.
+
+        :return: The result of every item
+        """
+        items = read_items()
+        errors = [validation_error(validate_user_data, item) for item in items]
+        # Emails are unique, including within the batch
+        seen = set()
+        for index, item in enumerate(items):
+            if errors[index] is None:
+                email = normalize_email(item['email'])
+                if email in seen:
+                    errors[index] = "Email address is already in use"
+                seen.add(email)
+
+        def create(data):
+            return User(
+                email=data['email'],
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                city_id=data.get('city_id'),
+                country_code=data.get('country_code')
+            )
+
+        return bulk_create(items, errors, create)
 
 @ns_user.route('/<string:user_id>')
 @ns_user.response(404, 'User not found')
@@ -131,8 +177,9 @@ class UserResource(Resource):
     """
     Resource for getting, updating, and deleting a single user.
     """
-    @ns_user.doc('get_user')
-    @ns_user.marshal_with(user_model)
+    @cached_object(User.load)
+    @ns_user.doc('get_user', params=EXPAND_PARAMS)
+    @ns_user.response(200, 'Success', user_model)
     def get(self, user_id):
         """
         Get a single user.
@@ -143,11 +190,11 @@ class UserResource(Resource):
         user = User.load(user_id)
         if not user:
             abort(404, description="User not found")
-        return user.to_dict()
+        return represent(user)
 
     @ns_user.doc('update_user')
     @ns_user.expect(user_model)
-    @ns_user.marshal_with(user_model)
+    @ns_user.response(200, 'Success', user_model)
     def put(self, user_id):
         """
         Update a single user.
@@ -163,14 +210,16 @@ class UserResource(Resource):
             abort(400, description="Request payload must be JSON")
 
         data = request.json
-        
-        for key in data.keys():
-            if hasattr(user, key):
-                setattr(user, key, data[key])
 
-        user.save()
+        if 'email' in data:
+            owner = User.load_by_email(data['email'])
+            if owner and owner.id != user.id:
+                abort(400, description="Email address is already in use")
+
+        # Only the editable fields present in the request data are updated
+        user = user.update(**{key: value for key, value in data.items() if key in User.__editable__})
 
-        return user.to_dict()
+        return represent(user)
 
     @ns_user.doc('delete_user')
     @ns_user.response(204, 'User deleted')
@@ -186,3 +235,24 @@ class UserResource(Resource):
 
         User.delete(user_id)
         return '', 204
+
+@ns_user.route('/email/<string:email>')
+@ns_user.response(404, 'User not found')
+@ns_user.param('email', 'The user email address')
+class UserByEmail(Resource):
+    """
+    Resource for looking up a user by email address.
+    """
+    @ns_user.doc('get_user_by_email', params=EXPAND_PARAMS)
+    @ns_user.response(200, 'Success', user_model)
+    def get(self, email):
+        """
+        Get the user with a given email address.
+
+        :param email: The email address of the user
+        :return: The user
+        """
+        user = User.load_by_email(email)
+        if not user:
+            abort(404, description="User not found")
+        return represent(user)
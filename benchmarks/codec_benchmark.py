@@ -0,0 +1,51 @@
+"""
+Compare the JSON codecs on dumping and loading a whole FileStorage store.
+
+Usage: python -m benchmarks.codec_benchmark [--sizes 10000,100000,1000000]
+"""
+import argparse
+import time
+from persistence.codecs import CODECS
+from persistence.records import attributes
+from benchmarks.storage_benchmark import make_reviews
+
+def make_store(count):
+    """
+    Build the data dictionary of a store holding reviews, with UUIDs and datetimes as kept in memory.
+
+    :param count: The number of reviews.
+    :return: A data dictionary as held by FileStorage.
+    """
+    return {'Review': {str(review.id): attributes(review) for review in make_reviews(count)}}
+
+def timed(func):
+    """
+    Run a function once.
+
+    :param func: The function to run.
+    :return: A tuple (result, duration in milliseconds).
+    """
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    args = parser.parse_args()
+    codecs = {}
+    for name, codec_class in CODECS.items():
+        try:
+            codecs[name] = codec_class()
+        except ImportError:
+            print(f"{name} is not installed")
+    for size in (int(size) for size in args.sizes.split(',')):
+        store = make_store(size)
+        for name, codec in codecs.items():
+            data, dump_ms = timed(lambda: codec.dumps(store))
+            _, load_ms = timed(lambda: codec.loads(data))
+            print(f"{size:>8} objects {name:8} dump {dump_ms:10.1f} ms  load {load_ms:10.1f} ms  {len(data) / 1e6:8.1f} MB")
+        del store
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Measure the read throughput of the storage backends while writes are in flight.
+
+Reader threads load single objects and full scans for a fixed duration, first alone and then
+while a writer thread keeps saving objects.
+
+Usage: python -m benchmarks.concurrency_benchmark [--objects 10000] [--readers 8] [--seconds 3]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from models.review import Review
+from persistence.file_storage import FileStorage
+from persistence.wal_storage import WALFileStorage
+from persistence.sqlite_storage import SQLiteStorage
+from benchmarks.storage_benchmark import make_reviews
+
+def read_loop(storage, ids, stop, counts, errors):
+    """
+    Read from a storage until stopped: nine point loads for every full scan.
+
+    :param storage: The storage to read from.
+    :param ids: The IDs of the stored reviews.
+    :param stop: The event ending the loop.
+    :param counts: A list collecting the number of reads of each thread.
+    :param errors: A list collecting the exceptions raised.
+    """
+    reads = 0
+    try:
+        while not stop.is_set():
+            if reads % 10 == 9:
+                storage.load_all(Review)
+            else:
+                storage.load(Review, random.choice(ids))
+            reads += 1
+    except Exception as e:
+        errors.append(e)
+    counts.append(reads)
+
+def write_loop(storage, reviews, stop, counts, errors):
+    """
+    Save reviews to a storage until stopped, alternating between updating a stored review and
+    adding a new one, so the stored dictionaries change size while they are read.
+
+    :param storage: The storage to write to.
+    :param reviews: The stored reviews.
+    :param stop: The event ending the loop.
+    :param counts: A list collecting the number of writes.
+    :param errors: A list collecting the exceptions raised.
+    """
+    writes = 0
+    try:
+        while not stop.is_set():
+            if writes % 2:
+                review = make_reviews(1)[0]
+            else:
+                review = random.choice(reviews)
+                review.comment = f"Write {writes}"
+            storage.save(review)
+            writes += 1
+    except Exception as e:
+        errors.append(e)
+    counts.append(writes)
+
+def run(storage, reviews, readers, seconds, with_writer):
+    """
+    Run reader threads, and optionally a writer thread, against a storage.
+
+    :param storage: The storage to benchmark.
+    :param reviews: The stored reviews.
+    :param readers: The number of reader threads.
+    :param seconds: How long the threads run.
+    :param with_writer: Whether a writer thread runs alongside the readers.
+    :return: A tuple (reads per second, writes per second, errors).
+    """
+    ids = [review.id for review in reviews]
+    stop = threading.Event()
+    read_counts, write_counts, errors = [], [], []
+    threads = [threading.Thread(target=read_loop, args=(storage, ids, stop, read_counts, errors)) for _ in range(readers)]
+    if with_writer:
+        threads.append(threading.Thread(target=write_loop, args=(storage, reviews, stop, write_counts, errors)))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(read_counts) / seconds, sum(write_counts) / seconds, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--objects', type=int, default=10000)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=3)
+    args = parser.parse_args()
+    reviews = make_reviews(args.objects)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        backends = {
+            'FileStorage': FileStorage(os.path.join(tmp_dir, 'file_storage.json')),
+            'WALFileStorage': WALFileStorage(os.path.join(tmp_dir, 'wal_storage.json'), fsync=False),
+            'SQLiteStorage': SQLiteStorage(os.path.join(tmp_dir, 'hbnb.sqlite3')),
+        }
+        print(f"{args.objects} objects, {args.readers} reader threads, {args.seconds:g} s per run")
+        for name, storage in backends.items():
+            storage.save_many(reviews)
+            for with_writer in (False, True):
+                reads, writes, errors = run(storage, reviews, args.readers, args.seconds, with_writer)
+                label = 'with writer' if with_writer else 'reads only'
+                print(f"{name:15} {label:12} {reads:10.0f} reads/s {writes:8.0f} writes/s {len(errors):4} errors")
+            if hasattr(storage, 'close'):
+                storage.close()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
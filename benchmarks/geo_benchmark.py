@@ -0,0 +1,67 @@
+"""
+Compare the spatial index of the place columns with a brute-force scan of every coordinate.
+
+Usage: python -m benchmarks.geo_benchmark [--places 1000000] [--points 200]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import numpy as np
+from models import base_model
+from models.place import place_columns
+from persistence.file_storage import FileStorage
+from persistence.query import Condition
+from persistence.spatial import haversine_km, in_box
+from benchmarks.place_search_benchmark import make_places
+from benchmarks.snapshot_benchmark import timed
+
+def brute_force_nearest(latitudes, longitudes, latitude, longitude, k):
+    """
+    Find the k nearest coordinates by computing every distance.
+
+    :return: The rows of the k nearest coordinates, nearest first.
+    """
+    distances = haversine_km(latitude, longitude, latitudes, longitudes)
+    rows = np.argpartition(distances, k)[:k]
+    return rows[np.argsort(distances[rows])]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--places', type=int, default=1000000)
+    parser.add_argument('--points', type=int, default=200)
+    args = parser.parse_args()
+    tmp_dir = tempfile.mkdtemp()
+    previous_storage = base_model.data_manager.storage
+    try:
+        storage = FileStorage(os.path.join(tmp_dir, 'file_storage.json'))
+        storage.save_many(make_places(args.places))
+        base_model.data_manager.storage = storage
+        build = timed(lambda: (place_columns.changed(None), place_columns.search(limit=1)), repeat=1)
+        print(f"{args.places} places, columns and grid built in {build:.1f} ms")
+        latitudes, longitudes = place_columns.columns['latitude'], place_columns.columns['longitude']
+        points = [(random.uniform(-60, 60), random.uniform(-180, 180)) for _ in range(args.points)]
+
+        def box(latitude, longitude):
+            return [Condition('latitude', 'gte', latitude), Condition('longitude', 'gte', longitude),
+                    Condition('latitude', 'lte', latitude + 1.0), Condition('longitude', 'lte', longitude + 1.0)]
+
+        searches = {
+            'nearest 10': (lambda lat, lon: place_columns.nearest(lat, lon, 10),
+                           lambda lat, lon: brute_force_nearest(latitudes, longitudes, lat, lon, 10)),
+            'radius 50 km': (lambda lat, lon: place_columns.nearest(lat, lon, 500, radius_km=50.0),
+                             lambda lat, lon: np.flatnonzero(haversine_km(lat, lon, latitudes, longitudes) <= 50.0)),
+            'box 1 degree': (lambda lat, lon: place_columns.search(box(lat, lon), limit=51),
+                             lambda lat, lon: np.flatnonzero(in_box(latitudes, longitudes, lat, lon, lat + 1.0, lon + 1.0))),
+        }
+        for name, (indexed, scan) in searches.items():
+            index_ms = timed(lambda: [indexed(lat, lon) for lat, lon in points]) / len(points)
+            scan_ms = timed(lambda: [scan(lat, lon) for lat, lon in points], repeat=1) / len(points)
+            print(f"{name:13} index {index_ms:8.3f} ms  brute force {scan_ms:8.3f} ms  x{scan_ms / index_ms:7.1f}")
+    finally:
+        base_model.data_manager.storage = previous_storage
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Compare the memory held by hydrated models with __slots__ and the same objects keeping their attributes in __dict__.
+
+Usage: python -m benchmarks.memory_benchmark [--objects 100000]
+"""
+import argparse
+import gc
+import tracemalloc
+from models.place import Place
+from models.review import Review
+from persistence.records import attributes, hydrate
+from benchmarks.place_search_benchmark import make_places
+from benchmarks.storage_benchmark import make_reviews
+
+def bytes_per_object(cls, records):
+    """
+    Measure the memory allocated by hydrating records, which already hold their values,
+    so only the objects themselves are counted.
+
+    :param cls: The class to hydrate.
+    :param records: The stored attributes of the objects.
+    :return: The number of bytes per object.
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    objs = [hydrate(cls, record) for record in records]
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del objs
+    # The list holding the objects is not part of their cost
+    return (used - 8 * len(records)) / len(records)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--objects', type=int, default=100000)
+    args = parser.parse_args()
+    samples = {Place: make_places(args.objects), Review: make_reviews(args.objects)}
+    print(f"{args.objects} objects of each class, bytes per object excluding the attribute values")
+    for cls, objs in samples.items():
+        records = [attributes(obj) for obj in objs]
+        del objs
+        # The same class without __slots__, as the models were before
+        dict_class = type(f"Dict{cls.__name__}", (), {})
+        with_dict = bytes_per_object(dict_class, records)
+        with_slots = bytes_per_object(cls, records)
+        print(f"{cls.__name__:7} __dict__ {with_dict:7.1f}  __slots__ {with_slots:7.1f}  saved {1 - with_slots / with_dict:6.1%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Compare searching places with the storage scan of Place.query and with the columns of Place.search.
+
+Usage: python -m benchmarks.place_search_benchmark [--places 50000]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from models import base_model
+from models.place import Place, place_columns
+from persistence.file_storage import FileStorage
+from persistence.query import Condition
+from persistence.records import hydrate
+from benchmarks.snapshot_benchmark import timed
+
+def make_places(count):
+    """
+    Build places with random prices, capacities and cities without saving them.
+
+    :param count: The number of places.
+    :return: A list of places.
+    """
+    now = datetime.now()
+    places = []
+    for i in range(count):
+        created_at = now - timedelta(seconds=random.randrange(10 ** 7))
+        place = hydrate(Place, dict(id=uuid.uuid4(), created_at=created_at, updated_at=created_at, name=f"Place {i}",
+                              description="A nice place to stay", address=f"{i} Main St", city_id=f"city-{i % 100}",
+                              latitude=random.uniform(-90, 90), longitude=random.uniform(-180, 180),
+                              host_id=f"host-{i % 1000}", number_of_rooms=random.randint(1, 5),
+                              number_of_bathrooms=random.randint(1, 3), price_per_night=float(random.randint(50, 500)),
+                              max_guests=random.randint(1, 8), amenity_ids=[], review_ids=[]))
+        places.append(place)
+    return places
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--places', type=int, default=50000)
+    args = parser.parse_args()
+    tmp_dir = tempfile.mkdtemp()
+    previous_storage = base_model.data_manager.storage
+    try:
+        storage = FileStorage(os.path.join(tmp_dir, 'file_storage.json'))
+        storage.save_many(make_places(args.places))
+        base_model.data_manager.storage = storage
+        searches = {
+            'price range': [Condition('price_per_night', 'gte', 100.0), Condition('price_per_night', 'lte', 150.0)],
+            'rooms and guests': [Condition('number_of_rooms', 'gte', 4), Condition('max_guests', 'gte', 6),
+                                 Condition('number_of_bathrooms', 'gte', 2)],
+            'city and price': [Condition('city_id', 'eq', "city-7"), Condition('price_per_night', 'lte', 200.0)],
+        }
+        build = timed(lambda: (place_columns.changed(None), place_columns.search(limit=1)), repeat=1)
+        print(f"{args.places} places, columns built in {build:.1f} ms")
+        for name, conditions in searches.items():
+            query = timed(lambda: Place.query(conditions, limit=51))
+            search = timed(lambda: Place.search(conditions, limit=51))
+            matches = len(place_columns.search(conditions))
+            print(f"{name:17} {matches:6} matches  query {query:8.2f} ms  search {search:8.2f} ms  x{query / search:5.1f}")
+    finally:
+        base_model.data_manager.storage = previous_storage
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare the JSON file with the binary snapshot on file size, full loads and single class loads.
+
+Usage: python -m benchmarks.snapshot_benchmark [--reviews 100000]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from persistence.codecs import codec
+from persistence.snapshot import read_snapshot, write_snapshot
+
+def make_store(reviews):
+    """
+    Build the data dictionary of a store with one user per ten reviews and one place per twenty,
+    each review written by a random user about a random place.
+
+    :param reviews: The number of reviews.
+    :return: A data dictionary as held by FileStorage.
+    """
+    now = datetime.now()
+    def base():
+        created_at = now - timedelta(seconds=random.randrange(10 ** 7))
+        return {'id': uuid.uuid4(), 'created_at': created_at, 'updated_at': created_at}
+    users = [dict(base(), email=f"user{i}@example.com", first_name=f"First{i}", last_name=f"Last{i}",
+                  place_ids=[], review_ids=[]) for i in range(reviews // 10)]
+    places = [dict(base(), name=f"Place {i}", description="A nice place to stay", address=f"{i} Main St",
+                   city_id=str(uuid.UUID(int=i % 50)), latitude=random.uniform(-90, 90), longitude=random.uniform(-180, 180),
+                   host_id=str(random.choice(users)['id']), number_of_rooms=random.randint(1, 5),
+                   number_of_bathrooms=random.randint(1, 3), price_per_night=float(random.randint(50, 500)),
+                   max_guests=random.randint(1, 8), amenity_ids=[], review_ids=[]) for i in range(reviews // 20)]
+    review_list = [dict(base(), place_id=str(random.choice(places)['id']), user_id=str(random.choice(users)['id']),
+                        rating=random.randint(1, 5), comment=random.choice(["Great", "Good", "Fine", "Bad"]) + f" stay {i}")
+                   for i in range(reviews)]
+    return {obj_class: {str(record['id']): record for record in records}
+            for obj_class, records in (('User', users), ('Place', places), ('Review', review_list))}
+
+def timed(func, repeat=3):
+    """
+    Run a function several times.
+
+    :param func: The function to run.
+    :param repeat: The number of runs.
+    :return: The duration of the fastest run in milliseconds.
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append((time.perf_counter() - start) * 1000)
+    return min(durations)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reviews', type=int, default=100000)
+    args = parser.parse_args()
+    data = make_store(args.reviews)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        json_path = os.path.join(tmp_dir, 'file_storage.json')
+        snapshot_path = os.path.join(tmp_dir, 'file_storage.hbnb')
+        with open(json_path, 'wb') as file:
+            file.write(codec.dumps(data))
+        with open(snapshot_path, 'wb') as file:
+            write_snapshot(file, data)
+        def load_json():
+            with open(json_path, 'rb') as file:
+                codec.loads(file.read())
+        print(f"{sum(len(objects) for objects in data.values())} objects, {codec.name} codec")
+        print(f"json     {os.path.getsize(json_path) / 1e6:8.1f} MB  full load {timed(load_json):8.1f} ms")
+        print(f"binary   {os.path.getsize(snapshot_path) / 1e6:8.1f} MB  full load {timed(lambda: read_snapshot(snapshot_path)):8.1f} ms"
+              f"  Place only {timed(lambda: read_snapshot(snapshot_path, ['Place'])):8.1f} ms")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Measure how long a storage takes to start and to serve its first point load as the store grows,
+compared with parsing the whole file up front as the storage did before loading lazily.
+
+Usage: python -m benchmarks.startup_benchmark [--reviews 10000 100000]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from models.place import Place
+from persistence.file_storage import FileStorage
+from persistence.wal_storage import WALFileStorage
+from benchmarks.snapshot_benchmark import make_store
+
+def elapsed(start):
+    return (time.perf_counter() - start) * 1000
+
+def run(create, place_id):
+    """
+    Time the startup of a fresh storage, its first point load and the loading of every class.
+
+    :param create: A function creating the storage.
+    :param place_id: The ID of a stored place.
+    :return: A tuple (startup, first load, full load) in milliseconds.
+    """
+    start = time.perf_counter()
+    storage = create()
+    startup = elapsed(start)
+    start = time.perf_counter()
+    storage.load(Place, place_id)
+    first_load = elapsed(start)
+    storage = create()
+    start = time.perf_counter()
+    with storage.lock.write():
+        storage._load_all()
+    full_load = elapsed(start)
+    if hasattr(storage, 'close'):
+        storage.close()
+    return startup, first_load, full_load
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--reviews', type=int, nargs='+', default=[10000, 100000])
+    args = parser.parse_args()
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        for reviews in args.reviews:
+            data = make_store(reviews)
+            place_id = random.choice(list(data['Place']))
+            print(f"{sum(len(objects) for objects in data.values())} objects")
+            for snapshot_format in ('json', 'binary'):
+                path = os.path.join(tmp_dir, f'{reviews}_{snapshot_format}')
+                with open(path, 'wb') as file:
+                    FileStorage(path, snapshot_format)._write_data(file, data)
+                backends = {
+                    'file': lambda: FileStorage(path, snapshot_format),
+                    'wal': lambda: WALFileStorage(path, fsync=False, snapshot_format=snapshot_format),
+                }
+                for name, create in backends.items():
+                    startup, first_load, full_load = run(create, place_id)
+                    print(f"  {name:5} {snapshot_format:7} startup {startup:7.2f} ms  first load(Place) {first_load:8.2f} ms"
+                          f"  every class {full_load:8.2f} ms")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
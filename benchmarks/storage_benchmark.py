@@ -0,0 +1,93 @@
+"""
+Compare FileStorage and SQLiteStorage on point loads, full scans and writes.
+
+Usage: python -m benchmarks.storage_benchmark [--objects 100000]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from models.review import Review
+from persistence.file_storage import FileStorage
+from persistence.sqlite_storage import SQLiteStorage
+from persistence.records import hydrate
+
+def make_reviews(count):
+    """
+    Build review objects without going through the global data manager.
+
+    :param count: The number of reviews to build.
+    :return: A list of Review objects.
+    """
+    reviews = []
+    for i in range(count):
+        review = hydrate(Review, {
+            'id': uuid.uuid4(),
+            'created_at': datetime.now(),
+            'updated_at': datetime.now(),
+            'place_id': str(uuid.uuid4()),
+            'user_id': str(uuid.uuid4()),
+            'rating': i % 5 + 1,
+            'comment': f"Review number {i}",
+        })
+        reviews.append(review)
+    return reviews
+
+def timed(func, repeat=1):
+    """
+    Run a function several times.
+
+    :param func: The function to run.
+    :param repeat: The number of runs.
+    :return: The mean duration of a run in milliseconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def run(storage, reviews, point_loads, writes):
+    """
+    Benchmark one storage backend.
+
+    :param storage: The storage to benchmark.
+    :param reviews: The reviews to seed it with.
+    :param point_loads: The number of point loads to time.
+    :param writes: The number of single object writes to time.
+    :return: A dictionary of mean durations in milliseconds.
+    """
+    storage.save_many(reviews)
+    ids = [review.id for review in random.sample(reviews, point_loads)]
+    ids_iter = iter(ids)
+    results = {'point load': timed(lambda: storage.load(Review, next(ids_iter)), point_loads)}
+    results['full scan'] = timed(lambda: storage.load_all(Review))
+    writes_iter = iter(random.sample(reviews, writes))
+    results['write'] = timed(lambda: storage.save(next(writes_iter)), writes)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--objects', type=int, default=100000)
+    parser.add_argument('--point-loads', type=int, default=1000)
+    parser.add_argument('--writes', type=int, default=20)
+    args = parser.parse_args()
+    reviews = make_reviews(args.objects)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        backends = {
+            'FileStorage': FileStorage(os.path.join(tmp_dir, 'file_storage.json')),
+            'SQLiteStorage': SQLiteStorage(os.path.join(tmp_dir, 'hbnb.sqlite3')),
+        }
+        print(f"{args.objects} objects")
+        for name, storage in backends.items():
+            for operation, ms in run(storage, reviews, args.point_loads, args.writes).items():
+                print(f"{name:15} {operation:12} {ms:10.3f} ms")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
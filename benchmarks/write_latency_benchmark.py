@@ -0,0 +1,71 @@
+"""
+Compare the write latency of rewriting the JSON file on every write with the write-behind log.
+
+Usage: python -m benchmarks.write_latency_benchmark [--objects 20000] [--writes 500]
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from persistence.file_storage import FileStorage
+from persistence.wal_storage import WALFileStorage
+from benchmarks.storage_benchmark import make_reviews
+
+def percentile(durations, fraction):
+    """
+    Get a percentile of sorted durations.
+
+    :param durations: The sorted durations.
+    :param fraction: The percentile as a fraction, such as 0.99.
+    :return: The duration at that percentile.
+    """
+    return durations[min(len(durations) - 1, int(len(durations) * fraction))]
+
+def run(storage, reviews, writes):
+    """
+    Time single object writes on a seeded storage.
+
+    :param storage: The storage to benchmark.
+    :param reviews: The reviews to seed it with.
+    :param writes: The number of writes to time.
+    :return: A tuple (p50, p99, max) in milliseconds.
+    """
+    storage.save_many(reviews)
+    durations = []
+    for review in random.sample(reviews, writes):
+        review.comment = "Updated"
+        start = time.perf_counter()
+        storage.save(review)
+        durations.append((time.perf_counter() - start) * 1000)
+    durations.sort()
+    return percentile(durations, 0.5), percentile(durations, 0.99), durations[-1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--objects', type=int, default=20000)
+    parser.add_argument('--writes', type=int, default=500)
+    args = parser.parse_args()
+    reviews = make_reviews(args.objects)
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        backends = {
+            'file (rewrite)': lambda path: FileStorage(path),
+            'wal fsync': lambda path: WALFileStorage(path, compact_threshold=100),
+            'wal write-behind': lambda path: WALFileStorage(path, compact_threshold=100, flush_interval=0.5),
+        }
+        print(f"{args.objects} objects, {args.writes} writes")
+        for name, create in backends.items():
+            storage = create(os.path.join(tmp_dir, name.replace(' ', '_') + '.json'))
+            p50, p99, worst = run(storage, reviews, args.writes)
+            stats = storage.flush_stats() if hasattr(storage, 'flush_stats') else None
+            print(f"{name:17} p50 {p50:8.3f} ms  p99 {p99:8.3f} ms  max {worst:8.3f} ms"
+                  + (f"  flushes {stats['flushes']}  lag {stats['lag_seconds']:.3f} s" if stats else ''))
+            if hasattr(storage, 'close'):
+                storage.close()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+if __name__ == '__main__':
+    main()
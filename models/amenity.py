@@ -1,10 +1,21 @@
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Related, transactional
+from persistence.indexes import Index
 
 class Amenity(BaseModel):
     """
     Represents an amenity with a name and associated places.
     """
 
+    __indexes__ = (
+        Index('name', unique=True),
+    )
+
+    __slots__ = ('name', 'place_ids')
+
+    places = Related('place_ids', 'models.place.Place')
+    __editable__ = ('name',)
+
+    @transactional
     def __init__(self, name, *args, **kwargs):
         """
         Initialize the Amenity with a name and optional arguments.
@@ -15,46 +26,38 @@ class Amenity(BaseModel):
         """
         super().__init__(*args, **kwargs)
         self.name = name
-        self.places = []
+        self.place_ids = []
         self.save()
 
+    @transactional
     def add_place(self, place):
         """
         Add a place to the amenity. If the place is not already associated with the amenity, it is added.
 
         :param place: The place to add, either as a Place object or a string ID
+        :return: The updated amenity
         """
         from models.place import Place
 
         if isinstance(place, str):
             place = Place.load(place)
-        if place and place not in self.places:
-            self.places.append(place)
-            self.save()
-            place.save()
+        amenity = self._working_copy()
+        if place and Amenity.places.add(amenity, place):
+            amenity.save()
+        return amenity
 
     def update_details(self, name=None):
         """
         Update the details of the Amenity instance.
 
         :param name: The new name of the Amenity. If None, the name will not be updated.
+        :return: The updated amenity
         """
+        amenity = self._working_copy()
         if name:
-            self.name = name
-        self.save()
-
-    def to_dict(self):
-        """
-        Convert the Amenity to a dictionary.
-
-        :return: The Amenity as a dictionary
-        """
-        data = super().to_dict()
-        data.update({
-            'name': self.name,
-            'places': [place.to_dict() for place in self.places]
-        })
-        return data
+            amenity.name = name
+        amenity.save()
+        return amenity
 
     @classmethod
     def from_dict(cls, data):
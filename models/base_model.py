@@ -1,17 +1,134 @@
 import uuid
+import functools
+import importlib
 from datetime import datetime
 from persistence.data_manager import DataManager
-from persistence.file_storage import FileStorage
+from persistence.config import create_storage, identity_map_size
+from persistence.records import attributes, hydrate
 
-# Create an instance of DataManager
-storage = FileStorage()
-data_manager = DataManager(storage)
+# Create an instance of DataManager with the storage backend selected by the environment
+storage = create_storage()
+data_manager = DataManager(storage, identity_map_size())
+
+def transactional(method):
+    """
+    Run a method inside a unit of work so all the saves it triggers are flushed once.
+    When a unit of work is already active, such as during an API request, the method joins it.
+
+    :param method: The method to wrap
+    :return: The wrapped method
+    """
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with data_manager.unit_of_work():
+            return method(*args, **kwargs)
+    return wrapper
+
+def reference_id(related):
+    """
+    Get the ID a related object is referenced by.
+
+    :param related: A model instance, a dictionary with an 'id' key, or an ID
+    :return: The ID as a string
+    """
+    if isinstance(related, dict):
+        return str(related['id'])
+    return str(getattr(related, 'id', related))
+
+class Related:
+    """
+    Descriptor for a one-to-many relation stored as a list of IDs.
+    The parent only keeps the IDs of the related objects, which are loaded through the data manager
+    each time the attribute is read. Assigning a list of objects or IDs replaces the stored IDs.
+    """
+
+    def __init__(self, ids_field, model):
+        """
+        Initialize the Related descriptor.
+
+        :param ids_field: The name of the attribute holding the list of IDs
+        :param model: The dotted path of the related model class, resolved on first use to avoid circular imports
+        """
+        self.ids_field = ids_field
+        self.model = model
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def model_class(self):
+        """
+        Get the related model class.
+
+        :return: The related model class
+        """
+        if isinstance(self.model, str):
+            module_name, class_name = self.model.rsplit('.', 1)
+            self.model = getattr(importlib.import_module(module_name), class_name)
+        return self.model
+
+    def ids(self, obj):
+        """
+        Get a copy of the IDs of the objects related to an instance.
+
+        :param obj: The parent instance
+        :return: A list of IDs
+        """
+        return list(getattr(obj, self.ids_field, None) or [])
+
+    def add(self, obj, related):
+        """
+        Reference a related object from an instance if it is not referenced yet.
+        The list of IDs is replaced rather than appended to, so a list a storage still holds is never changed.
+        The instance is changed in place, so it must not be one the identity map shares: models add
+        references to the instance returned by BaseModel._working_copy().
+
+        :param obj: The parent instance
+        :param related: The related object or its ID
+        :return: True if the reference was added, False if it already existed
+        """
+        related_id = reference_id(related)
+        ids = self.ids(obj)
+        if related_id in ids:
+            return False
+        self.__set__(obj, ids + [related_id])
+        return True
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        model = self.model_class()
+        related, _ = model.load_many(self.ids(obj))
+        return related
+
+    def __set__(self, obj, related):
+        setattr(obj, self.ids_field, [reference_id(item) for item in related or []])
 
 class BaseModel:
     """
     Represents a base model with an ID, created_at timestamp, and updated_at timestamp.
+    Models declare their stored attributes in __slots__, so their instances have no __dict__.
+    The field schema of each model, __fields__, lists the slots of the model and its bases, except
+    the private ones starting with an underscore.
+    Instances the identity map hands out are shared by every thread, so the methods changing a
+    model change a copy of them and return it: callers carry on with the returned instance.
     """
 
+    __fields__ = ('id', 'created_at', 'updated_at')
+    __slots__ = __fields__ + ('_shared',) # _shared is set on the instances the identity map holds
+    __expand__ = () # Relations to_dict() embeds by default
+    __editable__ = () # Fields update() may change
+
+    def __init_subclass__(cls, **kwargs):
+        """
+        Build the field schema of a model from the slots of its class hierarchy.
+
+        :param kwargs: Keyword arguments of the class definition
+        """
+        super().__init_subclass__(**kwargs)
+        cls.__fields__ = tuple(name for klass in reversed(cls.__mro__) for name in klass.__dict__.get('__slots__', ())
+                               if not name.startswith('_'))
+
     def __init__(self, *args, **kwargs):
         """
         Initialize the BaseModel with an ID, created_at timestamp, and updated_at timestamp.
@@ -31,6 +148,40 @@ class BaseModel:
         self.updated_at = datetime.now()
         data_manager.save(self)
 
+    def _working_copy(self):
+        """
+        Get the instance the changes to the BaseModel are made to. An instance the identity map
+        shares with other threads, or one already pending in the current unit of work, is copied,
+        from its pending version if it has one, so other requests never see changes that are not
+        written and a savepoint of the unit of work can still restore the pending version.
+        Other instances belong to their caller and are changed in place.
+
+        :return: The instance to change, then to save
+        """
+        uow = data_manager.current_unit_of_work()
+        pending = uow.lookup(self.__class__, self.id)[1] if uow else None
+        if pending is None and not getattr(self, '_shared', False):
+            return self
+        return hydrate(self.__class__, attributes(self if pending is None else pending))
+
+    def update(self, **changes):
+        """
+        Save the BaseModel with some of its editable fields changed.
+        A BaseModel the identity map shares is left unchanged: the changes are made to a copy, so
+        other requests do not see them before they are written, or at all if writing them fails.
+
+        :param changes: The new values of fields listed in __editable__
+        :return: The updated BaseModel, which callers use from then on
+        """
+        fixed = set(changes) - set(self.__editable__)
+        if fixed:
+            raise ValueError(f"{self.__class__.__name__} fields cannot be updated: {', '.join(sorted(fixed))}")
+        updated = self._working_copy()
+        for name, value in changes.items():
+            setattr(updated, name, value)
+        updated.save()
+        return updated
+
     @classmethod
     def load(cls, obj_id):
         """
@@ -41,6 +192,16 @@ class BaseModel:
         """
         return data_manager.load(cls, obj_id)
 
+    @classmethod
+    def load_many(cls, ids):
+        """
+        Load the BaseModels of this type with several IDs in one pass.
+
+        :param ids: The IDs of the BaseModels to load
+        :return: A (BaseModels, missing) tuple: the loaded BaseModels in the order of their IDs, and the IDs not found
+        """
+        return data_manager.load_many(cls, ids)
+
     @classmethod
     def load_all(cls):
         """
@@ -50,6 +211,50 @@ class BaseModel:
         """
         return data_manager.load_all(cls)
 
+    @classmethod
+    def find_by(cls, field, value):
+        """
+        Load all BaseModels of this type whose indexed field matches a value.
+
+        :param field: The name of a field declared in __indexes__
+        :param value: The value to look up
+        :return: A list of the matching BaseModels
+        """
+        return data_manager.find_by(cls, field, value)
+
+    @classmethod
+    def find_one_by(cls, field, value):
+        """
+        Load the first BaseModel of this type whose indexed field matches a value.
+
+        :param field: The name of a field declared in __indexes__
+        :param value: The value to look up
+        :return: The matching BaseModel, or None
+        """
+        return data_manager.find_one_by(cls, field, value)
+
+    @classmethod
+    def query(cls, conditions=(), after=None, limit=None):
+        """
+        Load a page of the BaseModels of this type, ordered by creation time and ID.
+
+        :param conditions: The Conditions the BaseModels must satisfy
+        :param after: The (created_at, id) position to start after, or None to start at the beginning
+        :param limit: The maximum number of BaseModels to load, or None for all of them
+        :return: A list of the loaded BaseModels
+        """
+        return data_manager.query(cls, conditions, after, limit)
+
+    @classmethod
+    def iterate(cls, conditions=()):
+        """
+        Yield the BaseModels of this type one at a time.
+
+        :param conditions: The Conditions the BaseModels must satisfy
+        :return: An iterator of the loaded BaseModels
+        """
+        return data_manager.iterate(cls, conditions)
+
     @classmethod
     def delete(cls, obj_id):
         """
@@ -61,17 +266,18 @@ class BaseModel:
         if obj:
             data_manager.delete(obj)
 
-    def to_dict(self):
+    def to_dict(self, expand=None, depth=None):
         """
-        Convert the BaseModel to a dictionary.
+        Convert the BaseModel to a dictionary with the serializer compiled for its class.
+        Relations are listed by ID, and the expanded ones are also embedded under their own name.
 
+        :param expand: The names of the relations to expand, or None for those listed in __expand__
+        :param depth: The number of levels of related objects to expand, or None for the default
         :return: The BaseModel as a dictionary
         """
-        return {
-            'id': str(self.id),
-            'created_at': self.created_at.isoformat(),
-            'updated_at': self.updated_at.isoformat()
-        }
+        from models.serializer import DEFAULT_DEPTH, serialize
+
+        return serialize(self, expand, DEFAULT_DEPTH if depth is None else depth)
 
     @classmethod
     def from_dict(cls, data):
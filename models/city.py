@@ -1,11 +1,23 @@
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Related, transactional
 from models.place import Place
+from persistence.indexes import Index
 
 class City(BaseModel):
     """
     Represents a city with a name, country code, and list of places.
     """
 
+    __indexes__ = (
+        Index('country_code'),
+    )
+
+    __slots__ = ('name', 'country_code', 'place_ids')
+
+    places = Related('place_ids', 'models.place.Place')
+    __expand__ = ('places',)
+    __editable__ = ('name',)
+
+    @transactional
     def __init__(self, name, country_code, *args, **kwargs):
         """
         Initialize the City with a name and country code.
@@ -18,35 +30,23 @@ class City(BaseModel):
         super().__init__(*args, **kwargs)
         self.name = name
         self.country_code = country_code
-        self.places = []
+        self.place_ids = []
         self.save()
 
+    @transactional
     def add_place(self, place):
         """
         Add a place to the city.
 
         :param place: The place to add, either as a Place object or a string ID
+        :return: The updated city
         """
         if isinstance(place, str):
             place = Place.load(place)
-        if place and place not in self.places:
-            self.places.append(place)
-            self.save()
-            place.save()
-
-    def to_dict(self):
-        """
-        Convert the City to a dictionary.
-
-        :return: The City as a dictionary
-        """
-        data = super().to_dict()
-        data.update({
-            'name': self.name,
-            "country_code": self.country_code,
-            'places': [place.to_dict() for place in self.places if isinstance(place, Place)]
-        })
-        return data
+        city = self._working_copy()
+        if place and City.places.add(city, place):
+            city.save()
+        return city
 
     @classmethod
     def from_dict(cls, data):
@@ -1,8 +1,9 @@
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Related, transactional
 from models.city import City
+from persistence.indexes import Index
 
-# List of valid ISO 3166-1 alpha-2 country codes
-VALID_ISO_CODES = [
+# Set of valid ISO 3166-1 alpha-2 country codes
+VALID_ISO_CODES = frozenset([
     "AF", "AX", "AL", "DZ", "AS", "AD", "AO", "AI", "AQ", "AG", "AR", "AM", "AW", "AU",
     "AT", "AZ", "BS", "BH", "BD", "BB", "BY", "BE", "BZ", "BJ", "BM", "BT", "BO", "BQ",
     "BA", "BW", "BV", "BR", "IO", "BN", "BG", "BF", "BI", "CV", "KH", "CM", "CA", "KY",
@@ -21,12 +22,23 @@ VALID_ISO_CODES = [
     "LK", "SD", "SR", "SJ", "SE", "CH", "SY", "TW", "TJ", "TZ", "TH", "TL", "TG", "TK",
     "TO", "TT", "TN", "TR", "TM", "TC", "TV", "UG", "UA", "AE", "GB", "US", "UM", "UY",
     "UZ", "VU", "VE", "VN", "VG", "VI", "WF", "EH", "YE", "ZM", "ZW"
-]
+])
 
 class Country(BaseModel):
     """
     Represents a country with a name, ISO 3166-1 alpha-2 code, and list of cities.
     """
+
+    __indexes__ = (
+        Index('code', unique=True),
+    )
+
+    __slots__ = ('name', 'code', 'city_ids')
+
+    cities = Related('city_ids', 'models.city.City')
+    __expand__ = ('cities',)
+
+    @transactional
     def __init__(self, name, code, *args, **kwargs):
         """
         Initialize the Country with a name and ISO 3166-1 alpha-2 code.
@@ -37,39 +49,27 @@ class Country(BaseModel):
         :param kwargs: Optional keyword arguments
         """
         super().__init__(*args, **kwargs)
-        if code not in VALID_ISO_CODES:
+        if not isinstance(code, str) or code not in VALID_ISO_CODES:
             raise ValueError(f"Invalid ISO 3166-1 alpha-2 code: {code}")
         self.name = name
         self.code = code
-        self.cities = [City.load(city) if isinstance(city, str) else city for city in kwargs.get('cities', [])]
+        self.cities = kwargs.get('cities', [])
         self.save()
 
+    @transactional
     def add_city(self, city):
         """
         Add a city to the country.
 
         :param city: The city to add
+        :return: The updated country
         """
         if isinstance(city, str):
             city = City.load(city)
-        if city and city not in self.cities:
-            self.cities.append(city)
-            self.save()
-            city.save()
-
-    def to_dict(self):
-        """
-        Convert the Country to a dictionary.
-
-        :return: The Country as a dictionary
-        """
-        data = super().to_dict()
-        data.update({
-            'name': self.name,
-            'code': self.code,
-            'cities': [city.to_dict() for city in self.cities if isinstance(city, City)]
-        })
-        return data
+        country = self._working_copy()
+        if city and Country.cities.add(country, city):
+            country.save()
+        return country
 
     @classmethod
     def from_dict(cls, data):
@@ -91,7 +91,8 @@ class Country(BaseModel):
     @classmethod
     def load_by_code(cls, code):
         '''
-        Load a country by its ISO 3166-1 alpha-2 code.
+        Load a country by its ISO 3166-1 alpha-2 code using the code index of the storage.
         '''
-        countries = cls.load_all()
-        return next((country for country in countries if country.code == code), None)
+        if not isinstance(code, str) or code not in VALID_ISO_CODES:
+            return None
+        return cls.find_one_by('code', code)
@@ -1,11 +1,29 @@
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Related, data_manager, transactional
 from models.review import Review
 from models.amenity import Amenity
+from persistence.columnar import ColumnStore
+from persistence.indexes import Index
 
 class Place(BaseModel):
     """
     Represents a place with various attributes such as name, description, address, etc.
     """
+
+    __indexes__ = (
+        Index('host_id'),
+        Index('city_id'),
+    )
+
+    __slots__ = ('name', 'description', 'address', 'city_id', 'latitude', 'longitude', 'host_id', 'number_of_rooms',
+                 'number_of_bathrooms', 'price_per_night', 'max_guests', 'amenity_ids', 'review_ids')
+
+    reviews = Related('review_ids', 'models.review.Review')
+    amenities = Related('amenity_ids', 'models.amenity.Amenity')
+    __expand__ = ('reviews', 'amenities')
+    __editable__ = ('name', 'description', 'address', 'city_id', 'latitude', 'longitude', 'host_id', 'number_of_rooms',
+                    'number_of_bathrooms', 'price_per_night', 'max_guests')
+
+    @transactional
     def __init__(self, name, description, address, city_id, latitude, longitude, host_id, number_of_rooms, number_of_bathrooms, price_per_night, max_guests, amenity_ids, *args, **kwargs):
         """
         Initialize the Place with various attributes.
@@ -38,38 +56,41 @@ class Place(BaseModel):
         self.price_per_night = price_per_night
         self.max_guests = max_guests
         self.amenity_ids = amenity_ids
-        self.reviews = [] # List of Review instances
-        self.amenities = [] # List of Amenity instances
-        self.host = None
+        self.review_ids = [] # IDs of the reviews of the place
         self.save()
 
+    @transactional
     def add_review(self, review):
         """
         Add a review to the place.
 
         :param review: The review to add
+        :return: The updated place
         """
         if isinstance(review, str):
             review = Review.load(review)
         if str(review.user_id) == str(self.host_id):
             raise ValueError("A host cannot review their own listing")
-        if review and review not in self.reviews:
-            self.reviews.append(review)
-            self.save()
-            review.save()
+        place = self._working_copy()
+        if review and Place.reviews.add(place, review):
+            place.save()
+        return place
 
+    @transactional
     def add_amenity(self, amenity):
         """
         Add an amenity to the place.
 
         :param amenity: The amenity to add
+        :return: The updated place
         """
         if isinstance(amenity, str):
             amenity = Amenity.load(amenity)
-        if amenity and amenity not in self.amenities:
-            self.amenities.append(amenity)
-            self.save()
-            amenity.add_place(self)
+        place = self._working_copy()
+        if amenity and Place.amenities.add(place, amenity):
+            place.save()
+            amenity.add_place(place)
+        return place
 
     def update_details(self, name=None, description=None, address=None, city_id=None, latitude=None, longitude=None, host_id=None, number_of_rooms=None, number_of_bathrooms=None, price_per_night=None, max_guests=None, amenity_ids=None):
         """
@@ -87,57 +108,73 @@ class Place(BaseModel):
         :param price_per_night: The new price per night to stay at the place
         :param max_guests: The new maximum number of guests the place can accommodate
         :param amenity_ids: The new IDs of the amenities the place has
+        :return: The updated place
         """
+        if host_id and self.host_id != host_id:
+            raise ValueError("Listing already has a host")
+        place = self._working_copy()
         if name:
-            self.name = name
+            place.name = name
         if description:
-            self.description = description
+            place.description = description
         if address:
-            self.address = address
+            place.address = address
         if city_id:
-            self.city_id = city_id
+            place.city_id = city_id
         if latitude:
-            self.latitude = latitude
+            place.latitude = latitude
         if longitude:
-            self.longitude = longitude
-        if host_id and self.host_id != host_id:
-            raise ValueError("Listing already has a host")
+            place.longitude = longitude
         if number_of_rooms:
-            self.number_of_rooms = number_of_rooms
+            place.number_of_rooms = number_of_rooms
         if number_of_bathrooms:
-            self.number_of_bathrooms = number_of_bathrooms
+            place.number_of_bathrooms = number_of_bathrooms
         if price_per_night:
-            self.price_per_night = price_per_night
+            place.price_per_night = price_per_night
         if max_guests:
-            self.max_guests = max_guests
+            place.max_guests = max_guests
         if amenity_ids is not None:
-            self.amenity_ids = amenity_ids
-        self.save()
+            place.amenity_ids = amenity_ids
+        place.save()
+        return place
 
-    def to_dict(self):
+    @classmethod
+    def search(cls, conditions=(), after=None, limit=None):
         """
-        Convert the Place to a dictionary.
+        Load a page of places, ordered by creation time and ID. The conditions are evaluated over the
+        columns of place_columns, so only the matching places are loaded. Conditions the columns cannot
+        evaluate, and pending places in the current unit of work, fall back to query().
 
-        :return: The Place as a dictionary
+        :param conditions: The Conditions the places must satisfy
+        :param after: The (created_at, id) position to start after, or None to start at the beginning
+        :param limit: The maximum number of places to load, or None for all of them
+        :return: A list of the loaded places
         """
-        data = super().to_dict()
-        data.update({
-            'name': self.name,
-            'description': self.description,
-            'address': self.address,
-            'city_id': str(self.city_id) if self.city_id else None,
-            'latitude': self.latitude,
-            'longitude': self.longitude,
-            'host_id': str(self.host_id) if self.host_id else None,
-            'number_of_rooms': self.number_of_rooms,
-            'number_of_bathrooms': self.number_of_bathrooms,
-            'price_per_night': self.price_per_night,
-            'max_guests': self.max_guests,
-            'amenity_ids': [str(amenity_id) for amenity_id in self.amenity_ids] if self.amenity_ids else None,
-            'reviews': [review.to_dict() for review in self.reviews if isinstance(review, Review)],
-            'amenities': [amenity.to_dict() for amenity in self.amenities] if hasattr(self, 'amenities') and self.amenities else None
-        })
-        return data
+        uow = data_manager.current_unit_of_work()
+        if not place_columns.supports(conditions) or (uow and uow.has_pending(cls)):
+            return cls.query(conditions, after, limit)
+        places, _ = cls.load_many(place_columns.search(conditions, after, limit))
+        return places
+
+    @classmethod
+    def nearest(cls, latitude, longitude, limit, conditions=(), radius_km=None):
+        """
+        Load the places closest to a point, nearest first, from the spatial index of place_columns.
+        Places pending in the current unit of work are not found until it is committed.
+
+        :param latitude: The latitude of the point
+        :param longitude: The longitude of the point
+        :param limit: The maximum number of places to load
+        :param conditions: The Conditions the places must satisfy, on fields of place_columns
+        :param radius_km: The greatest distance of the places in kilometers, or None for no limit
+        :return: A list of (place, distance in kilometers) pairs
+        """
+        if not place_columns.supports(conditions):
+            raise ValueError("Nearest place searches only filter on the fields of place_columns")
+        nearest = place_columns.nearest(latitude, longitude, limit, conditions, radius_km)
+        places, _ = cls.load_many(place_id for place_id, _ in nearest)
+        distances = {str(place_id): distance for place_id, distance in nearest}
+        return [(place, distances[str(place.id)]) for place in places]
 
     @classmethod
     def from_dict(cls, data):
@@ -167,3 +204,8 @@ class Place(BaseModel):
         place.reviews = [Review.from_dict(review) if isinstance(review, dict) else review for review in data.get('reviews', [])]
         place.amenities = [Amenity.from_dict(amenity) if isinstance(amenity, dict) else amenity for amenity in data.get('amenities', [])]
         return place
+
+# Search columns and spatial index of the places, kept in sync with the storage
+place_columns = ColumnStore(data_manager, Place,
+                            numeric=('price_per_night', 'max_guests', 'number_of_rooms', 'number_of_bathrooms', 'latitude', 'longitude'),
+                            encoded=('city_id', 'host_id'), spatial=('latitude', 'longitude'))
@@ -1,10 +1,20 @@
-from models.base_model import BaseModel
+from models.base_model import BaseModel, transactional
+from persistence.indexes import Index
 
 class Review(BaseModel):
     """
     Represents a review with a place ID, user ID, rating, and comment.
     """
 
+    __indexes__ = (
+        Index('place_id'),
+        Index('user_id'),
+    )
+
+    __slots__ = ('place_id', 'user_id', 'rating', 'comment')
+    __editable__ = ('rating', 'comment')
+
+    @transactional
     def __init__(self, place_id, user_id, rating, comment, *args, **kwargs):
         """
         Initialize the Review with a place ID, user ID, rating, comment, and optional arguments.
@@ -21,7 +31,6 @@ class Review(BaseModel):
         self.user_id = user_id
         self.rating = rating
         self.comment = comment
-        self.review_author = None
         self.save()
 
     def update_details(self, rating=None, comment=None):
@@ -30,27 +39,15 @@ class Review(BaseModel):
 
         :param rating: The new rating for the review
         :param comment: The new comment for the review
+        :return: The updated review
         """
+        review = self._working_copy()
         if rating:
-            self.rating = rating
+            review.rating = rating
         if comment:
-            self.comment = comment
-        self.save()
-
-    def to_dict(self):
-        """
-        Convert the Review to a dictionary.
-
-        :return: The Review as a dictionary
-        """
-        data = super().to_dict()
-        data.update({
-            'place_id': str(self.place_id),
-            'user_id': str(self.user_id),
-            'rating': self.rating,
-            'comment': self.comment
-        })
-        return data
+            review.comment = comment
+        review.save()
+        return review
 
     @classmethod
     def from_dict(cls, data):
@@ -0,0 +1,188 @@
+from models.base_model import Related
+from persistence.instrumentation import serializing
+
+DEFAULT_DEPTH = 3 # Levels of related objects to_dict() expands, enough for a country down to the reviews of its places
+
+def load_batch(cls, ids):
+    """
+    Load the objects of a batch of IDs in one pass, each distinct ID once.
+
+    :param cls: The model class of the objects
+    :param ids: The IDs, possibly repeated
+    :return: A dictionary mapping the ID of every object found to the object
+    """
+    objs, _ = cls.load_many(dict.fromkeys(ids))
+    return {str(obj.id): obj for obj in objs}
+
+class Serializer:
+    """
+    Serializer turns instances of a model class into response-ready dictionaries in one pass.
+    It is compiled once per class from the field schema of the class: the reads and conversions of the
+    fields are generated as the source of a function, so serializing an object makes no hasattr checks
+    and no calls to other to_dict methods. Relations are returned as the list of IDs the object stores,
+    and added as nested objects under their own name when they are expanded.
+    """
+
+    def __init__(self, cls):
+        """
+        Compile the serializer of a model class.
+
+        :param cls: The model class
+        """
+        self.cls = cls
+        self.relations = {name: attr for klass in reversed(cls.__mro__) for name, attr in vars(klass).items()
+                          if isinstance(attr, Related)}
+        self.ids_fields = {relation.ids_field for relation in self.relations.values()}
+        self._writers = {}
+        self.write = self.writer()
+
+    def _expression(self, name):
+        """
+        Get the source of the expression reading a field of an object for a response.
+
+        :param name: The name of the field
+        :return: The source of the expression, reading the object from obj
+        """
+        if name == 'id':
+            return 'str(obj.id)'
+        if name in ('created_at', 'updated_at'):
+            return f'obj.{name}.isoformat()'
+        if name in self.ids_fields:
+            # Copied, so a response never shares the list the storage holds
+            return f'list(obj.{name} or ())'
+        return f'obj.{name}'
+
+    def writer(self, only=None):
+        """
+        Get the compiled function serializing the fields of an object, without its relations.
+
+        :param only: The names of the fields to serialize, or None for all of them
+        :return: A function taking an object and returning a new dictionary
+        """
+        key = None if only is None else tuple(only)
+        writer = self._writers.get(key)
+        if writer is None:
+            names = [name for name in self.cls.__fields__ if only is None or name in only]
+            items = ''.join(f'\n        {name!r}: {self._expression(name)},' for name in names)
+            source = f'def write(obj):\n    return {{{items}\n    }}\n'
+            namespace = {}
+            exec(compile(source, f'<serializer of {self.cls.__name__}>', 'exec'), namespace)
+            writer = self._writers[key] = namespace['write']
+        return writer
+
+    def relation_names(self, depth):
+        """
+        Get the names of the relations that can be expanded from this class within a number of levels.
+
+        :param depth: The number of levels
+        :return: A set of relation names
+        """
+        names = set()
+        if depth > 0:
+            for name, relation in self.relations.items():
+                names.add(name)
+                names |= serializer(relation.model_class()).relation_names(depth - 1)
+        return names
+
+    def related_classes(self, depth):
+        """
+        Get the model classes whose objects can be embedded in a representation of this class within
+        a number of levels, such as the places expanded from an amenity.
+
+        :param depth: The number of levels
+        :return: A set of model classes, which includes this class when a relation leads back to it
+        """
+        classes = set()
+        if depth > 0:
+            for relation in self.relations.values():
+                model = relation.model_class()
+                classes.add(model)
+                classes |= serializer(model).related_classes(depth - 1)
+        return classes
+
+    def serialize_many(self, objs, expand=(), depth=1, only=None):
+        """
+        Serialize objects and the related objects they expand, level by level.
+        The objects of each expanded relation are loaded in one batch for all the objects, and each
+        related object is serialized once however many objects reference it.
+
+        :param objs: The objects, all of this class
+        :param expand: The names of the relations to expand at every level
+        :param depth: The number of levels of related objects to expand
+        :param only: The names of the fields and relations to return, or None for all of them
+        :return: A list of dictionaries, in the order of the objects
+        """
+        write = self.write if only is None else self.writer(only)
+        rows = [write(obj) for obj in objs]
+        if depth > 0:
+            for name, relation in self.relations.items():
+                if name not in expand or (only is not None and name not in only):
+                    continue
+                ids = [relation.ids(obj) for obj in objs]
+                model = relation.model_class()
+                loaded = load_batch(model, [related_id for obj_ids in ids for related_id in obj_ids])
+                related = dict(zip(loaded, serializer(model).serialize_many(list(loaded.values()), expand, depth - 1)))
+                for row, obj_ids in zip(rows, ids):
+                    row[name] = [related[related_id] for related_id in obj_ids if related_id in related]
+        return rows
+
+    def serialize(self, obj, expand=None, depth=DEFAULT_DEPTH, only=None):
+        """
+        Serialize an object and the related objects it expands.
+
+        :param obj: The object
+        :param expand: The names of the relations to expand at every level, or None to expand the
+                       relations listed in the __expand__ attribute of each class
+        :param depth: The number of levels of related objects to expand
+        :param only: The names of the fields and relations to return, or None for all of them
+        :return: The object as a dictionary
+        """
+        data = (self.write if only is None else self.writer(only))(obj)
+        if depth > 0:
+            expanded = getattr(self.cls, '__expand__', ()) if expand is None else expand
+            for name, relation in self.relations.items():
+                if name in expanded and (only is None or name in only):
+                    related = serializer(relation.model_class())
+                    data[name] = [related.serialize(item, expand, depth - 1) for item in relation.__get__(obj)]
+        return data
+
+_serializers = {}
+
+def serializer(cls):
+    """
+    Get the serializer of a model class, compiling it on first use.
+
+    :param cls: The model class
+    :return: The Serializer of the class
+    """
+    compiled = _serializers.get(cls)
+    if compiled is None:
+        compiled = _serializers[cls] = Serializer(cls)
+    return compiled
+
+def serialize(obj, expand=None, depth=DEFAULT_DEPTH, only=None):
+    """
+    Serialize a model instance with the serializer of its class.
+
+    :param obj: The model instance
+    :param expand: The names of the relations to expand, or None for the defaults of each class
+    :param depth: The number of levels of related objects to expand
+    :param only: The names of the fields and relations to return, or None for all of them
+    :return: The instance as a dictionary
+    """
+    with serializing():
+        return serializer(obj.__class__).serialize(obj, expand, depth, only)
+
+def serialize_many(cls, objs, expand=(), depth=1, only=None):
+    """
+    Serialize instances of a model class, loading the objects of each expanded relation in one batch.
+
+    :param cls: The model class
+    :param objs: The instances
+    :param expand: The names of the relations to expand
+    :param depth: The number of levels of related objects to expand
+    :param only: The names of the fields and relations to return, or None for all of them
+    :return: A list of dictionaries, in the order of the instances
+    """
+    with serializing():
+        return serializer(cls).serialize_many(objs, expand, depth, only)
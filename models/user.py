@@ -1,14 +1,25 @@
-from models.base_model import BaseModel
+from models.base_model import BaseModel, Related, transactional
 from models.place import Place
 from models.review import Review
+from persistence.indexes import Index, normalize_email
 
 class User(BaseModel):
     """
     Represents a user with an email, password, first name, last name, city ID, country ID, places, and reviews.
     """
 
-    user_email = {} # class variable to store email to user mapping
+    __indexes__ = (
+        Index('email', unique=True, normalize=normalize_email),
+    )
 
+    __slots__ = ('email', 'first_name', 'last_name', 'city_id', 'country_code', 'place_ids', 'review_ids')
+
+    places = Related('place_ids', 'models.place.Place')
+    reviews = Related('review_ids', 'models.review.Review')
+    __expand__ = ('places', 'reviews')
+    __editable__ = ('email', 'first_name', 'last_name', 'city_id', 'country_code')
+
+    @transactional
     def __init__(self, email, first_name, last_name, city_id=None, country_code=None, *args, **kwargs):
         """
         Initialize the User with an email, password, first name, last name, optional city ID, optional country ID, and optional arguments.
@@ -28,9 +39,8 @@ class User(BaseModel):
         self.last_name = last_name
         self.city_id = city_id
         self.country_code = country_code
-        self.places = [] # list of places associated with the user
-        self.reviews = [] # list of reviews associated with the user
-        User.user_email[email] = self
+        self.place_ids = [] # IDs of the places associated with the user
+        self.review_ids = [] # IDs of the reviews associated with the user
         self.save()
 
     @classmethod
@@ -41,34 +51,48 @@ class User(BaseModel):
         :param email: The email to check
         :return: True if the email is unique, False otherwise
         """
-        users = cls.load_all()
-        return not any(user.email == email for user in users)
+        return cls.load_by_email(email) is None
+
+    @classmethod
+    def load_by_email(cls, email):
+        """
+        Load a user by email address using the email index of the storage.
+        Email addresses are compared case-insensitively.
+
+        :param email: The email address to look up
+        :return: The user with that email address, or None
+        """
+        return cls.find_one_by('email', email)
 
+    @transactional
     def add_place(self, place):
         """
         Add a place to the user. If the place is not already associated with the user, it is added.
 
         :param place: The place to add, either as a Place object or a string ID
+        :return: The updated user
         """
         if isinstance(place, str):
             place = Place.load(place)
-        if place and place not in self.places:
-            self.places.append(place)
-            self.save()
-            place.save()
+        user = self._working_copy()
+        if place and User.places.add(user, place):
+            user.save()
+        return user
 
+    @transactional
     def add_review(self, review):
         """
         Add a review to the user. If the review is not already associated with the user, it is added.
 
         :param review: The review to add, either as a Review object or a string ID
+        :return: The updated user
         """
         if isinstance(review, str):
             review = Review.load(review)
-        if review and review not in self.reviews:
-            self.reviews.append(review)
-            self.save()
-            review.save()  
+        user = self._working_copy()
+        if review and User.reviews.add(user, review):
+            user.save()
+        return user
 
     def update_details(self, email=None, first_name=None, last_name=None, city_id=None, country_code=None):
         """
@@ -80,36 +104,21 @@ class User(BaseModel):
         :param last_name: The new last name of the user
         :param city_id: The new city ID of the user
         :param country_id: The new country ID of the user
+        :return: The updated user
         """
+        user = self._working_copy()
         if email:
-            self.email = email
+            user.email = email
         if first_name:
-            self.first_name = first_name
+            user.first_name = first_name
         if last_name:
-            self.last_name = last_name
+            user.last_name = last_name
         if city_id:
-            self.city_id = city_id
+            user.city_id = city_id
         if country_code:
-            self.country_code = country_code
-        self.save()
-
-    def to_dict(self):
-        """
-        Convert the User to a dictionary.
-
-        :return: The User as a dictionary
-        """
-        data = super().to_dict()
-        data.update({
-            'email': self.email,
-            'first_name': self.first_name,
-            'last_name': self.last_name,
-            'city_id': str(self.city_id) if hasattr(self, 'city_id') and self.city_id else None,
-            'country_code': self.country_code if hasattr(self, 'country_code') and self.country_code else None,
-            'places': [place.to_dict() for place in self.places if isinstance(place, Place)],
-            'reviews': [review.to_dict() for review in self.reviews if isinstance(review, Review)]
-        })
-        return data
+            user.country_code = country_code
+        user.save()
+        return user
 
     @classmethod
     def from_dict(cls, data):
@@ -0,0 +1,114 @@
+import json
+import os
+import uuid
+from datetime import date, datetime
+
+def _encode_default(value):
+    """
+    Encode the values JSON has no type for: UUIDs as strings, dates as ISO 8601 strings.
+
+    :param value: The value to encode.
+    :return: A JSON-compatible value.
+    :raises TypeError: If the value has no JSON encoding.
+    """
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {value.__class__.__name__} is not JSON serializable")
+
+class JSONCodec:
+    """
+    JSONCodec serializes with the json module of the standard library.
+    Every codec produces the same compact UTF-8 JSON, encodes UUIDs as strings and dates in ISO 8601,
+    and never writes a line break inside a document.
+    """
+
+    name = 'json'
+
+    def __init__(self):
+        self._encoder = json.JSONEncoder(default=_encode_default, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps(self, obj):
+        """
+        Serialize an object.
+
+        :param obj: The object to serialize.
+        :return: The JSON document as bytes.
+        """
+        return self._encoder.encode(obj).encode()
+
+    def loads(self, data):
+        """
+        Deserialize a JSON document.
+
+        :param data: The JSON document as bytes or str.
+        :return: The deserialized object.
+        """
+        return json.loads(data)
+
+class OrjsonCodec(JSONCodec):
+    """
+    OrjsonCodec serializes with orjson, which encodes UUIDs and datetimes natively.
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+
+    def dumps(self, obj):
+        return self._orjson.dumps(obj, default=_encode_default)
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+class MsgspecCodec(JSONCodec):
+    """
+    MsgspecCodec serializes with msgspec, which encodes UUIDs and datetimes natively.
+    """
+
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+        self._encoder = msgspec.json.Encoder(enc_hook=_encode_default)
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj)
+
+    def loads(self, data):
+        return self._decoder.decode(data)
+
+# Codecs selectable with the HBNB_JSON_CODEC environment variable, fastest first
+CODECS = {
+    'orjson': OrjsonCodec,
+    'msgspec': MsgspecCodec,
+    'json': JSONCodec,
+}
+
+def create_codec(name=None):
+    """
+    Create a codec by name. 'auto' picks the fastest installed one.
+
+    :param name: 'auto', 'orjson', 'msgspec' or 'json'. Defaults to HBNB_JSON_CODEC, or 'auto'.
+    :return: A codec instance.
+    :raises ValueError: If the codec is unknown or its library is not installed.
+    """
+    name = name or os.environ.get('HBNB_JSON_CODEC', 'auto')
+    if name == 'auto':
+        for codec_class in CODECS.values():
+            try:
+                return codec_class()
+            except ImportError:
+                continue
+    if name not in CODECS:
+        raise ValueError(f"Unknown JSON codec: {name}")
+    try:
+        return CODECS[name]()
+    except ImportError:
+        raise ValueError(f"JSON codec {name} is not installed")
+
+codec = create_codec()
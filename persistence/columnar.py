@@ -0,0 +1,372 @@
+import threading
+import numpy as np
+from persistence.indexes import declared_indexes, normalize_value
+from persistence.spatial import HALF_CIRCUMFERENCE_KM, KM_PER_DEGREE, GridIndex, bounding_box, haversine_km, in_box
+
+INITIAL_CAPACITY = 1024
+
+def _number(value):
+    """
+    Convert a stored value to a float the way Condition compares numbers.
+
+    :param value: The stored value.
+    :return: The value as a float, or NaN if it is missing or not a number.
+    """
+    if value is None:
+        return np.nan
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+class ColumnStore:
+    """
+    ColumnStore keeps some attributes of every stored object of a class in NumPy arrays, one row
+    per object, so filters are evaluated over whole columns at once and only the matching objects
+    are loaded. Numeric fields are float columns where NaN stands for a missing value, and fields
+    compared for equality, such as foreign keys, are dictionary-encoded: each row holds the code of
+    its value in a list of the distinct values.
+    The arrays are built from the storage on first use and kept in sync with the changes reported
+    by the data manager, including those of other processes sharing the storage. Only committed
+    objects are searched.
+    With a pair of spatial fields, a GridIndex over their coordinates also answers bounding-box,
+    radius and nearest-neighbour searches without looking at the objects far from the area searched.
+    """
+
+    def __init__(self, data_manager, cls, numeric=(), encoded=(), spatial=None, cell_degrees=0.1):
+        """
+        Initialize an empty ColumnStore and register it with the data manager.
+
+        :param data_manager: The DataManager reporting the changes.
+        :param cls: The model class whose objects are stored.
+        :param numeric: The names of the numeric fields.
+        :param encoded: The names of the fields compared for equality.
+        :param spatial: The names of the numeric latitude and longitude fields to index, or None.
+        :param cell_degrees: The size of the cells of the spatial index, in degrees.
+        """
+        self.data_manager = data_manager
+        self.cls = cls
+        self.numeric = tuple(numeric)
+        self.encoded = tuple(encoded)
+        self.spatial = tuple(spatial) if spatial else None
+        self.grid = GridIndex(cell_degrees) if spatial else None
+        self.built = False
+        self.dirty = set()
+        self._lock = threading.Lock()
+        self._dirty_lock = threading.Lock()
+        self._clear()
+        data_manager.add_change_observer(self.changed)
+
+    def _clear(self, capacity=INITIAL_CAPACITY):
+        """
+        Allocate empty columns.
+
+        :param capacity: The number of rows to allocate.
+        """
+        self.rows = {}
+        self.free = []
+        self.size = 0
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.keys = np.zeros(capacity, dtype='U36')
+        self.created = np.zeros(capacity, dtype='datetime64[us]')
+        self.columns = {field: np.full(capacity, np.nan) for field in self.numeric}
+        self.codes = {field: np.full(capacity, -1, dtype=np.int32) for field in self.encoded}
+        self.dictionaries = {field: {} for field in self.encoded}
+        self._rebuild_grid()
+
+    def _rebuild_grid(self):
+        if self.grid:
+            latitude, longitude = self.spatial
+            size = self.size
+            self.grid.rebuild(self.columns[latitude][:size], self.columns[longitude][:size], self.alive[:size])
+
+    def _normalize(self, field):
+        index = declared_indexes(self.cls).get(field)
+        return index.normalize if index else normalize_value
+
+    def _grow(self, capacity):
+        """
+        Enlarge every column to a new capacity.
+
+        :param capacity: The new number of rows.
+        """
+        def grown(column, fill):
+            new = np.full(capacity, fill, dtype=column.dtype)
+            new[:len(column)] = column
+            return new
+        self.alive = grown(self.alive, False)
+        self.keys = grown(self.keys, '')
+        self.created = grown(self.created, np.datetime64(0, 'us'))
+        self.columns = {field: grown(column, np.nan) for field, column in self.columns.items()}
+        self.codes = {field: grown(column, -1) for field, column in self.codes.items()}
+
+    def _code(self, field, value):
+        """
+        Get the code of a value in the dictionary of a field, adding the value if it is new.
+
+        :param field: The name of the encoded field.
+        :param value: The stored value.
+        :return: The code, or -1 if the value is missing.
+        """
+        key = self._normalize(field)(value)
+        if key is None:
+            return -1
+        dictionary = self.dictionaries[field]
+        code = dictionary.get(key)
+        if code is None:
+            code = dictionary[key] = len(dictionary)
+        return code
+
+    def _put(self, obj):
+        """
+        Store the attributes of an object in its row, taking a free row if it has none.
+
+        :param obj: The object.
+        """
+        obj_id = str(obj.id)
+        row = self.rows.get(obj_id)
+        if self.grid:
+            latitude, longitude = self.spatial
+            position = (self.columns[latitude][row], self.columns[longitude][row]) if row is not None else None
+        if row is None:
+            if self.free:
+                row = self.free.pop()
+            else:
+                if self.size == len(self.alive):
+                    self._grow(2 * len(self.alive))
+                row = self.size
+                self.size += 1
+            self.rows[obj_id] = row
+        if len(obj_id) > self.keys.dtype.itemsize // 4:
+            self.keys = self.keys.astype(f'U{len(obj_id)}')
+        self.alive[row] = True
+        self.keys[row] = obj_id
+        self.created[row] = np.datetime64(obj.created_at, 'us')
+        for field in self.numeric:
+            self.columns[field][row] = _number(getattr(obj, field, None))
+        for field in self.encoded:
+            self.codes[field][row] = self._code(field, getattr(obj, field, None))
+        if self.grid and position != (self.columns[latitude][row], self.columns[longitude][row]):
+            self.grid.move(row)
+
+    def _remove(self, obj_id):
+        """
+        Free the row of an object.
+
+        :param obj_id: The ID of the object.
+        """
+        row = self.rows.pop(obj_id, None)
+        if row is not None:
+            self.alive[row] = False
+            self.free.append(row)
+
+    def _build(self):
+        """
+        Fill the columns with every stored object of the class, one column at a time.
+        """
+        objs = list(self.data_manager.storage.iterate(self.cls))
+        ids = [str(obj.id) for obj in objs]
+        size = len(ids)
+        self._clear(size + INITIAL_CAPACITY)
+        if not ids:
+            return
+        self.rows = dict(zip(ids, range(size)))
+        self.size = size
+        self.alive[:size] = True
+        self.keys = self.keys.astype(f'U{max(36, max(map(len, ids)))}')
+        self.keys[:size] = ids
+        self.created[:size] = np.array([obj.created_at for obj in objs], dtype='datetime64[us]')
+        for field in self.numeric:
+            values = [getattr(obj, field, None) for obj in objs]
+            try:
+                self.columns[field][:size] = np.array(values, dtype=float)
+            except (TypeError, ValueError):
+                self.columns[field][:size] = [_number(value) for value in values]
+        for field in self.encoded:
+            normalize = self._normalize(field)
+            dictionary = self.dictionaries[field]
+            keys = [normalize(getattr(obj, field, None)) for obj in objs]
+            self.codes[field][:size] = [-1 if key is None else dictionary.setdefault(key, len(dictionary)) for key in keys]
+        self._rebuild_grid()
+
+    def changed(self, changes):
+        """
+        Record the objects written, to update their rows before the next search.
+        Called by the data manager.
+
+        :param changes: A list of (class name, ID) pairs, or None if any object may have changed.
+        """
+        with self._dirty_lock:
+            if changes is None:
+                self.built = False
+                return
+            self.dirty.update(obj_id for obj_class, obj_id in changes if obj_class == self.cls.__name__)
+
+    def refresh(self):
+        """
+        Build the columns if needed and update the rows of the objects written since the last search.
+        The lock must be held.
+        """
+        # Picks up the writes of other processes sharing the storage
+        self.data_manager.collection_version(self.cls)
+        with self._dirty_lock:
+            rebuild = not self.built
+            self.built = True
+            dirty, self.dirty = self.dirty, set()
+        if rebuild:
+            self._build()
+        storage = self.data_manager.storage
+        loaded = storage.load_many(self.cls, dirty) if dirty else {}
+        for obj_id in dirty:
+            obj = loaded.get(str(obj_id))
+            if obj is None:
+                self._remove(obj_id)
+            else:
+                self._put(obj)
+        if self.grid and self.grid.needs_rebuild():
+            self._rebuild_grid()
+
+    def supports(self, conditions):
+        """
+        Check whether conditions can be evaluated over the columns.
+
+        :param conditions: The Conditions.
+        :return: True if every condition is an equality on an encoded field or a comparison on a numeric one.
+        """
+        return all(condition.field in self.encoded if condition.op == 'eq' else condition.field in self.numeric
+                   for condition in conditions)
+
+    def _mask(self, conditions, rows=None):
+        """
+        Evaluate conditions over rows.
+
+        :param conditions: The Conditions, all supported.
+        :param rows: An array of rows, or None for every row.
+        :return: A boolean array selecting the rows in use that satisfy the conditions.
+        """
+        rows = slice(0, self.size) if rows is None else rows
+        mask = self.alive[rows].copy()
+        for condition in conditions:
+            if condition.op == 'eq':
+                code = self.dictionaries[condition.field].get(self._normalize(condition.field)(condition.value))
+                if code is None:
+                    return np.zeros(len(mask), dtype=bool)
+                mask &= self.codes[condition.field][rows] == code
+            elif condition.op == 'gte':
+                mask &= self.columns[condition.field][rows] >= condition.value
+            else:
+                mask &= self.columns[condition.field][rows] <= condition.value
+        return mask
+
+    def _page(self, rows, after, limit):
+        """
+        Order rows by creation time and ID and keep a page of them.
+
+        :param rows: An array of rows.
+        :param after: The (created_at, id) position to start after, or None.
+        :param limit: The maximum number of rows to keep, or None for all of them.
+        :return: A list of the IDs of the rows of the page.
+        """
+        created = self.created[rows]
+        if after is not None:
+            created_at, obj_id = after
+            created_at = np.datetime64(created_at, 'us')
+            later = (created > created_at) | ((created == created_at) & (self.keys[rows] > str(obj_id)))
+            rows, created = rows[later], created[later]
+        if limit is not None and len(rows) > limit:
+            # Only the rows up to the creation time of the last one of the page are sorted,
+            # keeping every row created at that time so ties are still ordered by ID
+            last = np.partition(created, limit - 1)[limit - 1]
+            rows, created = rows[created <= last], created[created <= last]
+        keys = self.keys[rows]
+        order = np.lexsort((keys, created))
+        if limit is not None:
+            order = order[:limit]
+        return keys[order].tolist()
+
+    def _box(self, conditions):
+        """
+        Get the latitude/longitude box conditions restrict the spatial fields to.
+
+        :param conditions: The Conditions.
+        :return: A (min_latitude, min_longitude, max_latitude, max_longitude) tuple, or None if no
+                 condition bounds a spatial field.
+        """
+        if not self.grid:
+            return None
+        latitude, longitude = self.spatial
+        bounds = {(latitude, 'gte'): -90.0, (longitude, 'gte'): -180.0, (latitude, 'lte'): 90.0, (longitude, 'lte'): 180.0}
+        bounded = False
+        for condition in conditions:
+            key = (condition.field, condition.op)
+            if key in bounds:
+                bounds[key] = max(bounds[key], condition.value) if condition.op == 'gte' else min(bounds[key], condition.value)
+                bounded = True
+        if not bounded:
+            return None
+        return bounds[latitude, 'gte'], bounds[longitude, 'gte'], bounds[latitude, 'lte'], bounds[longitude, 'lte']
+
+    def search(self, conditions=(), after=None, limit=None):
+        """
+        Find the objects satisfying conditions, ordered by creation time and ID.
+        Conditions bounding the spatial fields are answered from the spatial index, so only the
+        objects of the box they describe are looked at.
+
+        :param conditions: The Conditions the objects must satisfy, all supported.
+        :param after: The (created_at, id) position to start after, or None to start at the beginning.
+        :param limit: The maximum number of IDs to return, or None for all of them.
+        :return: A list of the IDs of the matching objects.
+        """
+        with self._lock:
+            self.refresh()
+            box = self._box(conditions)
+            if box is None:
+                rows = np.flatnonzero(self._mask(conditions))
+            elif box[0] > box[2] or box[1] > box[3]:
+                return []
+            else:
+                rows = self._in_box(*box)
+                rows = rows[self._mask(conditions, rows)]
+            return self._page(rows, after, limit)
+
+    def _in_box(self, min_latitude, min_longitude, max_latitude, max_longitude):
+        """
+        Get the rows in use whose coordinates lie in a box.
+
+        :return: An array of rows.
+        """
+        latitude, longitude = self.spatial
+        rows = self.grid.candidates(min_latitude, min_longitude, max_latitude, max_longitude)
+        inside = in_box(self.columns[latitude][rows], self.columns[longitude][rows],
+                        min_latitude, min_longitude, max_latitude, max_longitude)
+        return rows[inside & self.alive[rows]]
+
+    def nearest(self, latitude, longitude, limit, conditions=(), radius_km=None):
+        """
+        Find the objects closest to a point satisfying conditions, nearest first.
+        Without a radius, the area searched starts at one cell around the point and doubles until
+        it holds enough objects, so only the objects near the point are looked at.
+
+        :param latitude: The latitude of the point, in degrees.
+        :param longitude: The longitude of the point, in degrees.
+        :param limit: The maximum number of objects to return.
+        :param conditions: The Conditions the objects must satisfy, all supported.
+        :param radius_km: The greatest distance of the objects, in kilometers, or None for no limit.
+        :return: A list of (ID, distance in kilometers) pairs.
+        """
+        latitude_field, longitude_field = self.spatial
+        with self._lock:
+            self.refresh()
+            radius = radius_km if radius_km is not None else self.grid.cell_degrees * KM_PER_DEGREE
+            while True:
+                rows = self._in_box(*bounding_box(latitude, longitude, radius))
+                rows = rows[self._mask(conditions, rows)]
+                distances = haversine_km(latitude, longitude, self.columns[latitude_field][rows], self.columns[longitude_field][rows])
+                within = distances <= radius
+                if radius_km is not None or np.count_nonzero(within) >= limit or radius >= HALF_CIRCUMFERENCE_KM:
+                    break
+                radius = min(2 * radius, HALF_CIRCUMFERENCE_KM)
+            rows, distances = rows[within], distances[within]
+            keys = self.keys[rows]
+            order = np.lexsort((keys, distances))[:limit]
+            return list(zip(keys[order].tolist(), distances[order].tolist()))
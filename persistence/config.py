@@ -0,0 +1,73 @@
+import os
+from persistence.file_storage import FileStorage
+from persistence.wal_storage import WALFileStorage
+from persistence.sqlite_storage import SQLiteStorage
+from persistence.shared_storage import SharedFileStorage
+
+# Storage backends selectable with the HBNB_STORAGE environment variable
+STORAGE_BACKENDS = {
+    'file': FileStorage,
+    'wal': WALFileStorage,
+    'sqlite': SQLiteStorage,
+    'shared': SharedFileStorage,
+}
+
+def identity_map_size():
+    """
+    Get the size of the identity map of the data manager from the environment.
+
+    HBNB_IDENTITY_MAP_SIZE sets the maximum number of loaded objects kept in memory
+    (defaults to 10000, 0 disables the identity map).
+
+    :return: The maximum number of objects.
+    """
+    size = os.environ.get('HBNB_IDENTITY_MAP_SIZE', '10000')
+    try:
+        return int(size)
+    except ValueError:
+        raise ValueError(f"Invalid identity map size: {size}")
+
+def flush_options():
+    """
+    Get the write-behind options of the log-based backends (wal and shared) from the environment.
+
+    HBNB_FLUSH_INTERVAL starts a flusher thread writing the snapshot every given number of seconds
+    (unset by default, the snapshot is then only written when the log reaches the threshold) and
+    HBNB_FLUSH_THRESHOLD sets the number of log records that triggers a flush (defaults to 10000).
+
+    :return: A dictionary of keyword arguments for the storage.
+    """
+    interval = os.environ.get('HBNB_FLUSH_INTERVAL')
+    threshold = os.environ.get('HBNB_FLUSH_THRESHOLD', '10000')
+    try:
+        options = {'compact_threshold': int(threshold)}
+    except ValueError:
+        raise ValueError(f"Invalid flush threshold: {threshold}")
+    if interval:
+        try:
+            options['flush_interval'] = float(interval)
+        except ValueError:
+            raise ValueError(f"Invalid flush interval: {interval}")
+    return options
+
+def create_storage():
+    """
+    Create the storage backend selected by the environment.
+
+    HBNB_STORAGE chooses the backend (file, wal, sqlite or shared, defaults to file) and
+    HBNB_STORAGE_PATH overrides the path of its data file and HBNB_SNAPSHOT_FORMAT the format
+    the JSON backends write it in (json or binary, defaults to json). The log-based backends
+    also read the options of flush_options().
+
+    :return: An IPersistenceManager instance.
+    """
+    backend = os.environ.get('HBNB_STORAGE', 'file')
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {backend}")
+    options = flush_options() if backend in ('wal', 'shared') else {}
+    if backend != 'sqlite':
+        options['snapshot_format'] = os.environ.get('HBNB_SNAPSHOT_FORMAT', 'json')
+    path = os.environ.get('HBNB_STORAGE_PATH')
+    if path:
+        return STORAGE_BACKENDS[backend](path, **options)
+    return STORAGE_BACKENDS[backend](**options)
@@ -1,44 +1,309 @@
+import threading
+import uuid
 from persistence.ipersistence_manager import IPersistenceManager
+from persistence.indexes import declared_index
+from persistence.identity_map import IdentityMap
+from persistence.instrumentation import count_call
+from persistence.unit_of_work import UnitOfWork
 
 class DataManager(IPersistenceManager):
     """
     DataManager class that implements the IPersistenceManager interface.
     It uses a storage object to perform save, delete, load, and load_all operations.
+    Loaded objects are kept in an identity map, so loading an object again returns the same
+    instance without rebuilding it until it is saved, deleted or evicted.
     """
 
-    def __init__(self, storage):
+    def __init__(self, storage, identity_map_size=10000):
         """
         Initialize DataManager with a storage object.
 
         :param storage: The storage object that will be used for persistence operations.
+        :param identity_map_size: The maximum number of objects kept in the identity map. 0 disables it.
         """
+        self.identity_map = IdentityMap(identity_map_size)
+        self.observers = []
+        self.change_observers = []
+        self.versions = {}
+        self._versions_lock = threading.Lock()
         self.storage = storage
+        self._local = threading.local()
+
+    @property
+    def storage(self):
+        """
+        The storage object used for persistence operations.
+        Replacing it empties the identity map.
+        """
+        return self._storage
+
+    @storage.setter
+    def storage(self, storage):
+        self._storage = storage
+        self.identity_map.clear()
+        # A new generation makes every collection version differ from the ones seen before
+        self.generation = uuid.uuid4().hex[:8]
+        self._changed(None)
+
+    def _canonical(self, objs):
+        """
+        Replace objects loaded from the storage by the instances already in the identity map,
+        and add the others to it.
+
+        :param objs: An iterable of objects loaded from the storage.
+        :return: An iterator of the instances to use.
+        """
+        for obj in objs:
+            yield self.identity_map.add(obj)
+
+    def invalidate(self, objs):
+        """
+        Remove objects from the identity map so they are loaded from the storage again.
+
+        :param objs: The objects to be removed.
+        """
+        for obj in objs:
+            self.identity_map.discard(obj.__class__, obj.id)
+
+    def add_observer(self, observer):
+        """
+        Register a function called with the list of objects written each time objects are
+        saved to or deleted from the storage.
+
+        :param observer: The function to call.
+        """
+        self.observers.append(observer)
+
+    def add_change_observer(self, observer):
+        """
+        Register a function called with the (class name, ID) pairs of the objects written, by this
+        process or by another one sharing the storage, or with None when any object may have
+        changed, such as when the storage is replaced.
+
+        :param observer: The function to call.
+        """
+        self.change_observers.append(observer)
+
+    def _changed(self, changes):
+        """
+        Notify the change observers.
+
+        :param changes: A list of (class name, ID) pairs, or None if any object may have changed.
+        """
+        for observer in self.change_observers:
+            observer(changes)
+
+    def collection_version(self, cls):
+        """
+        Get the version stamp of the objects of a class. It changes every time an object of the
+        class is saved or deleted, by this process or by another one sharing the storage, and
+        when the storage is replaced.
+
+        :param cls: The model class.
+        :return: The version stamp as a string.
+        """
+        self._sync()
+        return f"{self.generation}.{self.versions.get(cls.__name__, 0)}"
+
+    def _written(self, objs):
+        """
+        Record that objects were saved to or deleted from the storage: bump the versions of their
+        classes, drop them from the identity map, where another thread may have loaded their
+        previous state while they were pending, and notify the observers.
+
+        :param objs: The objects written.
+        """
+        objs = list(objs)
+        if not objs:
+            return
+        with self._versions_lock:
+            for obj_class in {obj.__class__.__name__ for obj in objs}:
+                self.versions[obj_class] = self.versions.get(obj_class, 0) + 1
+        self.invalidate(objs)
+        for observer in self.observers:
+            observer(objs)
+        self._changed([(obj.__class__.__name__, str(obj.id)) for obj in objs])
+
+    def _sync(self):
+        """
+        Drop the objects that other processes wrote to a shared storage from the identity map and
+        bump the versions of their classes. When the storage cannot tell which objects changed,
+        the whole map is emptied and every version changes.
+        """
+        changes = self.storage.changes()
+        if changes is None:
+            self.identity_map.clear()
+            self.generation = uuid.uuid4().hex[:8]
+            self._changed(None)
+            return
+        if not changes:
+            return
+        with self._versions_lock:
+            for obj_class in {obj_class for obj_class, _ in changes}:
+                self.versions[obj_class] = self.versions.get(obj_class, 0) + 1
+        for obj_class, obj_id in changes:
+            self.identity_map.discard(obj_class, obj_id)
+        self._changed(changes)
+
+    def cache_stats(self):
+        """
+        Get the usage statistics of the identity map.
+
+        :return: A dictionary with the hits, misses, evictions, size and max_size.
+        """
+        return self.identity_map.stats()
+
+    def unit_of_work(self):
+        """
+        Get the unit of work of the current thread, creating one if none is active.
+        Use it as a context manager, or call begin() and end() around the work.
+
+        :return: The active UnitOfWork.
+        """
+        uow = self.current_unit_of_work()
+        if uow is None:
+            uow = UnitOfWork(self)
+            self._local.unit_of_work = uow
+        return uow
+
+    def current_unit_of_work(self):
+        """
+        Get the unit of work of the current thread.
+
+        :return: The active UnitOfWork, or None.
+        """
+        return getattr(self._local, 'unit_of_work', None)
+
+    def _release_unit_of_work(self, uow):
+        if self.current_unit_of_work() is uow:
+            self._local.unit_of_work = None
 
     def save(self, obj):
         """
         Save an object to the storage.
+        Inside a unit of work the object is only marked dirty until the commit.
 
         :param obj: The object to be saved.
         """
-        self.storage.save(obj)
+        count_call('save')
+        self.invalidate([obj])
+        uow = self.current_unit_of_work()
+        if uow:
+            uow.register_save(obj)
+        else:
+            self.storage.save(obj)
+            self._written([obj])
 
     def delete(self, obj):
         """
         Delete an object from the storage.
+        Inside a unit of work the deletion is deferred until the commit.
 
         :param obj: The object to be deleted.
         """
-        self.storage.delete(obj)
+        count_call('delete')
+        self.invalidate([obj])
+        uow = self.current_unit_of_work()
+        if uow:
+            uow.register_delete(obj)
+        else:
+            self.storage.delete(obj)
+            self._written([obj])
+
+    def save_many(self, objs):
+        """
+        Save several objects to the storage in a single batch.
+        Inside a unit of work the objects are only marked dirty until the commit.
+
+        :param objs: The objects to be saved.
+        """
+        count_call('save_many')
+        objs = list(objs)
+        self.invalidate(objs)
+        uow = self.current_unit_of_work()
+        if uow:
+            for obj in objs:
+                uow.register_save(obj)
+        else:
+            self.storage.save_many(objs)
+            self._written(objs)
+
+    def delete_many(self, objs):
+        """
+        Delete several objects from the storage in a single batch.
+        Inside a unit of work the deletions are deferred until the commit.
+
+        :param objs: The objects to be deleted.
+        """
+        count_call('delete_many')
+        objs = list(objs)
+        self.invalidate(objs)
+        uow = self.current_unit_of_work()
+        if uow:
+            for obj in objs:
+                uow.register_delete(obj)
+        else:
+            self.storage.delete_many(objs)
+            self._written(objs)
 
     def load(self, cls, obj_id):
         """
-        Load an object of a given class from the storage using its ID.
+        Load an object of a given class using its ID, from the identity map when it holds it
+        and from the storage otherwise.
 
         :param cls: The class of the object to be loaded.
         :param obj_id: The ID of the object to be loaded.
         :return: The loaded object if found, None otherwise.
         """
-        return self.storage.load(cls, obj_id)
+        count_call('load')
+        self._sync()
+        uow = self.current_unit_of_work()
+        if uow:
+            found, obj = uow.lookup(cls, obj_id)
+            if found:
+                return obj
+        obj = self.identity_map.get(cls, obj_id)
+        if obj is not None:
+            return obj
+        obj = self.storage.load(cls, obj_id)
+        if obj is None:
+            return None
+        return self.identity_map.add(obj)
+
+    def load_many(self, cls, ids):
+        """
+        Load the objects of a given class with several IDs in one pass. Each distinct ID is looked up
+        in the current unit of work and the identity map first, and the others are loaded from the
+        storage in a single batch.
+
+        :param cls: The class of the objects to be loaded.
+        :param ids: The IDs of the objects to be loaded, possibly repeated.
+        :return: A (objects, missing) tuple: the objects found in the order of their IDs, and the IDs
+                 no object was found for, as strings in the order they were given.
+        """
+        count_call('load_many')
+        self._sync()
+        uow = self.current_unit_of_work()
+        ids = [str(obj_id) for obj_id in ids]
+        found = {}
+        to_load = []
+        for obj_id in dict.fromkeys(ids):
+            if uow:
+                pending, obj = uow.lookup(cls, obj_id)
+                if pending:
+                    found[obj_id] = obj
+                    continue
+            obj = self.identity_map.get(cls, obj_id)
+            if obj is not None:
+                found[obj_id] = obj
+            else:
+                to_load.append(obj_id)
+        if to_load:
+            for obj_id, obj in self.storage.load_many(cls, to_load).items():
+                found[obj_id] = self.identity_map.add(obj)
+        objs = [found[obj_id] for obj_id in ids if found.get(obj_id) is not None]
+        missing = [obj_id for obj_id in ids if found.get(obj_id) is None]
+        return objs, missing
 
     def load_all(self, cls):
         """
@@ -47,4 +312,91 @@ class DataManager(IPersistenceManager):
         :param cls: The class of the objects to be loaded.
         :return: A list of loaded objects.
         """
-        return self.storage.load_all(cls)
+        count_call('load_all')
+        self._sync()
+        objs = list(self._canonical(self.storage.load_all(cls)))
+        uow = self.current_unit_of_work()
+        if uow:
+            objs = uow.merge(cls, objs)
+        return objs
+
+    def find_by(self, cls, field, value):
+        """
+        Load the objects of a given class whose indexed field matches a value.
+        Pending changes of the current unit of work are taken into account.
+
+        :param cls: The class of the objects to be loaded.
+        :param field: The name of the indexed field.
+        :param value: The value to look up.
+        :return: A list of loaded objects.
+        """
+        count_call('find_by')
+        self._sync()
+        objs = list(self._canonical(self.storage.find_by(cls, field, value)))
+        uow = self.current_unit_of_work()
+        if uow is None:
+            return objs
+        normalize = declared_index(cls, field).normalize
+        key = normalize(value)
+        if key is None:
+            return objs
+        # Stored matches that are pending are re-checked against their new values
+        pending = uow.merge(cls, [])
+        pending_ids = {obj.id for obj in pending}
+        stored = [obj for obj in uow.merge(cls, objs) if obj.id not in pending_ids]
+        return stored + [obj for obj in pending if normalize(getattr(obj, field, None)) == key]
+
+    def find_one_by(self, cls, field, value):
+        """
+        Load the first object of a given class whose indexed field matches a value.
+
+        :param cls: The class of the object to be loaded.
+        :param field: The name of the indexed field.
+        :param value: The value to look up.
+        :return: The loaded object if found, None otherwise.
+        """
+        return next(iter(self.find_by(cls, field, value)), None)
+
+    def query(self, cls, conditions=(), after=None, limit=None):
+        """
+        Load a page of the objects of a given class, ordered by creation time and ID.
+        While the current unit of work has pending changes for the class, the page is
+        computed from the merged objects instead of by the storage.
+
+        :param cls: The class of the objects to be loaded.
+        :param conditions: The Conditions the objects must satisfy.
+        :param after: The (created_at, id) position to start after, or None to start at the beginning.
+        :param limit: The maximum number of objects to load, or None for all of them.
+        :return: A list of loaded objects.
+        """
+        count_call('query')
+        self._sync()
+        uow = self.current_unit_of_work()
+        if uow and uow.has_pending(cls):
+            return super().query(cls, conditions, after, limit)
+        return list(self._canonical(self.storage.query(cls, conditions, after, limit)))
+
+    def iterate(self, cls, conditions=()):
+        """
+        Yield the objects of a given class one at a time.
+        While the current unit of work has pending changes for the class, the merged objects are yielded instead.
+
+        :param cls: The class of the objects to be loaded.
+        :param conditions: The Conditions the objects must satisfy.
+        :return: An iterator of loaded objects.
+        """
+        count_call('iterate')
+        self._sync()
+        uow = self.current_unit_of_work()
+        if uow and uow.has_pending(cls):
+            return super().iterate(cls, conditions)
+        return self._canonical(self.storage.iterate(cls, conditions))
+
+    def check_indexes(self, cls):
+        """
+        Check the secondary indexes of a class against the stored data.
+
+        :param cls: The model class.
+        :return: A list of problems found, empty if the indexes are consistent.
+        """
+        return self.storage.check_indexes(cls)
@@ -1,43 +1,238 @@
-import json
 import os
-from datetime import datetime
-import uuid
+import threading
 import re
 from persistence.ipersistence_manager import IPersistenceManager
+from persistence.indexes import SecondaryIndex, declared_indexes, declared_index, check_unique
+from persistence.query import select
+from persistence.locks import RWLock
+from persistence.codecs import codec
+from persistence.snapshot import open_snapshot, write_json_snapshot, write_snapshot
+from persistence.records import attributes, hydrate
+from persistence.instrumentation import count_bytes_written
+
+SNAPSHOT_FORMATS = ('json', 'binary')
+MODEL_CLASSES = ("User", "Place", "Review", "Amenity", "City", "Country") # Always written, even when empty
+
+class ClassData(dict):
+    """
+    Dictionary mapping class names to the records of each class, which reads a class from the
+    storage file the first time it is looked up.
+    """
+
+    def __init__(self, load_class):
+        """
+        Initialize an empty ClassData.
+
+        :param load_class: The function reading the records of a class and storing them in the dictionary.
+        """
+        super().__init__()
+        self.load_class = load_class
+
+    def __missing__(self, obj_class):
+        return self.load_class(obj_class)
 
 class FileStorage(IPersistenceManager):
     """
     FileStorage class that implements the IPersistenceManager interface.
     It uses a JSON file for storing and retrieving data.
+    A reader-writer lock lets threads read concurrently while writes are exclusive. Full scans
+    work on a snapshot of the records of a class, taken after the last write and shared by every
+    reader until the next one, so they build objects without holding the lock.
+    Nothing is read when the storage is created. The file is opened and indexed on first access,
+    and each class is parsed the first time it is used, so startup does not depend on the size
+    of the file and a point load only parses the class of the object.
     """
 
-    def __init__(self, file_path='/usr/src/app/file_storage.json'):
+    def __init__(self, file_path='/usr/src/app/file_storage.json', snapshot_format='json'):
         """
         Initialize FileStorage with a file path.
 
         :param file_path: The path to the JSON file used for storage.
+        :param snapshot_format: 'json', or 'binary' to write the columnar format of persistence.snapshot.
+                                Existing files are read in either format.
         """
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format: {snapshot_format}")
         self.file_path = file_path 
-        self.data = self._load_file() 
+        self.snapshot_format = snapshot_format
+        self.codec = codec
+        self.lock = RWLock()
+        self._load_lock = threading.RLock()
+        self._source = None
+        self.opened = False
+        self.data = ClassData(self._load_class)
+        self.indexes = {}
+        self.snapshots = {}
+
+    def _open(self):
+        """
+        Open the file and index the position of each class, without parsing any of them.
+        """
+        self._source = open_snapshot(self.file_path)
+        self.opened = True
+
+    def _read_class(self, obj_class):
+        """
+        Read the records of a class from the file.
+
+        :param obj_class: The name of the class.
+        :return: A dictionary mapping IDs to attribute dictionaries.
+        """
+        return self._source.read_class(obj_class) if self._source else {}
+
+    def _load_class(self, obj_class):
+        """
+        Read the records of a class into the data dictionary, opening the file on first use.
+        Called by the data dictionary when a class is looked up for the first time.
+
+        :param obj_class: The name of the class.
+        :return: The dictionary of the records of the class.
+        """
+        with self._load_lock:
+            if obj_class not in self.data:
+                if not self.opened:
+                    self._open()
+                self.data[obj_class] = self._read_class(obj_class)
+            return self.data[obj_class]
+
+    def _stored_classes(self):
+        """
+        Get the names of the classes stored in the file, and of the model classes.
+
+        :return: A list of class names.
+        """
+        if not self.opened:
+            self._open()
+        names = list(MODEL_CLASSES)
+        if self._source:
+            names += [obj_class for obj_class in self._source.classes() if obj_class not in names]
+        return names
+
+    def _load_all(self):
+        """
+        Read every class of the file into the data dictionary and close the file, which is no longer needed.
+        The write lock must be held.
+
+        :return: The data dictionary.
+        """
+        with self._load_lock:
+            for obj_class in self._stored_classes():
+                self.data[obj_class]
+            if self._source:
+                self._source.close()
+                self._source = None
+        return self.data
 
-    def _load_file(self):
+    def _reset(self):
+        """
+        Forget the loaded data, so the file is opened again and each class read again on first access.
+        The write lock must be held.
         """
-        Load data from the JSON file.
+        if self._source:
+            self._source.close()
+        self._source = None
+        self.opened = False
+        self.data = ClassData(self._load_class)
+        self.indexes = {}
+        self.snapshots = {}
 
-        :return: A dictionary containing the data loaded from the file.
+    def _write_data(self, file, data):
         """
-        if os.path.exists(self.file_path): 
-            with open(self.file_path, 'r') as file: 
-                return json.load(file) 
+        Write a data dictionary in the snapshot format of the storage.
+
+        :param file: The binary file to write to.
+        :param data: The data dictionary.
+        """
+        if self.snapshot_format == 'binary':
+            write_snapshot(file, data)
         else:
-            return {"User": {}, "Place": {}, "Review": {}, "Amenity": {}, "City": {}, "Country": {}}
+            write_json_snapshot(file, data)
+
+    def _indexes_for(self, cls):
+        """
+        Get the secondary indexes of a class, building them from the data dictionary on first use.
+
+        :param cls: The model class.
+        :return: A dictionary mapping field names to SecondaryIndex objects.
+        """
+        obj_class = cls.__name__
+        if obj_class not in self.indexes:
+            indexes = {field: SecondaryIndex(declaration) for field, declaration in declared_indexes(cls).items()}
+            for obj_id, obj_data in self.data[obj_class].items():
+                for field, index in indexes.items():
+                    index.add(obj_id, obj_data.get(field))
+            self.indexes[obj_class] = indexes
+        return self.indexes[obj_class]
+
+    def _check_unique(self, objs):
+        """
+        Check that saving objects keeps every unique index unique.
+
+        :param objs: The objects about to be saved.
+        :raises UniqueConstraintError: If an object would break a unique index.
+        """
+        by_class = {}
+        for obj in objs:
+            by_class.setdefault(obj.__class__, []).append((str(obj.id), attributes(obj)))
+        for cls, records in by_class.items():
+            check_unique(self._indexes_for(cls), cls.__name__, records)
+
+    def _put(self, cls, obj_id, obj_data):
+        """
+        Store the attributes of an object in the data dictionary and update the indexes.
+
+        :param cls: The class of the object.
+        :param obj_id: The ID of the object.
+        :param obj_data: The attributes of the object.
+        """
+        self.data[cls.__name__][obj_id] = obj_data
+        self.snapshots.pop(cls.__name__, None)
+        for field, index in self._indexes_for(cls).items():
+            index.add(obj_id, obj_data.get(field))
+
+    def _remove(self, cls, obj_id):
+        """
+        Remove an object from the data dictionary and the indexes.
+
+        :param cls: The class of the object.
+        :param obj_id: The ID of the object.
+        :return: True if the object was stored, False otherwise.
+        """
+        if obj_id not in self.data[cls.__name__]:
+            return False
+        del self.data[cls.__name__][obj_id]
+        self.snapshots.pop(cls.__name__, None)
+        for index in self._indexes_for(cls).values():
+            index.remove(obj_id)
+        return True
+
+    def _snapshot(self, cls):
+        """
+        Get the records of a class as they were after the last write. Writers never change a
+        stored record in place, so the snapshot can be read without holding the lock.
+
+        :param cls: The model class.
+        :return: A tuple of attribute dictionaries, in storage order.
+        """
+        obj_class = cls.__name__
+        snapshot = self.snapshots.get(obj_class)
+        if snapshot is None:
+            with self.lock.read():
+                # Stored while the lock is held, so a write cannot slip in between
+                snapshot = self.snapshots[obj_class] = tuple(self.data[obj_class].values())
+        return snapshot
 
     def _save_file(self):
         """
-        Save the data to the JSON file.
+        Save the data to the JSON file. The file is replaced by a rename, so a reader never sees
+        it half written.
         """
-        with open(self.file_path, 'w') as file:
-            json.dump(self.data, file, default=str) 
+        data = self._load_all()
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            self._write_data(file, data)
+            count_bytes_written(file.tell())
+        os.replace(tmp_path, self.file_path)
 
     def save(self, obj):
         """
@@ -45,10 +240,10 @@ class FileStorage(IPersistenceManager):
 
         :param obj: The object to be saved.
         """
-        obj_class = obj.__class__.__name__ 
-        obj_id = str(obj.id) 
-        self.data[obj_class][obj_id] = obj.__dict__ 
-        self._save_file() 
+        with self.lock.write():
+            self._check_unique([obj])
+            self._put(obj.__class__, str(obj.id), attributes(obj))
+            self._save_file() 
 
     def delete(self, obj):
         """
@@ -56,12 +251,36 @@ class FileStorage(IPersistenceManager):
 
         :param obj: The object to be deleted.
         """
-        obj_class = obj.__class__.__name__
-        obj_id = str(obj.id)
-        if obj_id in self.data[obj_class]: 
-            del self.data[obj_class][obj_id] 
+        with self.lock.write():
+            if self._remove(obj.__class__, str(obj.id)):
+                self._save_file()
+
+    def save_many(self, objs):
+        """
+        Save several objects to the data dictionary and then to the file in a single write.
+
+        :param objs: The objects to be saved.
+        """
+        with self.lock.write():
+            self._check_unique(objs)
+            for obj in objs:
+                self._put(obj.__class__, str(obj.id), attributes(obj))
             self._save_file()
 
+    def delete_many(self, objs):
+        """
+        Delete several objects from the data dictionary and then from the file in a single write.
+
+        :param objs: The objects to be deleted.
+        """
+        with self.lock.write():
+            deleted = False
+            for obj in objs:
+                if self._remove(obj.__class__, str(obj.id)):
+                    deleted = True
+            if deleted:
+                self._save_file()
+
     def load(self, cls, obj_id):
         """
         Load an object of a given class from the data dictionary using its ID.
@@ -70,30 +289,136 @@ class FileStorage(IPersistenceManager):
         :param obj_id: The ID of the object to be loaded.
         :return: The loaded object if found, None otherwise.
         """
-        obj_class = cls.__name__ 
-        obj_id = str(obj_id)
-        if obj_id in self.data[obj_class]: 
-            obj_data = self.data[obj_class][obj_id] 
-            obj = cls.__new__(cls) 
-            obj.__dict__.update(obj_data) 
-            if not isinstance(obj.id, uuid.UUID):
-                obj.id = uuid.UUID(obj.id) 
-
-            if isinstance(obj.created_at, str):
-                obj.created_at = datetime.fromisoformat(obj.created_at)
+        with self.lock.read():
+            obj_data = self.data[cls.__name__].get(str(obj_id))
+        if obj_data is not None:
+            return hydrate(cls, obj_data)
+        return None 
 
-            if isinstance(obj.updated_at, str):
-                obj.updated_at = datetime.fromisoformat(obj.updated_at)
+    def load_many(self, cls, ids):
+        """
+        Load the objects of a given class with any of several IDs, looking them all up under one
+        acquisition of the lock.
 
-            return obj 
-        return None 
+        :param cls: The class of the objects to be loaded.
+        :param ids: The distinct IDs of the objects to be loaded.
+        :return: A dictionary mapping the ID of every object found, as a string, to the object.
+        """
+        with self.lock.read():
+            records = self.data[cls.__name__]
+            found = [(obj_id, records.get(obj_id)) for obj_id in map(str, ids)]
+        return {obj_id: hydrate(cls, obj_data) for obj_id, obj_data in found if obj_data is not None}
 
     def load_all(self, cls):
         """
-        Load all objects of a given class from the data dictionary.
+        Load all objects of a given class from the data dictionary, as they were after the last write.
 
         :param cls: The class of the objects to be loaded.
         :return: A list of loaded objects.
         """
-        obj_class = cls.__name__
-        return [self.load(cls, obj_id) for obj_id in self.data[obj_class]]
+        return [hydrate(cls, obj_data) for obj_data in self._snapshot(cls)]
+
+    def find_by(self, cls, field, value):
+        """
+        Load the objects of a given class whose indexed field matches a value.
+
+        :param cls: The class of the objects to be loaded.
+        :param field: The name of the indexed field.
+        :param value: The value to look up.
+        :return: A list of loaded objects.
+        """
+        declared_index(cls, field)
+        with self.lock.read():
+            objects = self.data[cls.__name__]
+            records = [objects[obj_id] for obj_id in self._indexes_for(cls)[field].get(value)]
+        return [hydrate(cls, obj_data) for obj_data in records]
+
+    def find_one_by(self, cls, field, value):
+        """
+        Load the first object of a given class whose indexed field matches a value.
+
+        :param cls: The class of the object to be loaded.
+        :param field: The name of the indexed field.
+        :param value: The value to look up.
+        :return: The loaded object if found, None otherwise.
+        """
+        declared_index(cls, field)
+        with self.lock.read():
+            obj_ids = self._indexes_for(cls)[field].get(value)
+            obj_data = self.data[cls.__name__][obj_ids[0]] if obj_ids else None
+        if obj_data is not None:
+            return hydrate(cls, obj_data)
+        return None
+
+    def query(self, cls, conditions=(), after=None, limit=None):
+        """
+        Load a page of the objects of a given class, ordered by creation time and ID.
+        An equality condition on an indexed field narrows the scan to the matching objects,
+        and only the objects of the page are built.
+
+        :param cls: The class of the objects to be loaded.
+        :param conditions: The Conditions the objects must satisfy.
+        :param after: The (created_at, id) position to start after, or None to start at the beginning.
+        :param limit: The maximum number of objects to load, or None for all of them.
+        :return: A list of loaded objects.
+        """
+        records = self._narrow(cls, conditions)
+        return [hydrate(cls, obj_data) for obj_data in select(cls, records, conditions, after, limit)]
+
+    def _narrow(self, cls, conditions):
+        """
+        Get the records that may satisfy conditions: those matching the first equality condition
+        on an indexed field, or the snapshot of every record of the class.
+
+        :param cls: The model class.
+        :param conditions: The Conditions the objects must satisfy.
+        :return: A sequence of attribute dictionaries, in storage order.
+        """
+        declared = declared_indexes(cls)
+        for condition in conditions:
+            if condition.op == 'eq' and condition.field in declared:
+                with self.lock.read():
+                    objects = self.data[cls.__name__]
+                    return [objects[obj_id] for obj_id in self._indexes_for(cls)[condition.field].get(condition.value)]
+        return self._snapshot(cls)
+
+    def iterate(self, cls, conditions=()):
+        """
+        Yield the objects of a given class one at a time, in storage order.
+        The records are taken up front, so objects saved or deleted meanwhile do not break the
+        iteration and the lock is not held while the objects are consumed.
+
+        :param cls: The class of the objects to be loaded.
+        :param conditions: The Conditions the objects must satisfy.
+        :return: An iterator of loaded objects.
+        """
+        for obj_data in self._narrow(cls, conditions):
+            if all(condition.matches(cls, obj_data) for condition in conditions):
+                yield hydrate(cls, obj_data)
+
+    def check_indexes(self, cls):
+        """
+        Compare the maintained indexes of a class with indexes rebuilt from the data dictionary.
+
+        :param cls: The model class.
+        :return: A list of problems found, empty if the indexes are consistent.
+        """
+        with self.lock.read():
+            return self._check_indexes(cls)
+
+    def _check_indexes(self, cls):
+        problems = []
+        maintained = self._indexes_for(cls)
+        objects = self.data[cls.__name__]
+        for field, declaration in declared_indexes(cls).items():
+            rebuilt = SecondaryIndex(declaration)
+            for obj_id, obj_data in objects.items():
+                rebuilt.add(obj_id, obj_data.get(field))
+            index = maintained[field]
+            for obj_id in set(rebuilt.key_by_id) | set(index.key_by_id):
+                expected, actual = rebuilt.key_by_id.get(obj_id), index.key_by_id.get(obj_id)
+                if expected != actual:
+                    problems.append(f"{cls.__name__}.{field}: {obj_id} is indexed under {actual!r} instead of {expected!r}")
+            for key, ids in rebuilt.duplicates().items():
+                problems.append(f"{cls.__name__}.{field}: {key!r} is shared by {', '.join(ids)}")
+        return problems
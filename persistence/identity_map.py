@@ -0,0 +1,100 @@
+import threading
+from collections import OrderedDict
+
+class IdentityMap:
+    """
+    IdentityMap keeps the objects loaded from a storage keyed by (class name, id), so loading the
+    same object twice returns the same instance without building it again.
+    It holds at most max_size objects and evicts the least recently used one when full.
+    The objects it holds are marked with a true _shared attribute, even once evicted, since the
+    threads that loaded them may still use them.
+    """
+
+    def __init__(self, max_size=10000):
+        """
+        Initialize an empty IdentityMap.
+
+        :param max_size: The maximum number of objects kept. 0 disables the map.
+        """
+        self.max_size = max_size
+        self.objects = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(cls, obj_id):
+        return getattr(cls, '__name__', cls), str(obj_id)
+
+    def get(self, cls, obj_id):
+        """
+        Get a loaded object and mark it as recently used.
+
+        :param cls: The class of the object.
+        :param obj_id: The ID of the object.
+        :return: The object, or None if it is not in the map.
+        """
+        key = self._key(cls, obj_id)
+        with self._lock:
+            obj = self.objects.get(key)
+            if obj is None:
+                self.misses += 1
+                return None
+            self.objects.move_to_end(key)
+            self.hits += 1
+            return obj
+
+    def add(self, obj):
+        """
+        Add a loaded object, unless an instance of it is already in the map.
+
+        :param obj: The object loaded from the storage.
+        :return: The instance kept in the map, which is the one callers should use.
+        """
+        if self.max_size <= 0:
+            return obj
+        key = self._key(obj.__class__, obj.id)
+        with self._lock:
+            existing = self.objects.get(key)
+            if existing is not None:
+                self.objects.move_to_end(key)
+                return existing
+            self.objects[key] = obj
+            obj._shared = True
+            if len(self.objects) > self.max_size:
+                self.objects.popitem(last=False)
+                self.evictions += 1
+            return obj
+
+    def discard(self, cls, obj_id):
+        """
+        Remove an object from the map.
+
+        :param cls: The class of the object, or its name.
+        :param obj_id: The ID of the object.
+        """
+        with self._lock:
+            self.objects.pop(self._key(cls, obj_id), None)
+
+    def clear(self):
+        """
+        Remove every object from the map.
+        """
+        with self._lock:
+            self.objects.clear()
+
+    def stats(self):
+        """
+        Get the usage statistics of the map.
+
+        :return: A dictionary with the hits, misses, evictions, size and max_size.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self.objects),
+                'max_size': self.max_size,
+            }
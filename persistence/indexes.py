@@ -0,0 +1,179 @@
+def normalize_email(email):
+    """
+    Normalize an email address for lookups.
+
+    :param email: The email address.
+    :return: The trimmed, lower-cased email address, or None if it is not a string.
+    """
+    if not isinstance(email, str):
+        return None
+    return email.strip().lower() or None
+
+def normalize_value(value):
+    """
+    Normalize a field value for lookups. IDs may be stored as UUID objects or strings,
+    so every value is compared by its string form.
+
+    :param value: The field value.
+    :return: The value as a string, or None.
+    """
+    if value is None:
+        return None
+    return str(value)
+
+class UniqueConstraintError(ValueError):
+    """
+    Raised by a storage when saving an object would give a unique index two objects with the same value.
+    """
+
+    def __init__(self, obj_class, field, value):
+        super().__init__(f"{obj_class}.{field} must be unique: {value!r} is already in use")
+        self.obj_class = obj_class
+        self.field = field
+        self.value = value
+
+class Index:
+    """
+    Declares a secondary index on a field of a model.
+    Models list their indexes in the __indexes__ class attribute and the storages maintain them.
+    """
+
+    def __init__(self, field, unique=False, normalize=normalize_value):
+        """
+        Initialize the Index declaration.
+
+        :param field: The name of the indexed field.
+        :param unique: Whether two objects may not share a value of the field.
+        :param normalize: The function turning a field value into an index key.
+        """
+        self.field = field
+        self.unique = unique
+        self.normalize = normalize
+
+def declared_indexes(cls):
+    """
+    Get the indexes declared by a class.
+
+    :param cls: The model class.
+    :return: A dictionary mapping field names to Index declarations.
+    """
+    return {index.field: index for index in getattr(cls, '__indexes__', ())}
+
+def declared_index(cls, field):
+    """
+    Get the index declared by a class on a field.
+
+    :param cls: The model class.
+    :param field: The name of the field.
+    :return: The Index declaration.
+    :raises ValueError: If the field is not indexed.
+    """
+    index = declared_indexes(cls).get(field)
+    if index is None:
+        raise ValueError(f"{cls.__name__}.{field} is not indexed")
+    return index
+
+class SecondaryIndex:
+    """
+    SecondaryIndex maps the normalized value of a field to the IDs of the objects holding it.
+    It keeps the reverse mapping so an object can be moved or removed without knowing its previous value.
+    """
+
+    def __init__(self, declaration):
+        """
+        Initialize an empty SecondaryIndex.
+
+        :param declaration: The Index declaration it maintains.
+        """
+        self.normalize = declaration.normalize
+        self.unique = declaration.unique
+        self.ids_by_key = {}
+        self.key_by_id = {}
+
+    def conflicts(self, obj_id, value):
+        """
+        Check whether indexing an object under a value would break the unique constraint.
+        An object keeping the value it is already indexed under never conflicts, so data
+        stored before the constraint existed can still be saved.
+
+        :param obj_id: The ID of the object.
+        :param value: The value of the indexed field.
+        :return: True if another object already holds the value.
+        """
+        if not self.unique:
+            return False
+        key = self.normalize(value)
+        if key is None or self.key_by_id.get(obj_id) == key:
+            return False
+        return any(other_id != obj_id for other_id in self.ids_by_key.get(key, ()))
+
+    def add(self, obj_id, value):
+        """
+        Index an object under a field value, replacing its previous entry.
+
+        :param obj_id: The ID of the object.
+        :param value: The value of the indexed field.
+        """
+        key = self.normalize(value)
+        if obj_id in self.key_by_id and self.key_by_id[obj_id] == key:
+            return
+        self.remove(obj_id)
+        if key is None:
+            return
+        self.ids_by_key.setdefault(key, {})[obj_id] = None
+        self.key_by_id[obj_id] = key
+
+    def remove(self, obj_id):
+        """
+        Remove an object from the index.
+
+        :param obj_id: The ID of the object.
+        """
+        if obj_id not in self.key_by_id:
+            return
+        key = self.key_by_id.pop(obj_id)
+        ids = self.ids_by_key[key]
+        del ids[obj_id]
+        if not ids:
+            del self.ids_by_key[key]
+
+    def get(self, value):
+        """
+        Get the IDs of the objects holding a field value, in indexing order.
+
+        :param value: The value to look up.
+        :return: A list of object IDs.
+        """
+        return list(self.ids_by_key.get(self.normalize(value), ()))
+
+    def duplicates(self):
+        """
+        Get the keys of a unique index held by more than one object.
+
+        :return: A dictionary mapping keys to the IDs holding them.
+        """
+        if not self.unique:
+            return {}
+        return {key: list(ids) for key, ids in self.ids_by_key.items() if len(ids) > 1}
+
+def check_unique(indexes, obj_class, records):
+    """
+    Check a batch of records against the unique indexes of their class, and against each other.
+
+    :param indexes: A dictionary mapping fields to SecondaryIndex objects.
+    :param obj_class: The name of the class of the records.
+    :param records: A list of (obj_id, obj_data) tuples.
+    :raises UniqueConstraintError: If a record would break a unique index.
+    """
+    for field, index in indexes.items():
+        if not index.unique:
+            continue
+        claimed = {}
+        for obj_id, obj_data in records:
+            value = obj_data.get(field)
+            key = index.normalize(value)
+            if key is None:
+                continue
+            if index.conflicts(obj_id, value) or claimed.get(key, obj_id) != obj_id:
+                raise UniqueConstraintError(obj_class, field, value)
+            claimed[key] = obj_id
@@ -0,0 +1,97 @@
+import threading
+import time
+
+class RequestStats:
+    """
+    RequestStats counts the work done on behalf of one request: the calls made to the data manager,
+    the bytes the storage wrote, the objects it hydrated and the time spent serializing responses.
+    """
+
+    __slots__ = ('calls', 'bytes_written', 'hydrated', 'serialize_seconds')
+
+    def __init__(self):
+        """
+        Initialize empty RequestStats.
+        """
+        self.calls = {}
+        self.bytes_written = 0
+        self.hydrated = 0
+        self.serialize_seconds = 0.0
+
+class _Active(threading.local):
+    stats = None # The RequestStats of the request the thread is handling, if it is recorded
+
+_active = _Active()
+
+def start():
+    """
+    Start recording the work of the current thread.
+
+    :return: The RequestStats the work is counted in.
+    """
+    stats = _active.stats = RequestStats()
+    return stats
+
+def stop():
+    """
+    Stop recording the work of the current thread.
+
+    :return: The RequestStats that were recorded, or None if no recording was active.
+    """
+    stats, _active.stats = _active.stats, None
+    return stats
+
+def current():
+    """
+    Get the RequestStats of the current thread.
+
+    :return: The RequestStats, or None if no recording is active.
+    """
+    return _active.stats
+
+def count_call(name):
+    """
+    Count a call to a method of the data manager.
+
+    :param name: The name of the method.
+    """
+    stats = _active.stats
+    if stats is not None:
+        stats.calls[name] = stats.calls.get(name, 0) + 1
+
+def count_bytes_written(size):
+    """
+    Count bytes written by the storage.
+
+    :param size: The number of bytes.
+    """
+    stats = _active.stats
+    if stats is not None:
+        stats.bytes_written += size
+
+def count_hydrated(count=1):
+    """
+    Count objects built from their stored attributes.
+
+    :param count: The number of objects.
+    """
+    stats = _active.stats
+    if stats is not None:
+        stats.hydrated += count
+
+class serializing:
+    """
+    Context manager adding the time spent in its block to the serialization time of the current thread.
+    """
+
+    __slots__ = ('started',)
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        stats = _active.stats
+        if stats is not None:
+            stats.serialize_seconds += time.perf_counter() - self.started
+        return False
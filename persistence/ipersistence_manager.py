@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from persistence.indexes import declared_index
+from persistence.query import select
+from persistence.records import attributes
 
 class IPersistenceManager(ABC):
     """
@@ -43,3 +46,107 @@ class IPersistenceManager(ABC):
         :return: A list of loaded objects.
         """
         pass
+
+    def load_many(self, cls, ids):
+        """
+        Load the objects of a given class with any of several IDs.
+        This default loads them one at a time, subclasses should load them in one pass.
+
+        :param cls: The class of the objects to be loaded.
+        :param ids: The distinct IDs of the objects to be loaded.
+        :return: A dictionary mapping the ID of every object found, as a string, to the object.
+        """
+        loaded = {}
+        for obj_id in ids:
+            obj = self.load(cls, obj_id)
+            if obj is not None:
+                loaded[str(obj_id)] = obj
+        return loaded
+
+    def save_many(self, objs):
+        """
+        Save several objects. Subclasses should override this to write them in a single flush.
+
+        :param objs: The objects to be saved.
+        """
+        for obj in objs:
+            self.save(obj)
+
+    def delete_many(self, objs):
+        """
+        Delete several objects. Subclasses should override this to write the deletions in a single flush.
+
+        :param objs: The objects to be deleted.
+        """
+        for obj in objs:
+            self.delete(obj)
+
+    def find_by(self, cls, field, value):
+        """
+        Load the objects of a given class whose indexed field matches a value.
+        This default scans every object, subclasses should answer it from an index.
+
+        :param cls: The class of the objects to be loaded.
+        :param field: The name of the indexed field.
+        :param value: The value to look up.
+        :return: A list of loaded objects.
+        """
+        normalize = declared_index(cls, field).normalize
+        key = normalize(value)
+        return [obj for obj in self.load_all(cls) if key is not None and normalize(getattr(obj, field, None)) == key]
+
+    def find_one_by(self, cls, field, value):
+        """
+        Load the first object of a given class whose indexed field matches a value.
+
+        :param cls: The class of the object to be loaded.
+        :param field: The name of the indexed field.
+        :param value: The value to look up.
+        :return: The loaded object if found, None otherwise.
+        """
+        return next(iter(self.find_by(cls, field, value)), None)
+
+    def query(self, cls, conditions=(), after=None, limit=None):
+        """
+        Load a page of the objects of a given class, ordered by creation time and ID.
+        This default loads every object, subclasses should only load the page.
+
+        :param cls: The class of the objects to be loaded.
+        :param conditions: The Conditions the objects must satisfy.
+        :param after: The (created_at, id) position to start after, or None to start at the beginning.
+        :param limit: The maximum number of objects to load, or None for all of them.
+        :return: A list of loaded objects.
+        """
+        return select(cls, self.load_all(cls), conditions, after, limit, attributes=attributes)
+
+    def iterate(self, cls, conditions=()):
+        """
+        Yield the objects of a given class one at a time, in storage order.
+        This default loads every object first, subclasses should build them as they are consumed.
+
+        :param cls: The class of the objects to be loaded.
+        :param conditions: The Conditions the objects must satisfy.
+        :return: An iterator of loaded objects.
+        """
+        for obj in self.load_all(cls):
+            if all(condition.matches(cls, attributes(obj)) for condition in conditions):
+                yield obj
+
+    def changes(self):
+        """
+        Get the objects written by other processes since the last call, so that copies of them
+        kept in memory can be dropped. Storages that are not shared between processes have
+        nothing to report.
+
+        :return: A list of (class name, ID) pairs, or None if any object may have changed.
+        """
+        return []
+
+    def check_indexes(self, cls):
+        """
+        Check the secondary indexes of a class against the stored data.
+
+        :param cls: The model class.
+        :return: A list of problems found, empty if the indexes are consistent.
+        """
+        return []
@@ -0,0 +1,77 @@
+import threading
+from contextlib import contextmanager
+
+class RWLock:
+    """
+    RWLock lets many threads read at the same time while a writer has exclusive access.
+    A waiting writer blocks new readers, so a steady stream of reads cannot starve writes.
+    The lock is not reentrant: a thread holding it must not acquire it again.
+    """
+
+    def __init__(self):
+        """
+        Initialize an unlocked RWLock.
+        """
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    def acquire_read(self):
+        """
+        Wait until no writer holds or waits for the lock, then acquire it for reading.
+        """
+        with self._condition:
+            while self._writer or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+
+    def release_read(self):
+        """
+        Release the lock acquired for reading.
+        """
+        with self._condition:
+            self._readers -= 1
+            if self._readers == 0:
+                self._condition.notify_all()
+
+    def acquire_write(self):
+        """
+        Wait until no thread holds the lock, then acquire it for writing.
+        """
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+
+    def release_write(self):
+        """
+        Release the lock acquired for writing.
+        """
+        with self._condition:
+            self._writer = False
+            self._condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        """
+        Hold the lock for reading.
+        """
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """
+        Hold the lock for writing.
+        """
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
@@ -0,0 +1,97 @@
+import argparse
+import os
+from persistence.codecs import codec
+
+# Embedded relation lists written by earlier versions, with the ID list replacing each of them
+EMBEDDED_RELATIONS = {
+    'Place': {'reviews': 'review_ids', 'amenities': 'amenity_ids'},
+    'User': {'places': 'place_ids', 'reviews': 'review_ids'},
+    'City': {'places': 'place_ids'},
+    'Amenity': {'places': 'place_ids'},
+    'Country': {'cities': 'city_ids'},
+}
+
+def _ids_by(objects, field):
+    """
+    Group the IDs of stored objects by the value of one of their fields.
+
+    :param objects: A dictionary mapping IDs to stored attributes.
+    :param field: The name of the field to group by.
+    :return: A dictionary mapping field values to lists of IDs, in storage order.
+    """
+    grouped = {}
+    for obj_id, obj_data in objects.items():
+        value = obj_data.get(field)
+        if value is not None:
+            grouped.setdefault(str(value), []).append(str(obj_id))
+    return grouped
+
+def normalize_references(data):
+    """
+    Replace the embedded relation lists of a FileStorage data dictionary with lists of IDs.
+    Embedded objects were stored as their repr, which does not keep their IDs, so every relation
+    is rebuilt from the foreign keys of the related objects instead.
+
+    :param data: The data dictionary of a FileStorage, changed in place.
+    :return: The same data dictionary.
+    """
+    for obj_class in ('User', 'Place', 'Review', 'Amenity', 'City', 'Country'):
+        data.setdefault(obj_class, {})
+    places, reviews = data['Place'], data['Review']
+    reviews_by_place = _ids_by(reviews, 'place_id')
+    reviews_by_user = _ids_by(reviews, 'user_id')
+    places_by_host = _ids_by(places, 'host_id')
+    places_by_city = _ids_by(places, 'city_id')
+    cities_by_country = _ids_by(data['City'], 'country_code')
+    places_by_amenity = {}
+    for place_id, place_data in places.items():
+        for amenity_id in place_data.get('amenity_ids') or []:
+            places_by_amenity.setdefault(str(amenity_id), []).append(str(place_id))
+
+    for place_id, place_data in places.items():
+        place_data['review_ids'] = reviews_by_place.get(str(place_id), [])
+        place_data['amenity_ids'] = [str(amenity_id) for amenity_id in place_data.get('amenity_ids') or []]
+    for user_id, user_data in data['User'].items():
+        user_data['place_ids'] = places_by_host.get(str(user_id), [])
+        user_data['review_ids'] = reviews_by_user.get(str(user_id), [])
+    for city_id, city_data in data['City'].items():
+        city_data['place_ids'] = places_by_city.get(str(city_id), [])
+    for amenity_id, amenity_data in data['Amenity'].items():
+        amenity_data['place_ids'] = places_by_amenity.get(str(amenity_id), [])
+    for country_data in data['Country'].values():
+        country_data['city_ids'] = cities_by_country.get(str(country_data.get('code')), [])
+
+    for obj_class, relations in EMBEDDED_RELATIONS.items():
+        for obj_data in data[obj_class].values():
+            for embedded in relations:
+                obj_data.pop(embedded, None)
+    return data
+
+def migrate(json_path, output_path=None):
+    """
+    Rewrite a FileStorage JSON file with ID lists instead of embedded objects.
+    The new file is written next to the output path and renamed over it, so a failed run leaves it untouched.
+    A WALFileStorage must be compacted first so its snapshot holds every object.
+
+    :param json_path: The path to the JSON file written by FileStorage.
+    :param output_path: The path to write the migrated file to. Defaults to the input path.
+    :return: A tuple with the size of the file in bytes before and after the migration.
+    """
+    output_path = output_path or json_path
+    size_before = os.path.getsize(json_path)
+    with open(json_path, 'rb') as file:
+        data = codec.loads(file.read())
+    normalize_references(data)
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(codec.dumps(data))
+    os.replace(tmp_path, output_path)
+    return size_before, os.path.getsize(output_path)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replace the embedded relations of a FileStorage JSON file with ID lists.')
+    parser.add_argument('json_path', help='The FileStorage JSON file')
+    parser.add_argument('output_path', nargs='?', help='Where to write the migrated file, defaults to the input file')
+    args = parser.parse_args()
+    size_before, size_after = migrate(args.json_path, args.output_path)
+    print(f"{size_before} bytes -> {size_after} bytes")
@@ -0,0 +1,45 @@
+import argparse
+from persistence.snapshot import open_snapshot
+from persistence.sqlite_storage import SQLiteStorage
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.user import User
+
+MODELS = {cls.__name__: cls for cls in (User, Place, Review, Amenity, City, Country)}
+
+def migrate(json_path, db_path):
+    """
+    Copy every object of a FileStorage file into a SQLite database. The file is read through the
+    snapshot readers, so it may be in the JSON or the binary snapshot format.
+
+    :param json_path: The path to the file written by FileStorage.
+    :param db_path: The path to the SQLite database to fill.
+    :return: A dictionary with the number of objects migrated per class.
+    """
+    reader = open_snapshot(json_path)
+    if reader is None:
+        raise FileNotFoundError(f"No data to migrate in {json_path}")
+    storage = SQLiteStorage(db_path)
+    counts = {}
+    try:
+        with reader:
+            for obj_class in reader.classes():
+                if obj_class not in MODELS:
+                    raise ValueError(f"Unknown class in {json_path}: {obj_class}")
+                objects = reader.read_class(obj_class)
+                storage.import_records(MODELS[obj_class], objects.values())
+                counts[obj_class] = len(objects)
+    finally:
+        storage.close()
+    return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Migrate a FileStorage file to SQLite.')
+    parser.add_argument('json_path', help='The FileStorage file, as JSON or as a binary snapshot')
+    parser.add_argument('db_path', help='The SQLite database to create or update')
+    args = parser.parse_args()
+    for obj_class, count in migrate(args.json_path, args.db_path).items():
+        print(f"{obj_class}: {count}")
@@ -0,0 +1,82 @@
+import heapq
+from datetime import datetime
+from persistence.indexes import declared_indexes, normalize_value
+
+class Condition:
+    """
+    A filter on a field of the stored objects of a class.
+    'eq' compares normalized values, 'gte' and 'lte' compare numbers.
+    """
+
+    OPERATORS = ('eq', 'gte', 'lte')
+
+    def __init__(self, field, op, value):
+        """
+        Initialize the Condition.
+
+        :param field: The name of the field to filter on.
+        :param op: The comparison, one of 'eq', 'gte' or 'lte'.
+        :param value: The value to compare the field with.
+        """
+        if op not in self.OPERATORS:
+            raise ValueError(f"Unknown operator: {op}")
+        self.field = field
+        self.op = op
+        self.value = value
+
+    def matches(self, cls, obj_data):
+        """
+        Check whether the stored attributes of an object satisfy the condition.
+
+        :param cls: The class of the object.
+        :param obj_data: The stored attributes of the object.
+        :return: True if the object satisfies the condition.
+        """
+        actual = obj_data.get(self.field)
+        if actual is None:
+            return False
+        if self.op == 'eq':
+            index = declared_indexes(cls).get(self.field)
+            normalize = index.normalize if index else normalize_value
+            return normalize(actual) == normalize(self.value)
+        try:
+            actual = float(actual)
+        except (TypeError, ValueError):
+            return False
+        return actual >= self.value if self.op == 'gte' else actual <= self.value
+
+def sort_key(obj_data):
+    """
+    Get the position of an object in the stable ordering used for pagination.
+
+    :param obj_data: The stored attributes of an object.
+    :return: A tuple (created_at, id).
+    """
+    created_at = obj_data.get('created_at')
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return created_at, str(obj_data.get('id'))
+
+def select(cls, items, conditions=(), after=None, limit=None, attributes=None):
+    """
+    Filter, order and limit stored objects.
+    Only the selected items are kept in memory when a limit is given.
+
+    :param cls: The class of the objects.
+    :param items: An iterable of stored attribute dictionaries, or of objects when attributes is given.
+    :param conditions: The Conditions the objects must satisfy.
+    :param after: The (created_at, id) position to start after, or None to start at the beginning.
+    :param limit: The maximum number of items to return, or None for all of them.
+    :param attributes: A function returning the attribute dictionary of an item. Defaults to the item itself.
+    :return: A list of the selected items ordered by (created_at, id).
+    """
+    attributes = attributes or (lambda item: item)
+    candidates = ((sort_key(attributes(item)), item) for item in items
+                  if all(condition.matches(cls, attributes(item)) for condition in conditions))
+    if after is not None:
+        candidates = ((key, item) for key, item in candidates if key > after)
+    if limit is None:
+        selected = sorted(candidates, key=lambda candidate: candidate[0])
+    else:
+        selected = heapq.nsmallest(limit, candidates, key=lambda candidate: candidate[0])
+    return [item for _, item in selected]
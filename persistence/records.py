@@ -0,0 +1,70 @@
+import uuid
+from datetime import datetime
+from operator import attrgetter
+from persistence.instrumentation import count_hydrated
+
+_getters = {} # attrgetter of the fields of each class declaring __fields__
+
+def fields(cls):
+    """
+    Get the field schema of a class: the names of the attributes stored for its objects.
+
+    :param cls: The class.
+    :return: A tuple of attribute names, or None if the objects keep their attributes in __dict__.
+    """
+    return getattr(cls, '__fields__', None)
+
+def attributes(obj):
+    """
+    Get the stored attributes of an object. Objects of classes declaring __fields__ are read field
+    by field, others through their __dict__.
+
+    :param obj: The object.
+    :return: A new dictionary of the attributes.
+    """
+    cls = obj.__class__
+    names = fields(cls)
+    if names is None:
+        return dict(obj.__dict__)
+    getter = _getters.get(cls)
+    if getter is None:
+        getter = _getters[cls] = attrgetter(*names)
+    try:
+        data = dict(zip(names, getter(obj)))
+    except AttributeError:
+        # Objects still being constructed lack the fields not assigned yet
+        data = {name: getattr(obj, name) for name in names if hasattr(obj, name)}
+    if cls.__dictoffset__:
+        data.update(obj.__dict__)
+    return data
+
+def hydrate(cls, obj_data):
+    """
+    Build an object of a given class from its stored attributes without calling its constructor.
+    Fields of the schema missing from the stored attributes are set to None, and stored attributes
+    outside the schema are dropped unless the objects have a __dict__.
+
+    :param cls: The class of the object to build.
+    :param obj_data: The stored attributes of the object.
+    :return: The built object.
+    """
+    obj = cls.__new__(cls)
+    names = fields(cls)
+    if names is None:
+        obj.__dict__.update(obj_data)
+    else:
+        for name in names:
+            setattr(obj, name, obj_data.get(name))
+        if cls.__dictoffset__:
+            obj.__dict__.update((key, value) for key, value in obj_data.items() if key not in names)
+    if not isinstance(obj.id, uuid.UUID):
+        obj.id = uuid.UUID(obj.id)
+
+    if isinstance(obj.created_at, str):
+        obj.created_at = datetime.fromisoformat(obj.created_at)
+
+    if isinstance(obj.updated_at, str):
+        obj.updated_at = datetime.fromisoformat(obj.updated_at)
+
+    count_hydrated()
+    return obj
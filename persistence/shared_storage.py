@@ -0,0 +1,342 @@
+import fcntl
+import os
+import time
+from contextlib import contextmanager
+from persistence.file_storage import FileStorage
+from persistence.wal_storage import WALFileStorage
+from persistence.records import attributes
+
+MAX_PENDING_CHANGES = 10000 # Past this many unreported changes, report that anything may have changed
+
+def _signature(path):
+    """
+    Identify the current version of a file. A file replaced by a rename gets a new inode.
+
+    :param path: The path of the file.
+    :return: An (inode, mtime, size) tuple, or None if the file does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+class SharedFileStorage(WALFileStorage):
+    """
+    SharedFileStorage class that extends WALFileStorage so several processes, such as gunicorn
+    workers, can share the same files.
+    Writers take an exclusive lock on a lock file, catch up with the log and append to it, so no
+    write is lost and unique indexes are checked against every process. Readers compare the
+    snapshot and the log with the versions they last read, replay only the records appended by
+    other processes, and reopen the files when another process compacted the log, reading each
+    class again the next time it is used.
+    """
+
+    def __init__(self, file_path='/usr/src/app/file_storage.json', log_path=None, compact_threshold=10000, fsync=True,
+                 flush_interval=None, snapshot_format='json'):
+        """
+        Initialize SharedFileStorage with a snapshot path and a log path.
+
+        :param file_path: The path to the JSON snapshot file.
+        :param log_path: The path to the append-only log. Defaults to the snapshot path with a .log suffix.
+        :param compact_threshold: The number of log records after which the log is compacted.
+        :param fsync: Whether every log append is forced to disk before returning.
+        :param flush_interval: The number of seconds between two compactions of the flusher thread.
+                               None compacts only when the log reaches the threshold.
+        :param snapshot_format: 'json' or 'binary', the format of the snapshot file.
+        """
+        self.lock_path = file_path + '.lock'
+        self.compaction_lock_path = file_path + '.compact.lock'
+        self._lock_file = open(self.lock_path, 'a')
+        self.changed = []
+        self.reloaded = False
+        self.snapshot_signature = None
+        self.log_inode = None
+        self.log_offset = 0
+        with self._file_lock(fcntl.LOCK_EX):
+            super().__init__(file_path, log_path, compact_threshold, fsync, flush_interval, snapshot_format)
+
+    @contextmanager
+    def _file_lock(self, operation):
+        """
+        Hold the lock file, shared between processes.
+
+        :param operation: fcntl.LOCK_SH to read, fcntl.LOCK_EX to write.
+        """
+        fcntl.flock(self._lock_file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _compaction_lock(self):
+        """
+        Try to take the compaction lock file without waiting. It is opened for each attempt, so it
+        excludes the other threads of the process as well as the other processes, and a process
+        that dies while compacting releases it.
+
+        :return: A context manager yielding True if the lock was taken, False if another compaction holds it.
+        """
+        with open(self.compaction_lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _finish_interrupted_compaction(self):
+        """
+        Fold everything into a fresh snapshot if a compaction rotated the log and its process died,
+        but not while another process is still compacting.
+        """
+        with self._compaction_lock() as acquired:
+            if acquired:
+                super()._finish_interrupted_compaction()
+
+    def _mark_read(self):
+        """
+        Remember the versions of the snapshot and of the log that the data dictionary reflects.
+        The lock file must be held.
+        """
+        self.snapshot_signature = _signature(self.file_path)
+        log_signature = _signature(self.log_path)
+        self.log_inode = log_signature[0] if log_signature else None
+        self.log_offset = log_signature[2] if log_signature else 0
+
+    def _is_current(self):
+        """
+        Check, without locking, whether another process may have written since the last read.
+
+        :return: True if the snapshot and the log are the versions last read.
+        """
+        log_signature = _signature(self.log_path)
+        return (self.opened and _signature(self.file_path) == self.snapshot_signature and log_signature is not None
+                and log_signature[0] == self.log_inode and log_signature[2] == self.log_offset)
+
+    def _read_tail(self, truncate):
+        """
+        Apply the records appended to the log since the last read.
+        A record without its end of line was torn by a process that died while writing it.
+
+        :param truncate: Whether to cut a torn record off the log. Only a writer may do it.
+        """
+        with open(self.log_path, 'rb') as file:
+            file.seek(self.log_offset)
+            for line in file:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    record = self.codec.loads(line)
+                except ValueError:
+                    break
+                self._apply(record)
+                self._record_change(record['class'], record['id'])
+                self.log_offset += len(line)
+                self.log_records += 1
+        if truncate and os.path.getsize(self.log_path) > self.log_offset:
+            os.truncate(self.log_path, self.log_offset)
+
+    def _record_change(self, obj_class, obj_id):
+        """
+        Remember that another process wrote an object, until changes() reports it.
+
+        :param obj_class: The name of the class of the object.
+        :param obj_id: The ID of the object.
+        """
+        if self.reloaded:
+            return
+        if len(self.changed) >= MAX_PENDING_CHANGES:
+            self.reloaded = True
+            self.changed = []
+        else:
+            self.changed.append((obj_class, obj_id))
+
+    def _catch_up(self, truncate=False):
+        """
+        Bring the data dictionary up to date with the files. The lock file must be held.
+        If the files were not opened yet, or the snapshot or the log was replaced because another
+        process compacted the log, the snapshot is opened again and the whole log replayed, after
+        the rotated log of a compaction in progress, their records kept aside until their class is
+        loaded. Otherwise only the tail of the log is replayed.
+
+        :param truncate: Whether to cut a torn record off the log. Only a writer may do it.
+        """
+        log_signature = _signature(self.log_path)
+        if (not self.opened or _signature(self.file_path) != self.snapshot_signature or log_signature is None
+                or log_signature[0] != self.log_inode):
+            self._reset()
+            FileStorage._open(self) # The log is replayed below, from the versions of the files under the lock
+            self._pending = {}
+            self.log_records = 0
+            self.log_offset = 0
+            self.log_inode = log_signature[0] if log_signature else None
+            # Records a compaction is still folding into the next snapshot
+            self._replay(self.rotated_log_path)
+            if log_signature is not None:
+                self._read_tail(truncate)
+            self.snapshot_signature = _signature(self.file_path)
+            self.reloaded = True
+            self.changed = []
+            self._log.close()
+            self._log = open(self.log_path, 'ab')
+        elif log_signature[2] != self.log_offset:
+            self._read_tail(truncate)
+
+    def refresh(self):
+        """
+        Apply the writes of other processes, if there are any.
+        """
+        if self._is_current():
+            return
+        with self.lock.write(), self._file_lock(fcntl.LOCK_SH):
+            self._catch_up()
+
+    def changes(self):
+        """
+        Get the objects written by other processes since the last call.
+
+        :return: A list of (class name, ID) pairs, or None if any object may have changed.
+        """
+        self.refresh()
+        with self.lock.write():
+            if self.reloaded:
+                self.reloaded = False
+                self.changed = []
+                return None
+            changed, self.changed = self.changed, []
+            return changed
+
+    def save_many(self, objs):
+        """
+        Save several objects and append them to the log in a single write, holding the lock
+        file so unique indexes are checked against the writes of every process.
+
+        :param objs: The objects to be saved.
+        """
+        with self.lock.write(), self._file_lock(fcntl.LOCK_EX):
+            self._catch_up(truncate=True)
+            self._check_unique(objs)
+            records = []
+            for obj in objs:
+                obj_id = str(obj.id)
+                obj_data = attributes(obj)
+                self._put(obj.__class__, obj_id, obj_data)
+                records.append({'op': 'save', 'class': obj.__class__.__name__, 'id': obj_id, 'data': obj_data})
+            if records:
+                self._append(*records)
+                self.log_offset = os.fstat(self._log.fileno()).st_size
+        self._maybe_compact()
+
+    def delete_many(self, objs):
+        """
+        Delete several objects and append the deletions to the log in a single write, holding the lock file.
+
+        :param objs: The objects to be deleted.
+        """
+        with self.lock.write(), self._file_lock(fcntl.LOCK_EX):
+            self._catch_up(truncate=True)
+            records = []
+            for obj in objs:
+                obj_id = str(obj.id)
+                if self._remove(obj.__class__, obj_id):
+                    records.append({'op': 'delete', 'class': obj.__class__.__name__, 'id': obj_id})
+            if records:
+                self._append(*records)
+                self.log_offset = os.fstat(self._log.fileno()).st_size
+        self._maybe_compact()
+
+    def compact(self):
+        """
+        Fold the log into a new snapshot. The log is rotated under the lock file, so the other
+        processes keep appending to a fresh log and reading while the snapshot is serialized
+        outside of it; the lock file is taken again only to rename the snapshot into place.
+        Both files are replaced by renames, so other processes notice the compaction and load them again.
+        """
+        with self._compaction_lock() as acquired:
+            if not acquired:
+                return # Another thread or process is compacting
+            with self.lock.write(), self._file_lock(fcntl.LOCK_EX):
+                self._catch_up(truncate=True)
+                if os.path.exists(self.rotated_log_path):
+                    # The process of a previous compaction died after rotating the log
+                    self._compact_locked()
+                    return
+                data = self._load_all()
+                self._log.close()
+                os.replace(self.log_path, self.rotated_log_path)
+                self._log = open(self.log_path, 'ab')
+                self.log_records = 0
+                self._mark_read()
+                self.flushing_since, self.dirty_since = self.dirty_since, None
+                # Saved records are never mutated in place, so a shallow copy is a consistent snapshot
+                snapshot = {obj_class: dict(objects) for obj_class, objects in data.items()}
+            start = time.perf_counter()
+            tmp_path = self._write_temporary_snapshot(snapshot)
+            with self.lock.write(), self._file_lock(fcntl.LOCK_EX):
+                os.replace(tmp_path, self.file_path)
+                os.remove(self.rotated_log_path)
+                # The new snapshot holds the rotated records, already in the data dictionary
+                self.snapshot_signature = _signature(self.file_path)
+            self._flushed(start)
+
+    def _compact_locked(self):
+        """
+        Fold the rotated log and the log into a new snapshot while holding the lock file, after a
+        compaction that did not finish.
+        """
+        start = time.perf_counter()
+        self.flushing_since, self.dirty_since = self.dirty_since, None
+        self._write_snapshot(self._load_all())
+        os.remove(self.rotated_log_path)
+        tmp_path = self.log_path + '.tmp'
+        open(tmp_path, 'w').close()
+        os.replace(tmp_path, self.log_path)
+        self._log.close()
+        self._log = open(self.log_path, 'ab')
+        self.log_records = 0
+        self._mark_read()
+        self._flushed(start)
+
+    def load(self, cls, obj_id):
+        self.refresh()
+        return super().load(cls, obj_id)
+
+    def load_many(self, cls, ids):
+        self.refresh()
+        return super().load_many(cls, ids)
+
+    def load_all(self, cls):
+        self.refresh()
+        return super().load_all(cls)
+
+    def find_by(self, cls, field, value):
+        self.refresh()
+        return super().find_by(cls, field, value)
+
+    def find_one_by(self, cls, field, value):
+        self.refresh()
+        return super().find_one_by(cls, field, value)
+
+    def query(self, cls, conditions=(), after=None, limit=None):
+        self.refresh()
+        return super().query(cls, conditions, after, limit)
+
+    def iterate(self, cls, conditions=()):
+        self.refresh()
+        return super().iterate(cls, conditions)
+
+    def check_indexes(self, cls):
+        self.refresh()
+        return super().check_indexes(cls)
+
+    def close(self):
+        """
+        Close the log and the lock file.
+        """
+        super().close()
+        self._lock_file.close()
@@ -0,0 +1,376 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from operator import itemgetter
+from persistence.codecs import codec
+
+MAGIC = b'HBNBSNP1'
+HEADER = struct.Struct('<8sI') # Magic number and length of the JSON table of contents
+ABSENT = 0xFFFFFFFF # Dictionary index of an attribute the object does not have
+COMPRESSION_LEVEL = 1
+COMPRESSION_RATIO = 0.5 # Blobs that do not shrink at least this much are stored as they are, to load faster
+DICTIONARY_RATIO = 4 # Columns with at most one distinct value per this many objects use a dictionary
+
+class _Absent:
+    """
+    Marker for an attribute an object does not have, so it is left out of its record.
+    """
+
+_absent = _Absent()
+
+def _to_little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+class _BlobWriter:
+    """
+    Collect the compressed blobs of a snapshot and their positions.
+    """
+
+    def __init__(self):
+        self.blobs = []
+        self.offset = 0
+
+    def add(self, blob):
+        """
+        Append a blob to the snapshot, compressed if that makes it much smaller.
+
+        :param blob: The bytes to append.
+        :return: An [offset, length, compressed] list, the offset relative to the start of the blobs.
+        """
+        compressed = zlib.compress(blob, COMPRESSION_LEVEL)
+        if len(compressed) <= len(blob) * COMPRESSION_RATIO:
+            position = [self.offset, len(compressed), 1]
+            blob = compressed
+        else:
+            position = [self.offset, len(blob), 0]
+        self.blobs.append(blob)
+        self.offset += len(blob)
+        return position
+
+def _encode_column(writer, values):
+    """
+    Encode the values of an attribute, as a JSON array, or as a dictionary of the distinct JSON
+    values plus one 32-bit index per object when few values repeat a lot or some objects lack the attribute.
+
+    :param writer: The _BlobWriter receiving the blobs.
+    :param values: The values of the column, _absent for missing attributes.
+    :return: The table of contents entry of the column, without its name.
+    """
+    positions = {}
+    distinct = []
+    indexes = array('I')
+    encoded_values = []
+    for value in values:
+        if value is _absent:
+            indexes.append(ABSENT)
+            continue
+        encoded = codec.dumps(value)
+        encoded_values.append(encoded)
+        position = positions.get(encoded)
+        if position is None:
+            position = positions[encoded] = len(distinct)
+            distinct.append(encoded)
+        indexes.append(position)
+    if len(encoded_values) == len(values) and len(distinct) * DICTIONARY_RATIO > len(values):
+        return {'kind': 'json', 'blobs': [writer.add(b'[' + b','.join(encoded_values) + b']')]}
+    return {'kind': 'dict', 'blobs': [writer.add(b'[' + b','.join(distinct) + b']'),
+                                      writer.add(_to_little_endian(indexes).tobytes())]}
+
+def _encode_class(writer, objects):
+    """
+    Encode the records of a class column by column.
+
+    :param writer: The _BlobWriter receiving the blobs.
+    :param objects: A dictionary mapping IDs to attribute dictionaries.
+    :return: The table of contents entry of the class.
+    """
+    keys = list(objects)
+    records = list(objects.values())
+    names = {}
+    for record in records:
+        names.update(dict.fromkeys(record))
+    columns = [dict(_encode_column(writer, keys), name=None)]
+    for name in names:
+        values = [record.get(name, _absent) for record in records]
+        if name == 'id' and all(value is not _absent and str(value) == key for key, value in zip(keys, values)):
+            # The ID of every object is its key, it is not stored twice
+            columns.append({'name': name, 'kind': 'key', 'blobs': []})
+        else:
+            columns.append(dict(_encode_column(writer, values), name=name))
+    return {'count': len(keys), 'columns': columns}
+
+def write_snapshot(file, data):
+    """
+    Write a data dictionary as a binary snapshot.
+    Each class is stored in its own section with one compressed column per attribute, so
+    attribute names are stored once per class and repeated values once per column.
+
+    :param file: The binary file to write to.
+    :param data: A dictionary mapping class names to dictionaries of attribute dictionaries.
+    """
+    writer = _BlobWriter()
+    contents = {obj_class: _encode_class(writer, objects) for obj_class, objects in data.items()}
+    table = codec.dumps(contents)
+    file.write(HEADER.pack(MAGIC, len(table)))
+    file.write(table)
+    for blob in writer.blobs:
+        file.write(blob)
+
+def write_json_snapshot(file, data):
+    """
+    Write a data dictionary as a JSON document with each class on its own line. The codecs never
+    write a line break inside a document, so the line breaks mark where each class starts and ends.
+
+    :param file: The binary file to write to.
+    :param data: A dictionary mapping class names to dictionaries of attribute dictionaries.
+    """
+    file.write(b'{\n')
+    for position, (obj_class, objects) in enumerate(data.items()):
+        if position:
+            file.write(b',\n')
+        file.write(codec.dumps(obj_class) + b':' + codec.dumps(objects))
+    file.write(b'\n}' if data else b'}')
+
+def is_snapshot(path):
+    """
+    Check whether a file is a binary snapshot.
+
+    :param path: The path of the file.
+    :return: True if the file starts with the snapshot magic number.
+    """
+    try:
+        with open(path, 'rb') as file:
+            return file.read(len(MAGIC)) == MAGIC
+    except FileNotFoundError:
+        return False
+
+class SnapshotReader:
+    """
+    SnapshotReader maps a binary snapshot in memory and decodes the sections of the classes asked for,
+    without reading the others from disk.
+    """
+
+    def __init__(self, path):
+        """
+        Open a snapshot and read its table of contents.
+
+        :param path: The path of the snapshot file.
+        :raises ValueError: If the file is not a binary snapshot.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, table_length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a binary snapshot")
+        self._start = HEADER.size + table_length
+        self.contents = codec.loads(self._map[HEADER.size:self._start])
+
+    def _blob(self, position):
+        offset, length, compressed = position
+        blob = self._map[self._start + offset:self._start + offset + length]
+        return zlib.decompress(blob) if compressed else blob
+
+    def _decode_column(self, column, keys, count):
+        kind = column['kind']
+        if kind == 'key':
+            return keys
+        if kind == 'json':
+            return codec.loads(self._blob(column['blobs'][0]))
+        distinct = codec.loads(self._blob(column['blobs'][0])) + [_absent]
+        indexes = _to_little_endian(array('I', self._blob(column['blobs'][1])))
+        if count == 0:
+            return []
+        if ABSENT in indexes:
+            indexes = [len(distinct) - 1 if index == ABSENT else index for index in indexes]
+        values = itemgetter(*indexes)(distinct)
+        return [values] if count == 1 else list(values)
+
+    def classes(self):
+        """
+        Get the names of the classes stored in the snapshot.
+
+        :return: A list of class names.
+        """
+        return list(self.contents)
+
+    def read_class(self, obj_class):
+        """
+        Decode the records of a class.
+
+        :param obj_class: The name of the class.
+        :return: A dictionary mapping IDs to attribute dictionaries, empty if the class is not stored.
+        """
+        section = self.contents.get(obj_class)
+        if section is None:
+            return {}
+        count = section['count']
+        key_column, *columns = section['columns']
+        keys = self._decode_column(key_column, None, count)
+        names = [column['name'] for column in columns]
+        values = [self._decode_column(column, keys, count) for column in columns]
+        if not names:
+            rows = [{} for _ in keys]
+        elif any(column['kind'] == 'dict' and _absent in value for column, value in zip(columns, values)):
+            rows = [{name: value for name, value in zip(names, row) if value is not _absent} for row in zip(*values)]
+        else:
+            rows = [dict(zip(names, row)) for row in zip(*values)]
+        return dict(zip(keys, rows))
+
+    def close(self):
+        """
+        Unmap the snapshot.
+        """
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class JSONSnapshotReader:
+    """
+    JSONSnapshotReader maps a FileStorage JSON file in memory. A file written by write_json_snapshot
+    is indexed by the byte range of each class, so a class is parsed without the others.
+    Any other JSON file is parsed whole the first time it is read.
+    """
+
+    def __init__(self, path):
+        """
+        Open a JSON file and index the byte range of each class.
+
+        :param path: The path of the JSON file.
+        """
+        self.path = path
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._data = None
+        self.sections = self._index()
+
+    def _index(self):
+        """
+        Find the byte range of each class in a file with one class per line.
+
+        :return: A dictionary mapping class names to (start, end) offsets, or None if the file has another layout.
+        """
+        if self._map[:2] != b'{\n':
+            return None
+        sections = {}
+        start = 2
+        end = self._map.find(b'\n', start)
+        while end != -1:
+            colon = self._map.find(b'":{', start, end)
+            stop = end - 1 if self._map[end - 1:end] == b',' else end
+            if self._map[start:start + 1] != b'"' or colon == -1 or self._map[stop - 1:stop] != b'}':
+                return None
+            sections[codec.loads(self._map[start:colon + 1])] = (colon + 2, stop)
+            start = end + 1
+            end = self._map.find(b'\n', start)
+        return sections if self._map[start:] == b'}' else None
+
+    def _parsed(self):
+        if self._data is None:
+            self._data = codec.loads(self._map[:])
+        return self._data
+
+    def classes(self):
+        """
+        Get the names of the classes stored in the file.
+
+        :return: A list of class names.
+        """
+        return list(self.sections if self.sections is not None else self._parsed())
+
+    def read_class(self, obj_class):
+        """
+        Parse the records of a class.
+
+        :param obj_class: The name of the class.
+        :return: A dictionary mapping IDs to attribute dictionaries, empty if the class is not stored.
+        """
+        if self.sections is None:
+            return self._parsed().get(obj_class, {})
+        section = self.sections.get(obj_class)
+        if section is None:
+            return {}
+        start, stop = section
+        return codec.loads(self._map[start:stop])
+
+    def close(self):
+        """
+        Unmap the file.
+        """
+        self._data = None
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def open_snapshot(path):
+    """
+    Open a snapshot file in either format, reading nothing but its index.
+
+    :param path: The path of the file.
+    :return: A SnapshotReader or a JSONSnapshotReader, or None if the file does not exist or is empty.
+    """
+    try:
+        if os.path.getsize(path) == 0:
+            return None
+    except FileNotFoundError:
+        return None
+    return SnapshotReader(path) if is_snapshot(path) else JSONSnapshotReader(path)
+
+def read_snapshot(path, classes=None):
+    """
+    Read a binary snapshot.
+
+    :param path: The path of the snapshot file.
+    :param classes: The names of the classes to read, or None for every class.
+    :return: A dictionary mapping class names to dictionaries of attribute dictionaries.
+    """
+    with SnapshotReader(path) as reader:
+        return {obj_class: reader.read_class(obj_class) for obj_class in (classes or reader.classes())}
+
+def to_binary(json_path, snapshot_path):
+    """
+    Convert a FileStorage JSON file to a binary snapshot.
+
+    :param json_path: The path of the JSON file.
+    :param snapshot_path: The path of the snapshot to write.
+    """
+    with open(json_path, 'rb') as file:
+        data = codec.loads(file.read())
+    with open(snapshot_path, 'wb') as file:
+        write_snapshot(file, data)
+
+def to_json(snapshot_path, json_path):
+    """
+    Convert a binary snapshot to a FileStorage JSON file.
+
+    :param snapshot_path: The path of the snapshot.
+    :param json_path: The path of the JSON file to write.
+    """
+    data = read_snapshot(snapshot_path)
+    with open(json_path, 'wb') as file:
+        write_json_snapshot(file, data)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert between FileStorage JSON files and binary snapshots.')
+    parser.add_argument('direction', choices=('to-binary', 'to-json'))
+    parser.add_argument('source', help='The file to convert')
+    parser.add_argument('target', help='The file to write')
+    args = parser.parse_args()
+    size_before = os.path.getsize(args.source)
+    (to_binary if args.direction == 'to-binary' else to_json)(args.source, args.target)
+    print(f"{size_before} bytes -> {os.path.getsize(args.target)} bytes")
@@ -0,0 +1,143 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180 # Length of a degree of latitude
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM # No two points are further apart
+
+def haversine_km(latitude, longitude, latitudes, longitudes):
+    """
+    Compute great-circle distances from a point.
+
+    :param latitude: The latitude of the point, in degrees.
+    :param longitude: The longitude of the point, in degrees.
+    :param latitudes: An array of latitudes, in degrees.
+    :param longitudes: An array of longitudes, in degrees.
+    :return: An array of distances in kilometers.
+    """
+    lat1 = math.radians(latitude)
+    lat2 = np.radians(latitudes)
+    sin_dlat = np.sin((lat2 - lat1) / 2)
+    sin_dlon = np.sin(np.radians(longitudes - longitude) / 2)
+    a = sin_dlat ** 2 + math.cos(lat1) * np.cos(lat2) * sin_dlon ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Get a latitude/longitude box holding every point within a distance of a point.
+
+    :param latitude: The latitude of the point, in degrees.
+    :param longitude: The longitude of the point, in degrees.
+    :param radius_km: The distance in kilometers.
+    :return: A (min_latitude, min_longitude, max_latitude, max_longitude) tuple. min_longitude is
+             greater than max_longitude when the box crosses the antimeridian.
+    """
+    dlat = radius_km / KM_PER_DEGREE
+    min_latitude, max_latitude = max(-90.0, latitude - dlat), min(90.0, latitude + dlat)
+    widest = max(abs(min_latitude), abs(max_latitude))
+    if widest >= 90.0:
+        return min_latitude, -180.0, max_latitude, 180.0
+    dlon = dlat / math.cos(math.radians(widest))
+    if dlon >= 180.0:
+        return min_latitude, -180.0, max_latitude, 180.0
+    min_longitude, max_longitude = longitude - dlon, longitude + dlon
+    if min_longitude < -180.0:
+        min_longitude += 360.0
+    if max_longitude > 180.0:
+        max_longitude -= 360.0
+    return min_latitude, min_longitude, max_latitude, max_longitude
+
+def in_box(latitudes, longitudes, min_latitude, min_longitude, max_latitude, max_longitude):
+    """
+    Check which points lie in a latitude/longitude box.
+
+    :param latitudes: An array of latitudes, in degrees.
+    :param longitudes: An array of longitudes, in degrees.
+    :return: A boolean array.
+    """
+    mask = (latitudes >= min_latitude) & (latitudes <= max_latitude)
+    if min_longitude <= max_longitude:
+        return mask & (longitudes >= min_longitude) & (longitudes <= max_longitude)
+    return mask & ((longitudes >= min_longitude) | (longitudes <= max_longitude))
+
+class GridIndex:
+    """
+    GridIndex finds the rows of a ColumnStore whose coordinates may lie in a latitude/longitude box.
+    The globe is cut into square cells numbered row by row, and the rows are kept sorted by cell,
+    so the cells of a box form one range of cell numbers per band of latitude, found by binary search.
+    Rows added or moved since the sorted arrays were built are kept in a set and always returned,
+    and the arrays are rebuilt once that set grows large. The candidates may include deleted rows
+    and rows that moved away, so callers check the coordinates of the rows returned.
+    """
+
+    def __init__(self, cell_degrees=0.1):
+        """
+        Initialize an empty GridIndex.
+
+        :param cell_degrees: The size of a cell, in degrees.
+        """
+        self.cell_degrees = cell_degrees
+        self.latitude_cells = math.ceil(180 / cell_degrees)
+        self.longitude_cells = math.ceil(360 / cell_degrees)
+        self.cells = np.empty(0, dtype=np.int64)
+        self.rows = np.empty(0, dtype=np.int64)
+        self.moved = set()
+
+    def _latitude_cell(self, latitudes):
+        return np.clip(np.floor((np.asarray(latitudes) + 90) / self.cell_degrees), 0, self.latitude_cells - 1).astype(np.int64)
+
+    def _longitude_cell(self, longitudes):
+        return np.clip(np.floor((np.asarray(longitudes) + 180) / self.cell_degrees), 0, self.longitude_cells - 1).astype(np.int64)
+
+    def rebuild(self, latitudes, longitudes, alive):
+        """
+        Sort the rows with coordinates by cell.
+
+        :param latitudes: The latitude column.
+        :param longitudes: The longitude column.
+        :param alive: The boolean column of the rows in use.
+        """
+        rows = np.flatnonzero(alive & ~np.isnan(latitudes) & ~np.isnan(longitudes))
+        cells = self._latitude_cell(latitudes[rows]) * self.longitude_cells + self._longitude_cell(longitudes[rows])
+        order = np.argsort(cells, kind='stable')
+        self.cells = cells[order]
+        self.rows = rows[order]
+        self.moved = set()
+
+    def move(self, row):
+        """
+        Record that a row was added or its coordinates changed.
+
+        :param row: The row.
+        """
+        self.moved.add(row)
+
+    def needs_rebuild(self):
+        """
+        Check whether enough rows moved for a rebuild to pay off.
+
+        :return: True if the set of moved rows is large.
+        """
+        return len(self.moved) > max(1024, len(self.rows) // 16)
+
+    def candidates(self, min_latitude, min_longitude, max_latitude, max_longitude):
+        """
+        Get the rows that may lie in a box.
+
+        :return: An array of distinct rows.
+        """
+        bands = np.arange(self._latitude_cell(min_latitude), self._latitude_cell(max_latitude) + 1) * self.longitude_cells
+        first, last = self._longitude_cell(min_longitude), self._longitude_cell(max_longitude)
+        if min_longitude <= max_longitude:
+            ranges = [(first, last)]
+        else:
+            ranges = [(first, self.longitude_cells - 1), (0, last)]
+        found = []
+        for start, end in ranges:
+            lows = np.searchsorted(self.cells, bands + start, 'left')
+            highs = np.searchsorted(self.cells, bands + end, 'right')
+            found.extend(self.rows[low:high] for low, high in zip(lows.tolist(), highs.tolist()) if high > low)
+        if self.moved:
+            found.append(np.fromiter(self.moved, dtype=np.int64, count=len(self.moved)))
+            return np.unique(np.concatenate(found))
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
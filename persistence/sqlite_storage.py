@@ -0,0 +1,429 @@
+import uuid
+import sqlite3
+import threading
+from datetime import datetime
+from persistence.ipersistence_manager import IPersistenceManager
+from persistence.records import attributes, hydrate
+from persistence.codecs import codec
+from persistence.instrumentation import count_bytes_written
+from persistence.indexes import UniqueConstraintError, declared_indexes, declared_index
+
+IN_BATCH_SIZE = 500 # IDs bound per IN (...) query, below the 999 variables older SQLite builds allow
+CHANGES_KEPT = 10000 # Rows kept in the _changes table; a reader further behind is told everything changed
+
+def _timestamp(value):
+    """
+    Format a creation time for the created_at column. Every value is stored in ISO 8601, whether it
+    comes from a model or from a JSON record, so the column sorts chronologically.
+
+    :param value: The creation time, as a datetime or an ISO 8601 string.
+    :return: The ISO 8601 string.
+    """
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.isoformat()
+
+def _to_real(value):
+    """
+    Convert a JSON value to a number the way Condition.matches does, for range conditions.
+    Registered as the to_real() SQL function: CAST(... AS REAL) would turn text that is not a
+    number into 0.0 where the JSON backends skip it.
+
+    :param value: The value extracted from a JSON document.
+    :return: The value as a float, or None if it is not a number.
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class SQLiteStorage(IPersistenceManager):
+    """
+    SQLiteStorage class that implements the IPersistenceManager interface.
+    It keeps one table per model in a SQLite database running in WAL mode. The attributes of an
+    object are stored as a JSON document next to one indexed column per field declared in the
+    __indexes__ of the model. Every thread gets its own connection, so several threads and
+    processes can share the database. Each write also appends the class and ID of the objects
+    it touches to a _changes table, so other storages can tell which objects to drop from memory.
+    """
+
+    def __init__(self, db_path='/usr/src/app/hbnb.sqlite3'):
+        """
+        Initialize SQLiteStorage with a database path.
+        Tables are created the first time a model class is used.
+
+        :param db_path: The path to the SQLite database file.
+        """
+        self.db_path = db_path
+        self.codec = codec
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._tables = {}
+        self._tables_lock = threading.Lock()
+        self._writer = uuid.uuid4().hex
+        self._changes_seen = None
+        self._changes_lock = threading.Lock()
+
+    def _connection(self):
+        """
+        Get the connection of the current thread, opening it on first use.
+
+        :return: A sqlite3 connection.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.create_function('to_real', 1, _to_real, deterministic=True)
+            with conn:
+                conn.execute('CREATE TABLE IF NOT EXISTS _changes (seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                             'class TEXT NOT NULL, id TEXT NOT NULL, writer TEXT NOT NULL)')
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _table(self, cls):
+        """
+        Get the indexes of the table of a class, creating the table, its indexed columns
+        and their SQL indexes if they do not exist yet.
+
+        :param cls: The model class.
+        :return: A dictionary mapping indexed column names to Index declarations.
+        """
+        obj_class = cls.__name__
+        if obj_class in self._tables:
+            return self._tables[obj_class]
+        with self._tables_lock:
+            if obj_class in self._tables:
+                return self._tables[obj_class]
+            indexes = declared_indexes(cls)
+            conn = self._connection()
+            with conn:
+                conn.execute(f'CREATE TABLE IF NOT EXISTS "{obj_class}" (id TEXT PRIMARY KEY, created_at TEXT, data TEXT NOT NULL)')
+                # Rows written before created_at was normalized hold str(datetime), with a space before the time
+                conn.execute(f"UPDATE \"{obj_class}\" SET created_at = replace(created_at, ' ', 'T') "
+                             "WHERE created_at LIKE '% %'")
+                existing = {row[1] for row in conn.execute(f'PRAGMA table_info("{obj_class}")')}
+                for field, declaration in indexes.items():
+                    if field not in existing:
+                        # Backfill an index declared after the table was created
+                        conn.execute(f'ALTER TABLE "{obj_class}" ADD COLUMN "{field}" TEXT')
+                        rows = conn.execute(f'SELECT id, data FROM "{obj_class}"').fetchall()
+                        conn.executemany(f'UPDATE "{obj_class}" SET "{field}" = ? WHERE id = ?',
+                                         [(declaration.normalize(self.codec.loads(data).get(field)), obj_id) for obj_id, data in rows])
+                    conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{obj_class}_{field}" ON "{obj_class}" ("{field}")')
+                conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{obj_class}_created_at" ON "{obj_class}" (created_at, id)')
+            self._tables[obj_class] = indexes
+            return indexes
+
+    def _check_unique(self, conn, cls, records):
+        """
+        Check that writing records keeps the unique indexes of their class unique.
+
+        :param conn: The connection to use.
+        :param cls: The class of the records.
+        :param records: The attribute dictionaries.
+        :raises UniqueConstraintError: If a record would break a unique index.
+        """
+        for field, declaration in self._table(cls).items():
+            if not declaration.unique:
+                continue
+            claimed = {}
+            for record in records:
+                obj_id = str(record['id'])
+                key = declaration.normalize(record.get(field))
+                if key is None:
+                    continue
+                holders = {row[0] for row in conn.execute(f'SELECT id FROM "{cls.__name__}" WHERE "{field}" = ?', (key,))}
+                if (holders - {obj_id} and obj_id not in holders) or claimed.get(key, obj_id) != obj_id:
+                    raise UniqueConstraintError(cls.__name__, field, record.get(field))
+                claimed[key] = obj_id
+
+    def _log_changes(self, conn, pairs):
+        """
+        Append the objects a transaction writes to the _changes table, and drop the rows older
+        than the last CHANGES_KEPT.
+
+        :param conn: The connection of the transaction.
+        :param pairs: The (class name, ID) pairs of the objects written.
+        """
+        conn.executemany('INSERT INTO _changes (class, id, writer) VALUES (?, ?, ?)',
+                         [(obj_class, obj_id, self._writer) for obj_class, obj_id in pairs])
+        conn.execute('DELETE FROM _changes WHERE seq <= (SELECT max(seq) FROM _changes) - ?', (CHANGES_KEPT,))
+
+    def _upsert(self, conn, cls, records):
+        """
+        Insert or update records of a class.
+
+        :param conn: The connection to use.
+        :param cls: The class of the records.
+        :param records: The attribute dictionaries.
+        """
+        indexes = self._table(cls)
+        columns = ['id', 'created_at'] + [f'"{field}"' for field in indexes] + ['data']
+        placeholders = ', '.join('?' for _ in columns)
+        updates = ', '.join(f'{column} = excluded.{column}' for column in columns[1:])
+        rows = []
+        size = 0
+        for record in records:
+            values = [str(record['id']), _timestamp(record['created_at'])]
+            values.extend(declaration.normalize(record.get(field)) for field, declaration in indexes.items())
+            data = self.codec.dumps(record)
+            size += len(data)
+            values.append(data.decode())
+            rows.append(values)
+        count_bytes_written(size)
+        # An upsert keeps the rowid, so load_all keeps returning objects in insertion order
+        conn.executemany(f'INSERT INTO "{cls.__name__}" ({", ".join(columns)}) VALUES ({placeholders}) '
+                         f'ON CONFLICT(id) DO UPDATE SET {updates}', rows)
+        self._log_changes(conn, [(cls.__name__, row[0]) for row in rows])
+
+    def import_records(self, cls, records):
+        """
+        Write raw attribute dictionaries of a class in a single transaction.
+        Unique indexes are not enforced so existing data can be imported as it is.
+
+        :param cls: The class of the records.
+        :param records: The attribute dictionaries.
+        """
+        conn = self._connection()
+        with conn:
+            self._upsert(conn, cls, records)
+
+    def save(self, obj):
+        """
+        Save an object to its table.
+
+        :param obj: The object to be saved.
+        """
+        self.save_many([obj])
+
+    def save_many(self, objs):
+        """
+        Save several objects in a single transaction. The transaction takes the write lock of the
+        database before the unique indexes are checked, so no other connection can claim a value
+        between the check and the write.
+
+        :param objs: The objects to be saved.
+        """
+        by_class = {}
+        for obj in objs:
+            by_class.setdefault(obj.__class__, []).append(attributes(obj))
+        for cls in by_class:
+            # Creating a table commits, so it cannot happen inside the transaction
+            self._table(cls)
+        conn = self._connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for cls, records in by_class.items():
+                self._check_unique(conn, cls, records)
+            for cls, records in by_class.items():
+                self._upsert(conn, cls, records)
+
+    def delete(self, obj):
+        """
+        Delete an object from its table.
+
+        :param obj: The object to be deleted.
+        """
+        self.delete_many([obj])
+
+    def delete_many(self, objs):
+        """
+        Delete several objects in a single transaction.
+
+        :param objs: The objects to be deleted.
+        """
+        objs = list(objs)
+        for cls in {obj.__class__ for obj in objs}:
+            # Creating a table commits, so it cannot happen inside the transaction
+            self._table(cls)
+        conn = self._connection()
+        with conn:
+            for obj in objs:
+                conn.execute(f'DELETE FROM "{obj.__class__.__name__}" WHERE id = ?', (str(obj.id),))
+            self._log_changes(conn, [(obj.__class__.__name__, str(obj.id)) for obj in objs])
+
+    def load(self, cls, obj_id):
+        """
+        Load an object of a given class from its table using its ID.
+
+        :param cls: The class of the object to be loaded.
+        :param obj_id: The ID of the object to be loaded.
+        :return: The loaded object if found, None otherwise.
+        """
+        self._table(cls)
+        row = self._connection().execute(f'SELECT data FROM "{cls.__name__}" WHERE id = ?', (str(obj_id),)).fetchone()
+        if row is None:
+            return None
+        return hydrate(cls, self.codec.loads(row[0]))
+
+    def load_many(self, cls, ids):
+        """
+        Load the objects of a given class with any of several IDs, with one IN (...) query per
+        batch of IDs.
+
+        :param cls: The class of the objects to be loaded.
+        :param ids: The distinct IDs of the objects to be loaded.
+        :return: A dictionary mapping the ID of every object found, as a string, to the object.
+        """
+        self._table(cls)
+        ids = [str(obj_id) for obj_id in ids]
+        connection = self._connection()
+        loaded = {}
+        for start in range(0, len(ids), IN_BATCH_SIZE):
+            batch = ids[start:start + IN_BATCH_SIZE]
+            placeholders = ', '.join('?' * len(batch))
+            rows = connection.execute(f'SELECT id, data FROM "{cls.__name__}" WHERE id IN ({placeholders})', batch)
+            for obj_id, data in rows:
+                loaded[obj_id] = hydrate(cls, self.codec.loads(data))
+        return loaded
+
+    def load_all(self, cls):
+        """
+        Load all objects of a given class from its table.
+
+        :param cls: The class of the objects to be loaded.
+        :return: A list of loaded objects.
+        """
+        self._table(cls)
+        rows = self._connection().execute(f'SELECT data FROM "{cls.__name__}" ORDER BY rowid')
+        return [hydrate(cls, self.codec.loads(data)) for (data,) in rows]
+
+    def find_by(self, cls, field, value):
+        """
+        Load the objects of a given class whose indexed column matches a value.
+
+        :param cls: The class of the objects to be loaded.
+        :param field: The name of the indexed column.
+        :param value: The value to look up.
+        :return: A list of loaded objects.
+        """
+        key = declared_index(cls, field).normalize(value)
+        if key is None:
+            return []
+        self._table(cls)
+        rows = self._connection().execute(f'SELECT data FROM "{cls.__name__}" WHERE "{field}" = ? ORDER BY rowid', (key,))
+        return [hydrate(cls, self.codec.loads(data)) for (data,) in rows]
+
+    def query(self, cls, conditions=(), after=None, limit=None):
+        """
+        Load a page of the objects of a given class, ordered by creation time and ID.
+
+        :param cls: The class of the objects to be loaded.
+        :param conditions: The Conditions the objects must satisfy.
+        :param after: The (created_at, id) position to start after, or None to start at the beginning.
+        :param limit: The maximum number of objects to load, or None for all of them.
+        :return: A list of loaded objects.
+        """
+        clauses, params = self._where(cls, conditions)
+        if after is not None:
+            # created_at holds the ISO 8601 form written by _timestamp, which sorts chronologically
+            clauses.append('(created_at, id) > (?, ?)')
+            params.extend([_timestamp(after[0]), str(after[1])])
+        sql = f'SELECT data FROM "{cls.__name__}"'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY created_at, id'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return [hydrate(cls, self.codec.loads(data)) for (data,) in self._connection().execute(sql, params)]
+
+    def iterate(self, cls, conditions=()):
+        """
+        Yield the objects of a given class one at a time, in insertion order.
+        Rows are fetched from the cursor as the objects are consumed.
+
+        :param cls: The class of the objects to be loaded.
+        :param conditions: The Conditions the objects must satisfy.
+        :return: An iterator of loaded objects.
+        """
+        clauses, params = self._where(cls, conditions)
+        sql = f'SELECT data FROM "{cls.__name__}"'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        for (data,) in self._connection().execute(sql + ' ORDER BY rowid', params):
+            yield hydrate(cls, self.codec.loads(data))
+
+    def _where(self, cls, conditions):
+        """
+        Translate conditions into SQL clauses.
+        Equality conditions on indexed fields use their columns, other conditions are
+        evaluated on the JSON documents. Range conditions compare the fields as numbers, like
+        Condition.matches, whether they are stored as JSON numbers or as text.
+
+        :param cls: The class of the objects.
+        :param conditions: The Conditions the objects must satisfy.
+        :return: A tuple (clauses, params).
+        """
+        indexes = self._table(cls)
+        clauses, params = [], []
+        for condition in conditions:
+            if condition.op == 'eq' and condition.field in indexes:
+                clauses.append(f'"{condition.field}" = ?')
+                params.append(indexes[condition.field].normalize(condition.value))
+            elif condition.op == 'eq':
+                clauses.append("CAST(json_extract(data, ?) AS TEXT) = ?")
+                params.extend([f'$.{condition.field}', str(condition.value)])
+            else:
+                clauses.append(f"to_real(json_extract(data, ?)) {'>=' if condition.op == 'gte' else '<='} ?")
+                params.extend([f'$.{condition.field}', condition.value])
+        return clauses, params
+
+    def changes(self):
+        """
+        Get the objects other storages, in this process or another one, wrote since the last call,
+        from the rows appended to the _changes table. The first call only records where the table ends.
+
+        :return: A list of (class name, ID) pairs, or None if rows not read yet were already dropped.
+        """
+        with self._changes_lock:
+            conn = self._connection()
+            seen = self._changes_seen
+            if seen is None:
+                (self._changes_seen,) = conn.execute('SELECT coalesce(max(seq), 0) FROM _changes').fetchone()
+                return []
+            rows = conn.execute('SELECT seq, class, id, writer FROM _changes WHERE seq > ? ORDER BY seq', (seen,)).fetchall()
+            if not rows:
+                return []
+            self._changes_seen = rows[-1][0]
+            # AUTOINCREMENT numbers the committed rows without gaps, so a gap means rows were dropped
+            if rows[0][0] != seen + 1:
+                return None
+            return [(obj_class, obj_id) for _, obj_class, obj_id, writer in rows if writer != self._writer]
+
+    def check_indexes(self, cls):
+        """
+        Compare the indexed columns of a class with the values stored in its JSON documents.
+
+        :param cls: The model class.
+        :return: A list of problems found, empty if the indexes are consistent.
+        """
+        problems = []
+        indexes = self._table(cls)
+        conn = self._connection()
+        for field, declaration in indexes.items():
+            for obj_id, actual, data in conn.execute(f'SELECT id, "{field}", data FROM "{cls.__name__}"'):
+                expected = declaration.normalize(self.codec.loads(data).get(field))
+                if expected != actual:
+                    problems.append(f"{cls.__name__}.{field}: {obj_id} is indexed under {actual!r} instead of {expected!r}")
+            if declaration.unique:
+                duplicates = conn.execute(f'SELECT "{field}", group_concat(id, \', \') FROM "{cls.__name__}" '
+                                          f'WHERE "{field}" IS NOT NULL GROUP BY "{field}" HAVING count(*) > 1')
+                for key, ids in duplicates:
+                    problems.append(f"{cls.__name__}.{field}: {key!r} is shared by {ids}")
+        return problems
+
+    def close(self):
+        """
+        Close every connection opened by this storage.
+        """
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
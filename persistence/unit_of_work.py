@@ -0,0 +1,180 @@
+_MISSING = object() # Marks a journal entry for a key that had no pending change
+
+class UnitOfWork:
+    """
+    UnitOfWork collects the objects saved and deleted while it is active and writes
+    them to the storage in a single flush when it is committed.
+    Units of work nest: beginning one while another is active joins the outer one,
+    and only the outermost end commits.
+    """
+
+    def __init__(self, data_manager):
+        """
+        Initialize the UnitOfWork for a data manager.
+
+        :param data_manager: The DataManager whose storage receives the flush.
+        """
+        self.data_manager = data_manager
+        self.dirty = {}
+        self.deleted = {}
+        # (pending changes, key, previous value) of every registration, undone by restore()
+        self.journal = []
+        self.depth = 0
+        self.flushes = 0
+
+    @staticmethod
+    def _key(cls, obj_id):
+        return cls.__name__, str(obj_id)
+
+    def begin(self):
+        """
+        Enter the unit of work.
+
+        :return: The unit of work itself.
+        """
+        self.depth += 1
+        return self
+
+    def end(self, commit=True):
+        """
+        Leave the unit of work. The outermost end commits or rolls back.
+
+        :param commit: Whether the pending changes are flushed or discarded.
+        """
+        self.depth -= 1
+        if self.depth > 0:
+            return
+        try:
+            if commit:
+                self.commit()
+            else:
+                self.rollback()
+        finally:
+            self.data_manager._release_unit_of_work(self)
+
+    def __enter__(self):
+        return self.begin()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.end(commit=exc_type is None)
+        return False
+
+    def register_save(self, obj):
+        """
+        Mark an object as dirty.
+
+        :param obj: The object to be saved at commit.
+        """
+        key = self._key(obj.__class__, obj.id)
+        self._record(self.deleted, key)
+        self.deleted.pop(key, None)
+        self._record(self.dirty, key)
+        self.dirty[key] = obj
+
+    def register_delete(self, obj):
+        """
+        Mark an object as deleted.
+
+        :param obj: The object to be deleted at commit.
+        """
+        key = self._key(obj.__class__, obj.id)
+        self._record(self.dirty, key)
+        self.dirty.pop(key, None)
+        self._record(self.deleted, key)
+        self.deleted[key] = obj
+
+    def _record(self, changes, key):
+        """
+        Journal the pending change of a key before it is replaced.
+
+        :param changes: The dirty or deleted dictionary.
+        :param key: The key about to change.
+        """
+        self.journal.append((changes, key, changes.get(key, _MISSING)))
+
+    def savepoint(self):
+        """
+        Mark the pending changes registered so far.
+
+        :return: A savepoint for restore().
+        """
+        return len(self.journal)
+
+    def restore(self, savepoint):
+        """
+        Discard the changes registered since a savepoint, such as those of an object whose
+        construction failed after it was saved.
+
+        :param savepoint: A savepoint returned by savepoint().
+        """
+        while len(self.journal) > savepoint:
+            changes, key, previous = self.journal.pop()
+            if previous is _MISSING:
+                changes.pop(key, None)
+            else:
+                changes[key] = previous
+
+    def lookup(self, cls, obj_id):
+        """
+        Look up a pending object.
+
+        :param cls: The class of the object.
+        :param obj_id: The ID of the object.
+        :return: A tuple (found, obj). obj is None when the object is pending deletion.
+        """
+        key = self._key(cls, obj_id)
+        if key in self.deleted:
+            return True, None
+        if key in self.dirty:
+            return True, self.dirty[key]
+        return False, None
+
+    def has_pending(self, cls):
+        """
+        Check whether objects of a class are waiting to be saved or deleted.
+
+        :param cls: The class of the objects.
+        :return: True if the class has pending changes.
+        """
+        return any(key[0] == cls.__name__ for key in self.dirty) or any(key[0] == cls.__name__ for key in self.deleted)
+
+    def merge(self, cls, objs):
+        """
+        Overlay the pending changes of a class on a list of stored objects.
+
+        :param cls: The class of the objects.
+        :param objs: The objects loaded from the storage.
+        :return: The objects as they will be once the unit of work is committed.
+        """
+        merged = []
+        seen = set()
+        for obj in objs:
+            key = self._key(cls, obj.id)
+            seen.add(key)
+            if key in self.deleted:
+                continue
+            merged.append(self.dirty.get(key, obj))
+        merged.extend(obj for key, obj in self.dirty.items() if key[0] == cls.__name__ and key not in seen)
+        return merged
+
+    def commit(self):
+        """
+        Flush the pending changes to the storage.
+        """
+        storage = self.data_manager.storage
+        if self.dirty:
+            storage.save_many(list(self.dirty.values()))
+            self.flushes += 1
+        if self.deleted:
+            storage.delete_many(list(self.deleted.values()))
+            self.flushes += 1
+        self.data_manager._written(list(self.dirty.values()) + list(self.deleted.values()))
+        self.rollback()
+
+    def rollback(self):
+        """
+        Discard the pending changes.
+        """
+        self.dirty = {}
+        self.deleted = {}
+        self.journal = []
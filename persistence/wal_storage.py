@@ -0,0 +1,329 @@
+import atexit
+import os
+import threading
+import time
+from persistence.file_storage import FileStorage
+from persistence.records import attributes
+from persistence.instrumentation import count_bytes_written
+
+class WALFileStorage(FileStorage):
+    """
+    WALFileStorage class that extends FileStorage with an append-only write-ahead log.
+    Each save or delete appends one record to the log instead of rewriting the JSON file,
+    so the cost of a write does not depend on the size of the store. The log is replayed
+    when the storage is first accessed, its records kept aside until their class is loaded, and compacted into the JSON snapshot by a background thread.
+    With a flush interval, a flusher thread writes the snapshot behind the requests, every
+    interval or as soon as the log reaches the threshold, and flushes once more on shutdown.
+    """
+
+    def __init__(self, file_path='/usr/src/app/file_storage.json', log_path=None, compact_threshold=10000, fsync=True,
+                 flush_interval=None, snapshot_format='json'):
+        """
+        Initialize WALFileStorage with a snapshot path and a log path.
+
+        :param file_path: The path to the JSON snapshot file.
+        :param log_path: The path to the append-only log. Defaults to the snapshot path with a .log suffix.
+        :param compact_threshold: The number of log records after which a background compaction is started.
+        :param fsync: Whether every log append is forced to disk before returning.
+        :param flush_interval: The number of seconds between two flushes of the flusher thread.
+                               None compacts only when the log reaches the threshold.
+        :param snapshot_format: 'json' or 'binary', the format of the snapshot file.
+        """
+        self.log_path = log_path or file_path + '.log'
+        self.rotated_log_path = self.log_path + '.1'
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self.flush_interval = flush_interval
+        self.log_records = 0
+        self.flushes = 0
+        self.last_flush_seconds = 0.0
+        self.dirty_since = None
+        self.flushing_since = None
+        self._compaction = None
+        self._flusher = None
+        self._wake = threading.Event()
+        self._closing = False
+        self._pending = {}
+        super().__init__(file_path, snapshot_format)
+        self._finish_interrupted_compaction()
+        self._log = open(self.log_path, 'ab')
+        if flush_interval:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+            atexit.register(self.close)
+
+    def _finish_interrupted_compaction(self):
+        """
+        Fold everything into a fresh snapshot if a previous compaction rotated the log but did not finish.
+        """
+        if os.path.exists(self.rotated_log_path):
+            self._write_snapshot(self._load_all())
+            os.remove(self.rotated_log_path)
+            open(self.log_path, 'w').close()
+            self.log_records = 0
+
+    def _open(self):
+        """
+        Open the snapshot and replay the logs. No class is loaded yet, so their records are kept
+        aside until their class is.
+        """
+        super()._open()
+        self._pending = {}
+        for path in (self.rotated_log_path, self.log_path):
+            self.log_records += self._replay(path)
+
+    def _read_class(self, obj_class):
+        """
+        Read the records of a class from the snapshot and apply the log records kept for it.
+
+        :param obj_class: The name of the class.
+        :return: A dictionary mapping IDs to attribute dictionaries.
+        """
+        objects = super()._read_class(obj_class)
+        for record in self._pending.pop(obj_class, ()):
+            if record['op'] == 'save':
+                objects[record['id']] = record['data']
+            else:
+                objects.pop(record['id'], None)
+        return objects
+
+    def _stored_classes(self):
+        names = super()._stored_classes()
+        return names + [obj_class for obj_class in self._pending if obj_class not in names]
+
+    def _apply(self, record):
+        """
+        Apply a log record to the data dictionary, and to the indexes of its class if they were built.
+        The record is kept aside if its class is not loaded yet.
+
+        :param record: The log record.
+        """
+        obj_class = record['class']
+        if obj_class not in self.data:
+            self._pending.setdefault(obj_class, []).append(record)
+            return
+        objects = self.data[obj_class]
+        self.snapshots.pop(obj_class, None)
+        indexes = self.indexes.get(obj_class, {})
+        obj_id = record['id']
+        if record['op'] == 'save':
+            objects[obj_id] = record['data']
+            for field, index in indexes.items():
+                index.add(obj_id, record['data'].get(field))
+        elif objects.pop(obj_id, None) is not None:
+            for index in indexes.values():
+                index.remove(obj_id)
+
+    def _replay(self, path):
+        """
+        Apply the records of a log file.
+
+        :param path: The path of the log file to replay.
+        :return: The number of records applied.
+        """
+        if not os.path.exists(path):
+            return 0
+        count = 0
+        valid_size = 0
+        with open(path, 'rb') as file:
+            for line in file:
+                try:
+                    record = self.codec.loads(line)
+                except ValueError:
+                    break # A torn write at the end of the log, everything before it is valid
+                self._apply(record)
+                valid_size += len(line)
+                count += 1
+        if valid_size < os.path.getsize(path):
+            os.truncate(path, valid_size)
+        return count
+
+    def _append(self, *records):
+        """
+        Append records to the log and flush them.
+
+        :param records: The records to append.
+        """
+        payload = b''.join(self.codec.dumps(record) + b'\n' for record in records)
+        self._log.write(payload)
+        count_bytes_written(len(payload))
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self.log_records += len(records)
+        if self.dirty_since is None:
+            self.dirty_since = time.monotonic()
+
+    def _write_snapshot(self, data):
+        """
+        Atomically replace the snapshot file with the given data.
+
+        :param data: The data dictionary to write.
+        """
+        os.replace(self._write_temporary_snapshot(data), self.file_path)
+
+    def _write_temporary_snapshot(self, data):
+        """
+        Write a snapshot of the given data next to the snapshot file and force it to disk.
+
+        :param data: The data dictionary to write.
+        :return: The path of the written file, to be renamed over the snapshot.
+        """
+        tmp_path = self.file_path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            self._write_data(file, data)
+            count_bytes_written(file.tell())
+            file.flush()
+            os.fsync(file.fileno())
+        return tmp_path
+
+    def _save_file(self):
+        """
+        Save the data to the snapshot file.
+        """
+        self.compact()
+
+    def save(self, obj):
+        """
+        Save an object to the data dictionary and append it to the log.
+
+        :param obj: The object to be saved.
+        """
+        self.save_many([obj])
+
+    def delete(self, obj):
+        """
+        Delete an object from the data dictionary and append the deletion to the log.
+
+        :param obj: The object to be deleted.
+        """
+        self.delete_many([obj])
+
+    def save_many(self, objs):
+        """
+        Save several objects and append them to the log in a single write.
+
+        :param objs: The objects to be saved.
+        """
+        records = []
+        with self.lock.write():
+            self._check_unique(objs)
+            for obj in objs:
+                obj_class = obj.__class__.__name__
+                obj_id = str(obj.id)
+                obj_data = attributes(obj)
+                self._put(obj.__class__, obj_id, obj_data)
+                records.append({'op': 'save', 'class': obj_class, 'id': obj_id, 'data': obj_data})
+            if records:
+                self._append(*records)
+        self._maybe_compact()
+
+    def delete_many(self, objs):
+        """
+        Delete several objects and append the deletions to the log in a single write.
+
+        :param objs: The objects to be deleted.
+        """
+        records = []
+        with self.lock.write():
+            for obj in objs:
+                obj_class = obj.__class__.__name__
+                obj_id = str(obj.id)
+                if self._remove(obj.__class__, obj_id):
+                    records.append({'op': 'delete', 'class': obj_class, 'id': obj_id})
+            if records:
+                self._append(*records)
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        """
+        Start a background compaction once the log has grown past the threshold.
+        """
+        if self.log_records < self.compact_threshold:
+            return
+        if self._flusher:
+            self._wake.set()
+            return
+        with self.lock.write():
+            if self._compaction and self._compaction.is_alive():
+                return
+            self._compaction = threading.Thread(target=self.compact, daemon=True)
+            self._compaction.start()
+
+    def compact(self):
+        """
+        Fold the log into a new snapshot.
+        The log is rotated under the lock so writers keep appending to a fresh log
+        while the snapshot is serialized outside of it.
+        """
+        with self.lock.write():
+            if os.path.exists(self.rotated_log_path):
+                return # Another compaction is in progress
+            data = self._load_all()
+            self._log.close()
+            if os.path.exists(self.log_path):
+                os.replace(self.log_path, self.rotated_log_path)
+            self._log = open(self.log_path, 'ab')
+            self.log_records = 0
+            self.flushing_since, self.dirty_since = self.dirty_since, None
+            # Saved records are never mutated in place, so a shallow copy is a consistent snapshot
+            snapshot = {obj_class: dict(objects) for obj_class, objects in data.items()}
+        start = time.perf_counter()
+        self._write_snapshot(snapshot)
+        if os.path.exists(self.rotated_log_path):
+            os.remove(self.rotated_log_path)
+        self._flushed(start)
+
+    def _flushed(self, start):
+        """
+        Record that a snapshot holding every write made before the last log rotation was written.
+
+        :param start: The perf_counter value when the snapshot started being written.
+        """
+        self.flushing_since = None
+        self.flushes += 1
+        self.last_flush_seconds = time.perf_counter() - start
+
+    def _flush_loop(self):
+        """
+        Compact the log every flush interval, or earlier when woken because it reached the threshold.
+        """
+        while not self._closing:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self.log_records and not self._closing:
+                self.compact()
+
+    def flush_stats(self):
+        """
+        Get how far the snapshot is behind the log.
+
+        :return: A dictionary with the number of records not compacted yet, the age in seconds
+                 of the oldest write missing from the snapshot, the number of flushes and the
+                 duration in seconds of the last one.
+        """
+        pending = [since for since in (self.flushing_since, self.dirty_since) if since is not None]
+        return {
+            'pending_records': self.log_records,
+            'lag_seconds': time.monotonic() - min(pending) if pending else 0.0,
+            'flushes': self.flushes,
+            'last_flush_seconds': self.last_flush_seconds,
+        }
+
+    def close(self):
+        """
+        Stop the flusher thread, flushing the writes it has not flushed yet, wait for a running
+        compaction and close the log.
+        """
+        if self._flusher:
+            self._closing = True
+            self._wake.set()
+            self._flusher.join()
+            self._flusher = None
+            atexit.unregister(self.close)
+            if self.log_records:
+                self.compact()
+        if self._compaction:
+            self._compaction.join()
+        with self.lock.write():
+            self._log.close()
@@ -3,9 +3,22 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import unittest
+import tempfile
+import shutil
+from models import base_model
 from models.amenity import Amenity
+from persistence.file_storage import FileStorage
 
 class TestAmenity(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = FileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
     def test_create_amenity(self):
         amenity = Amenity(name="Wi-Fi", description="Wireless internet")
         self.assertEqual(amenity.name, "Wi-Fi")
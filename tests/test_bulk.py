@@ -0,0 +1,158 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import json
+from api import app
+from api.bulk import bulk_create
+from models import base_model
+from models.place import Place
+from models.review import Review
+from models.user import User
+from persistence.file_storage import FileStorage
+from persistence.sqlite_storage import SQLiteStorage
+
+
+class CountingFileStorage(FileStorage):
+    """
+    FileStorage counting how many batches it writes.
+    """
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self.batches = 0
+
+    def save_many(self, objs):
+        self.batches += 1
+        super().save_many(objs)
+
+
+class TestBulk(unittest.TestCase):
+    storage_class = FileStorage
+    file_name = 'file_storage.json'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.storage = self.storage_class(os.path.join(self.tmp_dir, self.file_name))
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+        self.client = app.test_client()
+        self.host = User(email="host@example.com", first_name="Host", last_name="User")
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        if hasattr(self.storage, 'close'):
+            self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def place_payload(self, name, **overrides):
+        payload = {'name': name, 'description': "Nice", 'address': "1 Main St", 'city_id': "c1", 'latitude': 1.0,
+                   'longitude': 2.0, 'host_id': str(self.host.id), 'number_of_rooms': 1, 'number_of_bathrooms': 1,
+                   'price_per_night': 100.0, 'max_guests': 2, 'amenity_ids': []}
+        payload.update(overrides)
+        return payload
+
+    def test_places_written_in_one_flush(self):
+        response = self.client.post('/places/bulk', json=[self.place_payload(f"Place {i}") for i in range(20)])
+        self.assertEqual(response.status_code, 201)
+        body = response.get_json()
+        self.assertEqual(body['created'], 20)
+        self.assertEqual(response.headers['X-Storage-Flushes'], '1')
+        self.assertEqual(len(Place.load_all()), 20)
+        self.assertEqual(User.load(self.host.id).place_ids, [result['id'] for result in body['results']])
+
+    def test_atomic_mode_writes_nothing_on_error(self):
+        items = [self.place_payload("Good"), self.place_payload("", latitude="north")]
+        response = self.client.post('/places/bulk', json=items)
+        self.assertEqual(response.status_code, 400)
+        results = response.get_json()['results']
+        self.assertEqual(results[0], {'index': 0, 'status': 'skipped'})
+        self.assertEqual(results[1]['status'], 'error')
+        self.assertEqual(Place.load_all(), [])
+        self.assertEqual(User.load(self.host.id).place_ids, [])
+
+    def test_best_effort_mode_writes_valid_items(self):
+        items = [self.place_payload("Good"), "not an object", self.place_payload("Also good")]
+        response = self.client.post('/places/bulk?mode=best_effort', json=items)
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['status'] for r in response.get_json()['results']], ['created', 'error', 'created'])
+        self.assertEqual(sorted(p.name for p in Place.load_all()), ["Also good", "Good"])
+
+    def test_users_from_ndjson_with_duplicate_emails(self):
+        lines = [{'email': "a@example.com", 'first_name': "A", 'last_name': "User"},
+                 {'email': "A@Example.com", 'first_name': "B", 'last_name': "User"},
+                 {'email': "host@example.com", 'first_name': "C", 'last_name': "User"},
+                 {'email': "d@example.com", 'first_name': "D", 'last_name': "User"}]
+        body = '\n'.join(json.dumps(line) for line in lines) + '\n'
+        response = self.client.post('/users/bulk?mode=best_effort', data=body, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual([r['status'] for r in response.get_json()['results']], ['created', 'error', 'error', 'created'])
+        self.assertEqual(len(User.load_all()), 3)
+
+    def test_reviews(self):
+        place = self.client.post('/places/', json=self.place_payload("Loft")).get_json()
+        guest = User(email="guest@example.com", first_name="Guest", last_name="User")
+        items = [{'place_id': place['id'], 'user_id': str(guest.id), 'rating': 5, 'comment': "Great"},
+                 {'place_id': place['id'], 'user_id': str(self.host.id), 'rating': 5, 'comment': "Mine"},
+                 {'place_id': "missing", 'user_id': str(guest.id), 'rating': 4, 'comment': "Where?"}]
+        response = self.client.post('/reviews/bulk?mode=best_effort', json=items)
+        results = response.get_json()['results']
+        self.assertEqual([r['status'] for r in results], ['created', 'error', 'error'])
+        self.assertEqual(results[1]['error'], "A host cannot review their own listing")
+        self.assertEqual(results[2]['error'], "Place not found")
+        self.assertEqual(Place.load(place['id']).review_ids, [results[0]['id']])
+        self.assertEqual(User.load(guest.id).review_ids, [results[0]['id']])
+
+    def test_failed_items_are_not_written(self):
+        def create(data):
+            review = Review(place_id="p", user_id="u", rating=5, comment=data['comment'])
+            if data['comment'] == "Bad":
+                raise ValueError("Rejected after construction")
+            return review
+
+        items = [{'comment': "Good"}, {'comment': "Bad"}, {'comment': "Also good"}]
+        with app.test_request_context('/reviews/bulk?mode=best_effort'):
+            body, status = bulk_create(items, [None] * len(items), create)
+        self.assertEqual(status, 207)
+        self.assertEqual([r['status'] for r in body['results']], ['created', 'error', 'created'])
+        self.assertEqual(sorted(review.comment for review in Review.load_all()), ["Also good", "Good"])
+        self.assertEqual(sorted(review.comment for review in self.storage.load_all(Review)), ["Also good", "Good"])
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.post('/places/bulk', json={'name': "Not a list"}).status_code, 400)
+        self.assertEqual(self.client.post('/places/bulk', json=[]).status_code, 400)
+        self.assertEqual(self.client.post('/places/bulk?mode=sometimes', json=[self.place_payload("A")]).status_code, 400)
+
+
+class TestSQLiteBulk(TestBulk):
+    storage_class = SQLiteStorage
+    file_name = 'hbnb.sqlite3'
+
+
+class TestDataManagerBatches(unittest.TestCase):
+    def test_save_many_and_delete_many(self):
+        tmp_dir = tempfile.mkdtemp()
+        storage = CountingFileStorage(os.path.join(tmp_dir, 'file_storage.json'))
+        previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = storage
+        try:
+            with base_model.data_manager.unit_of_work():
+                reviews = [Review(place_id="p", user_id="u", rating=5, comment="Great") for _ in range(3)]
+            storage.batches = 0
+            for review in reviews:
+                review.comment = "Updated"
+            base_model.data_manager.save_many(reviews)
+            self.assertEqual(storage.batches, 1)
+            self.assertEqual({r.comment for r in Review.load_all()}, {"Updated"})
+            base_model.data_manager.delete_many(reviews[:2])
+            self.assertEqual([r.id for r in Review.load_all()], [reviews[2].id])
+        finally:
+            base_model.data_manager.storage = previous_storage
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
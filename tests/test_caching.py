@@ -0,0 +1,117 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+from unittest import mock
+from api import app
+from api.caching import ResponseCache, response_cache
+from models import base_model
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+from persistence.file_storage import FileStorage
+
+
+class TestConditionalGet(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = FileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+        self.client = app.test_client()
+        self.review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        response_cache.clear()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_not_modified(self):
+        response = self.client.get(f'/reviews/{self.review.id}')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        response = self.client.get(f'/reviews/{self.review.id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+    def test_etag_changes_on_write(self):
+        etag = self.client.get(f'/reviews/{self.review.id}').headers['ETag']
+        payload = {'place_id': "p", 'user_id': "u", 'rating': 4, 'comment': "Good"}
+        self.assertEqual(self.client.put(f'/reviews/{self.review.id}', json=payload).status_code, 200)
+        response = self.client.get(f'/reviews/{self.review.id}', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(response.get_json()['comment'], "Good")
+        self.client.delete(f'/reviews/{self.review.id}')
+        self.assertEqual(self.client.get(f'/reviews/{self.review.id}', headers={'If-None-Match': etag}).status_code, 404)
+
+    def test_cached_body_is_served(self):
+        first = self.client.get(f'/reviews/{self.review.id}')
+        with mock.patch.object(Review, 'to_dict', side_effect=AssertionError("rebuilt")):
+            second = self.client.get(f'/reviews/{self.review.id}')
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data, first.data)
+
+    def test_collection_etag(self):
+        Amenity(name="Pool")
+        response = self.client.get('/amenities/')
+        etag = response.headers['ETag']
+        self.assertEqual(self.client.get('/amenities/', headers={'If-None-Match': etag}).status_code, 304)
+        self.assertNotEqual(self.client.get('/amenities/?limit=1').headers['ETag'], etag)
+        Amenity(name="Wi-Fi")
+        response = self.client.get('/amenities/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()), 2)
+
+    def test_expanded_relations_change_etags(self):
+        amenity = Amenity(name="Pool")
+        place = Place(name="Loft", description="Nice", address="1 Main St", city_id="c", latitude=1.0, longitude=2.0,
+                      host_id="h", number_of_rooms=1, number_of_bathrooms=1, price_per_night=10.0, max_guests=2,
+                      amenity_ids=[])
+        place.add_amenity(amenity)
+        urls = [f'/amenities/{amenity.id}?expand=places', '/amenities/?expand=places']
+        etags = [self.client.get(url).headers['ETag'] for url in urls]
+        payload = {key: value for key, value in place.to_dict(depth=0).items() if key in Place.__editable__}
+        self.assertEqual(self.client.put(f'/places/{place.id}', json=dict(payload, name="Attic")).status_code, 200)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, headers={'If-None-Match': etag})
+                self.assertEqual(response.status_code, 200)
+                body = response.get_json()
+                self.assertEqual((body[0] if isinstance(body, list) else body)['places'][0]['name'], "Attic")
+
+    def test_streamed_collections_are_not_cached(self):
+        response = self.client.get('/amenities/?stream=1')
+        self.assertNotIn('ETag', response.headers)
+
+    def test_storage_swap_changes_etags(self):
+        Amenity(name="Pool")
+        etag = self.client.get('/amenities/').headers['ETag']
+        base_model.data_manager.storage = FileStorage(os.path.join(self.tmp_dir, 'other.json'))
+        response = self.client.get('/amenities/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), [])
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_eviction_and_invalidation(self):
+        cache = ResponseCache(max_size=2)
+        review = mock.Mock(spec=Review, id="r1")
+        review.__class__ = Review
+        cache.put('a', 'e1', [('Review', 'r1')], ('{}', 200, {}))
+        cache.put('b', 'e2', ['Amenity'], ('[]', 200, {}))
+        cache.put('c', 'e3', ['Place'], ('[]', 200, {}))
+        self.assertIsNone(cache.get('a', 'e1'))
+        self.assertIsNone(cache.get('b', 'stale'))
+        self.assertEqual(cache.get('b', 'e2'), ('[]', 200, {}))
+        cache.put('a', 'e1', [('Review', 'r1')], ('{}', 200, {}))
+        cache.invalidate([review])
+        self.assertIsNone(cache.get('a', 'e1'))
+        self.assertIsNotNone(cache.get('b', 'e2'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import uuid
+from datetime import datetime
+from unittest import mock
+from api import app
+from models import base_model
+from models.review import Review
+from persistence.codecs import CODECS, JSONCodec, create_codec
+from persistence.file_storage import FileStorage
+from persistence.wal_storage import WALFileStorage
+
+
+def installed_codecs():
+    codecs = []
+    for codec_class in CODECS.values():
+        try:
+            codecs.append(codec_class())
+        except ImportError:
+            pass
+    return codecs
+
+
+class TestCodecs(unittest.TestCase):
+    def setUp(self):
+        self.record = {'id': uuid.UUID("6c4ee7a2-2a5e-4d5c-9a39-0b9d5c0b8a11"),
+                       'created_at': datetime(2024, 5, 1, 12, 30, 15, 250), 'rating': 5,
+                       'comment': "Line one\nline two é", 'amenity_ids': ["a", "b"], 'price': 99.5}
+
+    def test_codecs_write_the_same_json(self):
+        expected = JSONCodec().dumps(self.record)
+        self.assertIn(b'"6c4ee7a2-2a5e-4d5c-9a39-0b9d5c0b8a11"', expected)
+        self.assertIn(b'"2024-05-01T12:30:15.000250"', expected)
+        self.assertNotIn(b'\n', expected)
+        for codec in installed_codecs():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(codec.dumps(self.record), expected)
+                loaded = codec.loads(expected)
+                self.assertEqual(loaded['comment'], self.record['comment'])
+                self.assertEqual(datetime.fromisoformat(loaded['created_at']), self.record['created_at'])
+                self.assertEqual(codec.loads(expected.decode()), loaded)
+
+    def test_errors(self):
+        for codec in installed_codecs():
+            with self.subTest(codec=codec.name):
+                with self.assertRaises(TypeError):
+                    codec.dumps({'value': object()})
+                with self.assertRaises(ValueError):
+                    codec.loads(b'{"torn": ')
+        with self.assertRaises(ValueError):
+            create_codec('yaml')
+
+    def test_auto_and_fallback(self):
+        self.assertEqual(create_codec('json').name, 'json')
+        with mock.patch.dict(os.environ, {'HBNB_JSON_CODEC': 'json'}):
+            self.assertEqual(create_codec().name, 'json')
+        with mock.patch.dict(sys.modules, {'orjson': None, 'msgspec': None}):
+            self.assertEqual(create_codec('auto').name, 'json')
+            with self.assertRaises(ValueError):
+                create_codec('orjson')
+
+
+class TestStorageCodecs(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_storage = base_model.data_manager.storage
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def test_files_are_readable_by_every_codec(self):
+        for storage_class in (FileStorage, WALFileStorage):
+            for writer in installed_codecs():
+                for reader in installed_codecs():
+                    with self.subTest(storage=storage_class.__name__, writer=writer.name, reader=reader.name):
+                        file_path = os.path.join(self.tmp_dir, f'{storage_class.__name__}-{writer.name}-{reader.name}.json')
+                        storage = storage_class(file_path)
+                        storage.codec = writer
+                        base_model.data_manager.storage = storage
+                        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+                        if hasattr(storage, 'close'):
+                            storage.close()
+                        with mock.patch('persistence.file_storage.codec', reader):
+                            reopened = storage_class(file_path)
+                        loaded = reopened.load(Review, review.id)
+                        self.assertEqual(loaded.created_at, review.created_at)
+                        self.assertEqual(loaded.id, review.id)
+                        if hasattr(reopened, 'close'):
+                            reopened.close()
+
+    def test_responses_use_the_codec(self):
+        base_model.data_manager.storage = FileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        response = app.test_client().get(f'/reviews/{review.id}')
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertNotIn(b', ', response.data)
+        self.assertEqual(response.get_json()['id'], str(review.id))
+
+
+if __name__ == '__main__':
+    unittest.main()
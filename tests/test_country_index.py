@@ -0,0 +1,50 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+from api import app
+from models import base_model
+from models.country import Country
+from persistence.file_storage import FileStorage
+
+
+class TestCountryIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'file_storage.json')
+        self.storage = FileStorage(self.path)
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+        self.client = app.test_client()
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_by_code(self):
+        country = Country(name="United States", code="US")
+        self.assertEqual(Country.load_by_code("US").id, country.id)
+        self.assertIsNone(Country.load_by_code("FR"))
+        self.assertIsNone(Country.load_by_code("INVALID"))
+        self.assertIsNone(Country.load_by_code(["US"]))
+
+    def test_index_rebuilt_on_startup(self):
+        country = Country(name="France", code="FR")
+        self.assertEqual(FileStorage(self.path).find_one_by(Country, 'code', "FR").id, country.id)
+
+    def test_country_endpoints(self):
+        self.assertEqual(self.client.post('/countries/', json={'name': 'United States', 'code': 'US'}).status_code, 201)
+        self.assertEqual(self.client.get('/countries/US').get_json()['code'], 'US')
+        self.assertEqual(self.client.get('/countries/FR').status_code, 404)
+        response = self.client.post('/cities/', json={'name': 'New York', 'country_code': 'US'})
+        self.assertEqual(response.status_code, 201)
+        cities = self.client.get('/countries/US/cities').get_json()
+        self.assertEqual([city['name'] for city in cities], ['New York'])
+        self.assertEqual(self.client.post('/cities/', json={'name': 'Paris', 'country_code': 'FR'}).status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+from api import app
+from models import base_model
+from models.user import User
+from persistence.file_storage import FileStorage
+from persistence.sqlite_storage import SQLiteStorage
+
+
+class TestEmailIndex(unittest.TestCase):
+    storage_class = FileStorage
+    file_name = 'file_storage.json'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, self.file_name)
+        self.storage = self.storage_class(self.path)
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+        self.client = app.test_client()
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        if hasattr(self.storage, 'close'):
+            self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_lookup_is_case_insensitive(self):
+        user = User(email="Guest@Example.com", first_name="Guest", last_name="User")
+        self.assertEqual(User.load_by_email(" guest@example.COM").id, user.id)
+        self.assertFalse(User.unique_email("guest@example.com"))
+        self.assertTrue(User.unique_email("other@example.com"))
+
+    def test_index_follows_updates_and_deletes(self):
+        user = User(email="guest@example.com", first_name="Guest", last_name="User")
+        user.update_details(email="new@example.com")
+        self.assertIsNone(User.load_by_email("guest@example.com"))
+        self.assertEqual(User.load_by_email("new@example.com").id, user.id)
+        User.delete(str(user.id))
+        self.assertIsNone(User.load_by_email("new@example.com"))
+
+    def test_index_rebuilt_on_startup(self):
+        user = User(email="guest@example.com", first_name="Guest", last_name="User")
+        storage = self.storage_class(self.path)
+        self.assertEqual(storage.find_one_by(User, 'email', "GUEST@example.com").id, user.id)
+
+    def test_signup_rejects_duplicate_email(self):
+        payload = {'email': 'guest@example.com', 'first_name': 'Guest', 'last_name': 'User'}
+        self.assertEqual(self.client.post('/users/', json=payload).status_code, 201)
+        payload['email'] = 'GUEST@example.com'
+        self.assertEqual(self.client.post('/users/', json=payload).status_code, 400)
+
+    def test_lookup_endpoint(self):
+        user = User(email="guest@example.com", first_name="Guest", last_name="User")
+        response = self.client.get('/users/email/guest@example.com')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['id'], str(user.id))
+        self.assertEqual(self.client.get('/users/email/missing@example.com').status_code, 404)
+
+
+class TestSQLiteEmailIndex(TestEmailIndex):
+    storage_class = SQLiteStorage
+    file_name = 'hbnb.sqlite3'
+
+
+if __name__ == '__main__':
+    unittest.main()
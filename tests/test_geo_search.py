@@ -0,0 +1,118 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import random
+import numpy as np
+from api import app
+from models import base_model
+from models.place import Place
+from models.user import User
+from persistence.file_storage import FileStorage
+from persistence.query import Condition
+from persistence.spatial import GridIndex, haversine_km
+
+
+class TestGeoSearch(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.storage = FileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+        self.client = app.test_client()
+        self.host = User(email="host@example.com", first_name="Host", last_name="User")
+        rng = random.Random(7)
+        with base_model.data_manager.unit_of_work():
+            self.places = [self.create_place(f"Place {i}", rng.uniform(-80.0, 80.0), rng.uniform(-180.0, 180.0),
+                                             price=float(i % 10) * 50)
+                           for i in range(300)]
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def create_place(self, name, latitude, longitude, price=100.0):
+        return Place(name=name, description="Nice", address="1 Main St", city_id="c1", latitude=latitude,
+                     longitude=longitude, host_id=str(self.host.id), number_of_rooms=1, number_of_bathrooms=1,
+                     price_per_night=price, max_guests=2, amenity_ids=[])
+
+    def brute_force(self, latitude, longitude, predicate=lambda place: True):
+        places = [place for place in Place.load_all() if predicate(place)]
+        distances = haversine_km(latitude, longitude, np.array([place.latitude for place in places]),
+                                 np.array([place.longitude for place in places]))
+        return sorted(zip(distances.tolist(), [place.id for place in places]))
+
+    def test_nearest_matches_brute_force(self):
+        for latitude, longitude in [(0.0, 0.0), (45.0, 179.9), (-60.0, -179.5), (89.0, 10.0)]:
+            with self.subTest(latitude=latitude, longitude=longitude):
+                expected = self.brute_force(latitude, longitude)[:7]
+                found = Place.nearest(latitude, longitude, 7)
+                self.assertEqual([place.id for place, _ in found], [place_id for _, place_id in expected])
+                for (_, distance), (expected_distance, _) in zip(found, expected):
+                    self.assertAlmostEqual(distance, expected_distance, places=6)
+
+    def test_radius_and_conditions(self):
+        conditions = [Condition('price_per_night', 'lte', 200.0)]
+        expected = [place_id for distance, place_id in self.brute_force(10.0, 170.0, lambda place: place.price_per_night <= 200.0)
+                    if distance <= 3000.0]
+        found = Place.nearest(10.0, 170.0, 1000, conditions, radius_km=3000.0)
+        self.assertEqual([place.id for place, _ in found], expected)
+        self.assertTrue(all(distance <= 3000.0 for _, distance in found))
+
+    def test_box_search_matches_query(self):
+        for box in [(-10.0, -20.0, 30.0, 40.0), (50.0, 170.0, 80.0, 180.0), (-5.0, 10.0, -5.0, 10.0), (10.0, 0.0, -10.0, 5.0)]:
+            conditions = [Condition('latitude', 'gte', box[0]), Condition('longitude', 'gte', box[1]),
+                          Condition('latitude', 'lte', box[2]), Condition('longitude', 'lte', box[3])]
+            with self.subTest(box=box):
+                expected = [place.id for place in Place.query(conditions)]
+                self.assertEqual([place.id for place in Place.search(conditions)], expected)
+        band = [Condition('latitude', 'gte', 60.0), Condition('price_per_night', 'gte', 100.0)]
+        self.assertEqual([place.id for place in Place.search(band)], [place.id for place in Place.query(band)])
+
+    def test_index_follows_writes(self):
+        moved, deleted = self.places[0], self.places[1]
+        Place.nearest(0.0, 0.0, 1)
+        moved.update_details(latitude=-89.5, longitude=0.0)
+        Place.delete(str(deleted.id))
+        new = self.create_place("New", 89.5, 0.0)
+        self.assertEqual(Place.nearest(-90.0, 0.0, 1)[0][0].id, moved.id)
+        self.assertEqual(Place.nearest(90.0, 0.0, 1)[0][0].id, new.id)
+        found = [place.id for place, _ in Place.nearest(deleted.latitude, deleted.longitude, 300)]
+        self.assertNotIn(deleted.id, found)
+        self.assertEqual(len(found), 300)
+
+    def test_grid_rebuild_keeps_candidates(self):
+        grid = GridIndex(cell_degrees=1.0)
+        latitudes, longitudes = np.array([0.5, 10.5, np.nan, -0.5]), np.array([0.5, 10.5, 0.0, 179.5])
+        grid.rebuild(latitudes, longitudes, np.array([True, True, True, False]))
+        self.assertEqual(sorted(grid.candidates(0.0, 0.0, 11.0, 11.0).tolist()), [0, 1])
+        self.assertEqual(grid.candidates(-1.0, 179.0, 1.0, -179.0).tolist(), [])
+        grid.move(3)
+        self.assertIn(3, grid.candidates(-1.0, 179.0, 1.0, -179.0).tolist())
+
+    def test_endpoints(self):
+        response = self.client.get('/places/nearest?latitude=0&longitude=0&k=3&fields=name,distance_km')
+        self.assertEqual(response.status_code, 200)
+        expected = self.brute_force(0.0, 0.0)[:3]
+        body = response.get_json()
+        self.assertEqual([place['id'] for place in body], [str(place_id) for _, place_id in expected])
+        self.assertEqual(set(body[0]), {'id', 'name', 'distance_km'})
+        response = self.client.get('/places/nearby?latitude=0&longitude=0&radius_km=2500&max_price=100')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(all(place['distance_km'] <= 2500 and place['price_per_night'] <= 100 for place in response.get_json()))
+        response = self.client.get('/places/within?min_latitude=-10&max_latitude=30&min_longitude=-20&max_longitude=40&limit=500')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.get_json()), len(Place.query([Condition('latitude', 'gte', -10.0), Condition('latitude', 'lte', 30.0),
+                                                                    Condition('longitude', 'gte', -20.0), Condition('longitude', 'lte', 40.0)])))
+        for url in ['/places/within?min_latitude=0', '/places/nearest?latitude=91&longitude=0',
+                    '/places/nearby?latitude=0&longitude=0', '/places/nearby?latitude=0&longitude=0&radius_km=nan',
+                    '/places/nearest?latitude=0&longitude=0&k=0']:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import threading
+from unittest import mock
+from api import app
+from models import base_model
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+from models.user import User
+from persistence.config import identity_map_size
+from persistence.data_manager import DataManager
+from persistence.records import hydrate
+from persistence.file_storage import FileStorage
+from persistence.identity_map import IdentityMap
+
+
+class CountingFileStorage(FileStorage):
+    """
+    FileStorage counting how many objects it loads by ID.
+    """
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self.loads = 0
+
+    def load(self, cls, obj_id):
+        self.loads += 1
+        return super().load(cls, obj_id)
+
+
+class TestIdentityMap(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.storage = CountingFileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+        self.data_manager = base_model.data_manager
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def test_same_instance_is_returned(self):
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        before = self.data_manager.cache_stats()
+        first = Review.load(review.id)
+        self.assertIsNot(first, review)
+        self.assertIs(Review.load(str(review.id)), first)
+        self.assertEqual(self.storage.loads, 1)
+        self.assertIn(first, Review.load_all())
+        self.assertIs(Review.find_one_by('place_id', "p"), first)
+        stats = self.data_manager.cache_stats()
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(stats['size'], 1)
+
+    def test_save_and_delete_invalidate(self):
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        loaded = Review.load(review.id)
+        loaded.update_details(comment="Updated")
+        reloaded = Review.load(review.id)
+        self.assertIsNot(reloaded, loaded)
+        self.assertEqual(reloaded.comment, "Updated")
+        Review.delete(str(review.id))
+        self.assertIsNone(Review.load(review.id))
+
+    def test_failed_save_does_not_leak(self):
+        Amenity(name="Pool")
+        amenity = Amenity.load(Amenity(name="Wi-Fi").id)
+        with self.assertRaises(ValueError):
+            amenity.update_details(name="Pool")
+        self.assertEqual(Amenity.load(amenity.id).name, "Wi-Fi")
+
+    def test_updates_leave_the_shared_instance_unchanged(self):
+        client = app.test_client()
+        user = User(email="host@example.com", first_name="Host", last_name="User")
+        cached = User.load(user.id)
+        body = client.put(f'/users/{user.id}', json={'first_name': "New", 'id': "other", 'place_ids': ["p1"],
+                                                     'places': []}).get_json()
+        self.assertEqual((body['id'], body['first_name'], body['place_ids']), (str(user.id), "New", []))
+        self.assertEqual(cached.first_name, "Host")
+        self.assertEqual(User.load(user.id).first_name, "New")
+        cached = User.load(user.id)
+        with mock.patch.object(self.storage, 'save_many', side_effect=OSError("Disk full")):
+            self.assertEqual(client.put(f'/users/{user.id}', json={'last_name': "Lost"}).status_code, 500)
+        self.assertEqual(cached.last_name, "User")
+        self.assertEqual(User.load(user.id).last_name, "User")
+        with self.assertRaises(ValueError):
+            cached.update(place_ids=[])
+
+    def test_rolled_back_changes_stay_in_their_request(self):
+        host = User(email="host@example.com", first_name="Host", last_name="User")
+        place = Place(name="Loft", description="Nice", address="1 Main St", city_id="c", latitude=1.0, longitude=2.0,
+                      host_id=str(host.id), number_of_rooms=1, number_of_bathrooms=1, price_per_night=10.0,
+                      max_guests=2, amenity_ids=[])
+        kept, dropped = (Review(place_id=str(place.id), user_id="u", rating=5, comment=comment)
+                         for comment in ("Kept", "Dropped"))
+        shared = Place.load(place.id)
+        added, committed = threading.Event(), threading.Event()
+
+        def failing_request():
+            try:
+                with self.data_manager.unit_of_work():
+                    shared.add_review(dropped)
+                    added.set()
+                    committed.wait()
+                    raise ValueError("abort")
+            except ValueError:
+                pass
+
+        thread = threading.Thread(target=failing_request)
+        thread.start()
+        added.wait()
+        with self.data_manager.unit_of_work():
+            updated = shared.add_review(kept)
+        committed.set()
+        thread.join()
+        self.assertIsNot(updated, shared)
+        self.assertEqual(shared.review_ids, [])
+        self.assertEqual(self.storage.load(Place, place.id).review_ids, [str(kept.id)])
+        self.assertEqual(Place.load(place.id).review_ids, [str(kept.id)])
+
+    def test_storage_swap_clears_the_map(self):
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        Review.load(review.id)
+        self.data_manager.storage = FileStorage(os.path.join(self.tmp_dir, 'other.json'))
+        self.assertIsNone(Review.load(review.id))
+
+    def test_hot_gets_skip_rehydration(self):
+        client = app.test_client()
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        for _ in range(5):
+            self.assertEqual(client.get(f'/reviews/{review.id}').status_code, 200)
+        self.assertEqual(self.storage.loads, 1)
+
+
+class TestLRU(unittest.TestCase):
+    def test_least_recently_used_is_evicted(self):
+        identity_map = IdentityMap(max_size=2)
+        objs = [mock.Mock(id=i) for i in range(3)]
+        for obj in objs[:2]:
+            identity_map.add(obj)
+        identity_map.get(objs[0].__class__, 0)
+        identity_map.add(objs[2])
+        self.assertIsNone(identity_map.get(objs[1].__class__, 1))
+        self.assertIs(identity_map.get(objs[0].__class__, 0), objs[0])
+        self.assertEqual(identity_map.stats()['evictions'], 1)
+
+    def test_disabled_map(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            data_manager = DataManager(FileStorage(os.path.join(tmp_dir, 'file_storage.json')), identity_map_size=0)
+            review = hydrate(Review, dict(id="6c4ee7a2-2a5e-4d5c-9a39-0b9d5c0b8a11", created_at="2024-01-01T00:00:00",
+                                          updated_at="2024-01-01T00:00:00", place_id="p", user_id="u", rating=5, comment="c"))
+            data_manager.save(review)
+            self.assertIsNot(data_manager.load(Review, review.id), data_manager.load(Review, review.id))
+            self.assertEqual(data_manager.cache_stats()['size'], 0)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_size_from_environment(self):
+        with mock.patch.dict(os.environ, {'HBNB_IDENTITY_MAP_SIZE': '42'}):
+            self.assertEqual(identity_map_size(), 42)
+        with mock.patch.dict(os.environ, {'HBNB_IDENTITY_MAP_SIZE': 'many'}):
+            with self.assertRaises(ValueError):
+                identity_map_size()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+from api import app
+from models import base_model
+from models.amenity import Amenity
+from models.review import Review
+from models.user import User
+from persistence.file_storage import FileStorage
+from persistence.indexes import UniqueConstraintError
+from persistence.sqlite_storage import SQLiteStorage
+from persistence.wal_storage import WALFileStorage
+
+
+class TestIndexes(unittest.TestCase):
+    storage_class = FileStorage
+    file_name = 'file_storage.json'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, self.file_name)
+        self.storage = self.storage_class(self.path)
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        if hasattr(self.storage, 'close'):
+            self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_find_by_non_unique_field(self):
+        first = Review(place_id="p1", user_id="u", rating=5, comment="Great")
+        second = Review(place_id="p1", user_id="u", rating=4, comment="Good")
+        Review(place_id="p2", user_id="u", rating=3, comment="Fine")
+        self.assertEqual([r.id for r in Review.find_by('place_id', "p1")], [first.id, second.id])
+        second.place_id = "p2"
+        second.save()
+        self.assertEqual([r.id for r in Review.find_by('place_id', "p1")], [first.id])
+        self.assertEqual(len(Review.find_by('place_id', "p2")), 2)
+        self.assertEqual(Review.find_by('place_id', "missing"), [])
+
+    def test_undeclared_field_is_rejected(self):
+        with self.assertRaises(ValueError):
+            Review.find_by('comment', "Great")
+
+    def test_unique_violation_raised_by_storage(self):
+        Amenity(name="Pool")
+        with self.assertRaises(UniqueConstraintError):
+            Amenity(name="Pool")
+        self.assertEqual(len(Amenity.load_all()), 1)
+        amenity = Amenity(name="Wi-Fi")
+        amenity.update_details(name="Wi-Fi")
+        with self.assertRaises(UniqueConstraintError):
+            amenity.update_details(name="Pool")
+        self.assertEqual(self.storage.load(Amenity, amenity.id).name, "Wi-Fi")
+        self.assertEqual(self.storage.check_indexes(Amenity), [])
+
+    def test_unique_violation_within_a_batch(self):
+        with self.assertRaises(UniqueConstraintError):
+            with base_model.data_manager.unit_of_work():
+                User(email="a@example.com", first_name="A", last_name="User")
+                User(email="A@example.com", first_name="B", last_name="User")
+        self.assertEqual(User.load_all(), [])
+
+    def test_indexes_rebuilt_after_restart(self):
+        review = Review(place_id="p1", user_id="u", rating=5, comment="Great")
+        if hasattr(self.storage, 'close'):
+            self.storage.close()
+        self.storage = self.storage_class(self.path)
+        base_model.data_manager.storage = self.storage
+        self.assertEqual([r.id for r in Review.find_by('user_id', "u")], [review.id])
+        self.assertEqual(base_model.data_manager.check_indexes(Review), [])
+
+    def test_pending_changes_are_found(self):
+        with base_model.data_manager.unit_of_work():
+            review = Review(place_id="p1", user_id="u", rating=5, comment="Great")
+            self.assertEqual([r.id for r in Review.find_by('place_id', "p1")], [review.id])
+            review.place_id = "p2"
+            review.save()
+            self.assertEqual(Review.find_by('place_id', "p1"), [])
+
+
+class TestWALIndexes(TestIndexes):
+    storage_class = WALFileStorage
+
+
+class TestSQLiteIndexes(TestIndexes):
+    storage_class = SQLiteStorage
+    file_name = 'hbnb.sqlite3'
+
+    def test_consistency_checker(self):
+        review = Review(place_id="p1", user_id="u", rating=5, comment="Great")
+        conn = self.storage._connection()
+        with conn:
+            conn.execute('UPDATE "Review" SET place_id = ? WHERE id = ?', ("other", str(review.id)))
+        self.assertEqual(len(self.storage.check_indexes(Review)), 1)
+
+
+class TestFileIndexConsistency(unittest.TestCase):
+    def test_consistency_checker_reports_drift_and_duplicates(self):
+        json_path = os.path.join(os.path.dirname(__file__), 'file_storage.json')
+        storage = FileStorage(json_path)
+        problems = storage.check_indexes(User)
+        self.assertEqual(len(problems), 1)
+        self.assertIn("test@example.com", problems[0])
+        user_id = next(iter(storage.data['User']))
+        storage.data['User'][user_id] = dict(storage.data['User'][user_id], email="moved@example.com")
+        self.assertEqual(len(storage.check_indexes(User)), 2)
+
+    def test_amenity_name_conflict_endpoint(self):
+        tmp_dir = tempfile.mkdtemp()
+        previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = FileStorage(os.path.join(tmp_dir, 'file_storage.json'))
+        try:
+            client = app.test_client()
+            response = client.post('/amenities/', json={'name': 'Pool'})
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(client.post('/amenities/', json={'name': 'Pool'}).status_code, 409)
+            amenity_id = response.get_json()['id']
+            self.assertEqual(client.put(f'/amenities/{amenity_id}', json={'name': 'Pool'}).status_code, 200)
+        finally:
+            base_model.data_manager.storage = previous_storage
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
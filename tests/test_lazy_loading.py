@@ -0,0 +1,128 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import json
+from models import base_model
+from models.amenity import Amenity
+from models.review import Review
+from persistence.file_storage import FileStorage
+from persistence.wal_storage import WALFileStorage
+from persistence.shared_storage import SharedFileStorage
+from persistence.snapshot import JSONSnapshotReader
+
+
+class TestLazyLoading(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'file_storage.json')
+        self.previous_storage = base_model.data_manager.storage
+        self.storages = []
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        for storage in self.storages:
+            if hasattr(storage, 'close'):
+                storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def use(self, storage):
+        self.storages.append(storage)
+        base_model.data_manager.storage = storage
+        base_model.data_manager.identity_map.clear()
+        return storage
+
+    def seed(self, storage_class=FileStorage, **options):
+        storage = self.use(storage_class(self.file_path, **options))
+        amenity = Amenity(name="Pool")
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        if storage_class is not FileStorage:
+            storage.compact()
+        return amenity, review
+
+    def test_nothing_is_read_on_startup(self):
+        self.seed()
+        storage = FileStorage(self.file_path)
+        self.assertFalse(storage.opened)
+        self.assertEqual(dict(storage.data), {})
+
+    def test_point_load_reads_only_its_class(self):
+        for snapshot_format in ('json', 'binary'):
+            with self.subTest(snapshot_format=snapshot_format):
+                self.file_path = os.path.join(self.tmp_dir, f'file_storage.{snapshot_format}')
+                amenity, _ = self.seed(snapshot_format=snapshot_format)
+                storage = FileStorage(self.file_path)
+                self.assertEqual(storage.load(Amenity, amenity.id).name, "Pool")
+                self.assertIn('Amenity', storage.data)
+                self.assertNotIn('Review', storage.data)
+
+    def test_json_file_is_indexed_by_class(self):
+        self.seed()
+        with JSONSnapshotReader(self.file_path) as reader:
+            self.assertEqual(set(reader.sections), {"User", "Place", "Review", "Amenity", "City", "Country"})
+
+    def test_single_line_json_is_still_read(self):
+        amenity, review = self.seed()
+        with open(self.file_path) as file:
+            data = json.load(file)
+        with open(self.file_path, 'w') as file:
+            json.dump(data, file, indent=4)
+        with JSONSnapshotReader(self.file_path) as reader:
+            self.assertIsNone(reader.sections)
+        storage = FileStorage(self.file_path)
+        self.assertEqual(storage.load(Review, review.id).comment, "Great")
+        self.assertEqual(storage.load(Amenity, amenity.id).name, "Pool")
+
+    def test_write_keeps_classes_not_loaded(self):
+        amenity, review = self.seed()
+        self.use(FileStorage(self.file_path))
+        Amenity(name="Wifi")
+        reopened = FileStorage(self.file_path)
+        self.assertEqual(reopened.load(Review, review.id).rating, 5)
+        self.assertEqual(len(reopened.load_all(Amenity)), 2)
+
+    def test_log_records_wait_for_their_class(self):
+        amenity, review = self.seed(WALFileStorage, fsync=False)
+        self.storages.pop().close()
+        storage = self.use(WALFileStorage(self.file_path, fsync=False))
+        review.update_details(rating=2)
+        Amenity.delete(str(amenity.id))
+        storage.close()
+        storage = self.use(WALFileStorage(self.file_path, fsync=False))
+        self.assertEqual(storage.load(Review, review.id).rating, 2)
+        self.assertIn('Amenity', storage._pending)
+        self.assertEqual(storage.log_records, 2)
+        self.assertIsNone(storage.load(Amenity, amenity.id))
+        self.assertNotIn('Amenity', storage._pending)
+
+    def test_compaction_keeps_classes_not_loaded(self):
+        amenity, review = self.seed(WALFileStorage, fsync=False)
+        storage = self.use(WALFileStorage(self.file_path, fsync=False))
+        Amenity(name="Wifi")
+        storage.compact()
+        self.assertNotIn('Amenity', storage._pending)
+        reopened = self.use(WALFileStorage(self.file_path, fsync=False))
+        self.assertEqual(reopened.load(Review, review.id).comment, "Great")
+        self.assertEqual(len(reopened.load_all(Amenity)), 2)
+
+    def test_shared_storage_reads_other_writes_into_unloaded_classes(self):
+        amenity, review = self.seed(SharedFileStorage, fsync=False)
+        reader = self.use(SharedFileStorage(self.file_path, fsync=False))
+        writer = SharedFileStorage(self.file_path, fsync=False)
+        self.storages.append(writer)
+        self.assertEqual(reader.load(Amenity, amenity.id).name, "Pool")
+        changed = writer.load(Review, review.id)
+        changed.comment = "Changed elsewhere"
+        writer.save(changed)
+        self.assertNotIn('Review', reader.data)
+        self.assertEqual(reader.load(Review, review.id).comment, "Changed elsewhere")
+        writer.compact()
+        self.assertEqual(reader.load(Review, review.id).comment, "Changed elsewhere")
+        self.assertEqual(reader.load(Amenity, amenity.id).name, "Pool")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import uuid
+from unittest import mock
+from models import base_model
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+from persistence.file_storage import FileStorage
+from persistence.wal_storage import WALFileStorage
+from persistence.shared_storage import SharedFileStorage
+from persistence.sqlite_storage import SQLiteStorage, IN_BATCH_SIZE
+
+
+class TestLoadMany(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = FileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+        self.data_manager = base_model.data_manager
+        self.reviews = [Review(place_id="p", user_id="u", rating=i, comment=f"Review {i}") for i in range(1, 5)]
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def test_order_and_missing_ids(self):
+        first, second, third = (str(review.id) for review in self.reviews[:3])
+        unknown = str(uuid.uuid4())
+        reviews, missing = Review.load_many([third, unknown, first, self.reviews[1].id, third])
+        self.assertEqual([str(review.id) for review in reviews], [third, first, second, third])
+        self.assertIs(reviews[0], reviews[3])
+        self.assertEqual(missing, [unknown])
+        self.assertEqual(Review.load_many([]), ([], []))
+
+    def test_goes_through_the_identity_map(self):
+        cached = Review.load(self.reviews[0].id)
+        storage = self.data_manager.storage
+        with mock.patch.object(storage, 'load_many', wraps=storage.load_many) as load_many:
+            reviews, _ = Review.load_many([review.id for review in self.reviews])
+            self.assertIs(reviews[0], cached)
+            self.assertEqual(load_many.call_count, 1)
+            self.assertEqual(len(load_many.call_args.args[1]), 3)
+            again, _ = Review.load_many([review.id for review in self.reviews])
+        self.assertEqual(load_many.call_count, 1)
+        self.assertTrue(all(a is b for a, b in zip(reviews, again)))
+        self.assertIs(Review.load(self.reviews[3].id), reviews[3])
+
+    def test_pending_changes_are_visible(self):
+        with self.data_manager.unit_of_work():
+            added = Review(place_id="p", user_id="u", rating=5, comment="Pending")
+            Review.delete(str(self.reviews[0].id))
+            reviews, missing = Review.load_many([added.id, self.reviews[0].id, self.reviews[1].id])
+            self.assertEqual(reviews[0], added)
+            self.assertEqual(missing, [str(self.reviews[0].id)])
+            self.assertEqual([review.comment for review in reviews], ["Pending", "Review 2"])
+
+    def test_relations_are_loaded_in_one_pass(self):
+        place = Place(name="Loft", description="Nice", address="1 Main St", city_id="c1", latitude=1.0,
+                      longitude=2.0, host_id="h1", number_of_rooms=1, number_of_bathrooms=1,
+                      price_per_night=80.0, max_guests=2, amenity_ids=[])
+        amenities = [Amenity(name=f"Amenity {i}") for i in range(3)]
+        for amenity in amenities:
+            place.add_amenity(amenity)
+        self.data_manager.identity_map.clear()
+        storage = self.data_manager.storage
+        with mock.patch.object(storage, 'load', wraps=storage.load) as load:
+            self.assertEqual([amenity.name for amenity in place.amenities], ["Amenity 0", "Amenity 1", "Amenity 2"])
+        self.assertEqual(load.call_count, 0)
+
+    def test_storages(self):
+        backends = {
+            'file': lambda: FileStorage(os.path.join(self.tmp_dir, 'many.json')),
+            'wal': lambda: WALFileStorage(os.path.join(self.tmp_dir, 'many_wal.json')),
+            'shared': lambda: SharedFileStorage(os.path.join(self.tmp_dir, 'many_shared.json')),
+            'sqlite': lambda: SQLiteStorage(os.path.join(self.tmp_dir, 'many.db')),
+        }
+        # More IDs than one IN (...) query binds
+        ids = [review.id for review in self.reviews] + [uuid.uuid4() for _ in range(IN_BATCH_SIZE)]
+        for name, create in backends.items():
+            with self.subTest(backend=name):
+                storage = create()
+                storage.save_many(self.reviews)
+                loaded = create().load_many(Review, ids)
+                self.assertEqual(sorted(loaded), sorted(str(review.id) for review in self.reviews))
+                self.assertEqual(loaded[str(self.reviews[2].id)].comment, "Review 3")
+                if hasattr(storage, 'close'):
+                    storage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
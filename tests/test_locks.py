@@ -0,0 +1,132 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import threading
+import json
+import time
+import uuid
+from datetime import datetime
+from models.review import Review
+from persistence.file_storage import FileStorage
+from persistence.records import hydrate
+from persistence.locks import RWLock
+from persistence.wal_storage import WALFileStorage
+
+
+def make_review(i):
+    return hydrate(Review, dict(id=uuid.uuid4(), created_at=datetime.now(), updated_at=datetime.now(),
+                                place_id="p", user_id="u", rating=i % 5 + 1, comment=f"Review {i}"))
+
+
+class TestRWLock(unittest.TestCase):
+    def test_readers_share_the_lock(self):
+        lock = RWLock()
+        inside = threading.Barrier(3, timeout=5)
+
+        def read():
+            with lock.read():
+                inside.wait()
+
+        threads = [threading.Thread(target=read) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertFalse(inside.broken)
+
+    def test_writer_is_exclusive_and_blocks_new_readers(self):
+        lock = RWLock()
+        events = []
+        lock.acquire_read()
+        writer = threading.Thread(target=lambda: (lock.acquire_write(), events.append('write'), lock.release_write()))
+        writer.start()
+        time.sleep(0.05)
+        reader = threading.Thread(target=lambda: (lock.acquire_read(), events.append('read'), lock.release_read()))
+        reader.start()
+        time.sleep(0.05)
+        self.assertEqual(events, [])
+        lock.release_read()
+        writer.join(5)
+        reader.join(5)
+        self.assertEqual(events, ['write', 'read'])
+
+
+class TestConcurrentFileStorage(unittest.TestCase):
+    storage_class = FileStorage
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'file_storage.json')
+        self.storage = self.storage_class(self.file_path)
+
+    def tearDown(self):
+        if hasattr(self.storage, 'close'):
+            self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_reads_while_writing(self):
+        self.storage.save_many([make_review(i) for i in range(200)])
+        errors = []
+        done = threading.Event()
+
+        def write():
+            try:
+                for i in range(50):
+                    self.storage.save(make_review(i))
+            except Exception as e:
+                errors.append(e)
+            done.set()
+
+        def read():
+            try:
+                while not done.is_set():
+                    self.storage.load_all(Review)
+                    self.storage.iterate(Review)
+                    list(self.storage.query(Review, limit=10))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.storage.load_all(Review)), 250)
+        self.assertEqual(self.storage.check_indexes(Review), [])
+
+    def test_snapshot_is_shared_until_the_next_write(self):
+        review = make_review(0)
+        self.storage.save(review)
+        snapshot = self.storage._snapshot(Review)
+        self.assertIs(self.storage._snapshot(Review), snapshot)
+        self.storage.save(make_review(1))
+        self.assertEqual(len(self.storage._snapshot(Review)), 2)
+        self.assertEqual(len(snapshot), 1)
+
+
+class TestConcurrentWALFileStorage(TestConcurrentFileStorage):
+    def storage_class(self, file_path):
+        return WALFileStorage(file_path, compact_threshold=50, fsync=False)
+
+
+class TestAtomicFileWrites(unittest.TestCase):
+    def test_file_is_replaced(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            file_path = os.path.join(tmp_dir, 'file_storage.json')
+            storage = FileStorage(file_path)
+            storage.save(make_review(0))
+            with open(file_path) as file:
+                self.assertEqual(len(json.load(file)['Review']), 1)
+            self.assertFalse(os.path.exists(file_path + '.tmp'))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+from api import app
+from models import base_model
+from models.place import Place
+from models.review import Review
+from models.user import User
+from persistence.file_storage import FileStorage
+from persistence.query import Condition
+from persistence.sqlite_storage import SQLiteStorage
+from persistence.wal_storage import WALFileStorage
+
+
+class TestPagination(unittest.TestCase):
+    storage_class = FileStorage
+    file_name = 'file_storage.json'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.storage = self.storage_class(os.path.join(self.tmp_dir, self.file_name))
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+        self.client = app.test_client()
+        self.host = User(email="host@example.com", first_name="Host", last_name="User")
+        self.places = [self.create_place(f"Place {i}", city_id="c1" if i % 2 else "c2", price=50.0 * i, guests=i)
+                       for i in range(1, 8)]
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        if hasattr(self.storage, 'close'):
+            self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def create_place(self, name, city_id, price, guests):
+        return Place(name=name, description="Nice", address="1 Main St", city_id=city_id, latitude=1.0,
+                     longitude=2.0, host_id=str(self.host.id), number_of_rooms=1, number_of_bathrooms=1,
+                     price_per_night=price, max_guests=guests, amenity_ids=[])
+
+    def test_storage_query_pages_in_creation_order(self):
+        first = self.storage.query(Place, limit=3)
+        self.assertEqual([p.id for p in first], [p.id for p in self.places[:3]])
+        after = (first[-1].created_at, str(first[-1].id))
+        rest = self.storage.query(Place, after=after)
+        self.assertEqual([p.id for p in rest], [p.id for p in self.places[3:]])
+        conditions = [Condition('city_id', 'eq', "c1"), Condition('price_per_night', 'gte', 150.0)]
+        self.assertEqual([p.name for p in self.storage.query(Place, conditions)], ["Place 3", "Place 5", "Place 7"])
+
+    def test_cursor_walks_every_page(self):
+        names, url, pages = [], '/places/?limit=3', 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            names.extend(place['name'] for place in response.get_json())
+            cursor = response.headers.get('X-Next-Cursor')
+            url = f'/places/?limit=3&cursor={cursor}' if cursor else None
+            pages += 1
+        self.assertEqual(pages, 3)
+        self.assertEqual(names, [p.name for p in self.places])
+
+    def test_envelope_holds_next_cursor(self):
+        response = self.client.get('/places/?limit=4&envelope=1')
+        body = response.get_json()
+        self.assertEqual([place['name'] for place in body['items']], [p.name for p in self.places[:4]])
+        self.assertEqual(body['next_cursor'], response.headers['X-Next-Cursor'])
+        body = self.client.get(f"/places/?limit=4&envelope=1&cursor={body['next_cursor']}").get_json()
+        self.assertEqual([place['name'] for place in body['items']], [p.name for p in self.places[4:]])
+        self.assertIsNone(body['next_cursor'])
+
+    def test_filters(self):
+        response = self.client.get('/places/?city_id=c2&max_price=250&min_guests=3')
+        self.assertEqual([p['name'] for p in response.get_json()], ["Place 4"])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+        self.assertEqual(self.client.get('/places/?min_price=cheap').status_code, 400)
+
+    def test_sparse_fields(self):
+        response = self.client.get('/places/?fields=name,price_per_night&limit=1')
+        self.assertEqual(response.get_json(), [{'id': str(self.places[0].id), 'name': "Place 1", 'price_per_night': 50.0}])
+        self.assertEqual(self.client.get('/places/?fields=secret').status_code, 400)
+
+    def test_invalid_limit_and_cursor(self):
+        self.assertEqual(self.client.get('/places/?limit=0').status_code, 400)
+        self.assertEqual(self.client.get('/places/?limit=100000').status_code, 400)
+        self.assertEqual(self.client.get('/places/?cursor=not-a-cursor').status_code, 400)
+
+    def test_nested_collection(self):
+        place = self.places[0]
+        for rating in range(1, 5):
+            Review(place_id=str(place.id), user_id="guest", rating=rating, comment="Ok")
+        Review(place_id=str(self.places[1].id), user_id="guest", rating=5, comment="Other")
+        response = self.client.get(f'/places/{place.id}/reviews?limit=2&min_rating=2')
+        self.assertEqual([r['rating'] for r in response.get_json()], [2, 3])
+        self.assertIn('X-Next-Cursor', response.headers)
+
+    def test_pending_changes_are_paginated(self):
+        with base_model.data_manager.unit_of_work():
+            extra = self.create_place("Pending", city_id="c1", price=10.0, guests=1)
+            self.assertEqual(Place.query(limit=20)[-1].id, extra.id)
+
+
+class TestWALPagination(TestPagination):
+    storage_class = WALFileStorage
+
+
+class TestSQLitePagination(TestPagination):
+    storage_class = SQLiteStorage
+    file_name = 'hbnb.sqlite3'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+from api import app
+from models import base_model
+from models.place import Place, place_columns
+from models.user import User
+from persistence.file_storage import FileStorage
+from persistence.query import Condition
+
+
+class TestPlaceSearch(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.storage = FileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+        self.client = app.test_client()
+        self.host = User(email="host@example.com", first_name="Host", last_name="User")
+        self.places = [self.create_place(f"Place {i}", city_id="c1" if i % 2 else "c2", price=50.0 * i, guests=i,
+                                         rooms=i % 3 + 1, bathrooms=i % 2 + 1)
+                       for i in range(1, 11)]
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def create_place(self, name, city_id, price, guests, rooms=1, bathrooms=1):
+        return Place(name=name, description="Nice", address="1 Main St", city_id=city_id, latitude=1.0,
+                     longitude=2.0, host_id=str(self.host.id), number_of_rooms=rooms, number_of_bathrooms=bathrooms,
+                     price_per_night=price, max_guests=guests, amenity_ids=[])
+
+    def assertSameAsQuery(self, conditions, after=None, limit=None):
+        expected = [place.id for place in Place.query(conditions, after, limit)]
+        self.assertEqual([place.id for place in Place.search(conditions, after, limit)], expected)
+        return expected
+
+    def test_search_matches_query(self):
+        cases = [
+            [],
+            [Condition('city_id', 'eq', "c1")],
+            [Condition('price_per_night', 'gte', 150.0), Condition('price_per_night', 'lte', 400.0)],
+            [Condition('number_of_rooms', 'gte', 2), Condition('number_of_bathrooms', 'lte', 1)],
+            [Condition('city_id', 'eq', "c2"), Condition('max_guests', 'gte', 4), Condition('host_id', 'eq', str(self.host.id))],
+            [Condition('city_id', 'eq', "unknown")],
+        ]
+        for conditions in cases:
+            with self.subTest(conditions=[(c.field, c.op, c.value) for c in conditions]):
+                self.assertSameAsQuery(conditions)
+        page = self.assertSameAsQuery([Condition('city_id', 'eq', "c1")], limit=2)
+        last = Place.load(page[-1])
+        self.assertSameAsQuery([Condition('city_id', 'eq', "c1")], after=(last.created_at, str(last.id)))
+
+    def test_columns_follow_writes(self):
+        self.assertEqual(len(Place.search([Condition('city_id', 'eq', "c3")])), 0)
+        self.places[0].update_details(city_id="c3", price_per_night=999.0)
+        Place.delete(str(self.places[1].id))
+        new = self.create_place("New", city_id="c3", price=10.0, guests=2)
+        found = Place.search([Condition('city_id', 'eq', "c3")])
+        self.assertEqual([place.id for place in found], [self.places[0].id, new.id])
+        self.assertNotIn(self.places[1].id, [place.id for place in Place.search()])
+        self.assertEqual([place.id for place in Place.search([Condition('price_per_night', 'gte', 900.0)])], [self.places[0].id])
+
+    def test_replaced_storage_is_searched(self):
+        Place.search()
+        base_model.data_manager.storage = FileStorage(os.path.join(self.tmp_dir, 'other.json'))
+        self.assertEqual(Place.search(), [])
+        self.assertEqual(place_columns.size, 0)
+
+    def test_pending_places_fall_back_to_query(self):
+        with base_model.data_manager.unit_of_work():
+            pending = self.create_place("Pending", city_id="c1", price=1.0, guests=1)
+            self.assertIn(pending.id, [place.id for place in Place.search([Condition('price_per_night', 'lte', 1.0)])])
+
+    def test_unsupported_conditions_fall_back_to_query(self):
+        self.assertEqual([place.name for place in Place.search([Condition('name', 'eq', "Place 3")])], ["Place 3"])
+
+    def test_endpoint(self):
+        response = self.client.get('/places/search?city_id=c2&min_price=150&max_price=400&min_rooms=2&limit=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([place['name'] for place in response.get_json()], ["Place 4"])
+        cursor = response.headers['X-Next-Cursor']
+        response = self.client.get(f'/places/search?city_id=c2&min_price=150&max_price=400&min_rooms=2&limit=1&cursor={cursor}')
+        self.assertEqual([place['name'] for place in response.get_json()], ["Place 8"])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+        self.assertEqual(self.client.get('/places/search?max_bathrooms=many').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+from api import app
+from api.metrics import Histogram
+from models import base_model
+from models.amenity import Amenity
+from persistence import instrumentation
+from persistence.file_storage import FileStorage
+
+
+def server_timing(response):
+    """
+    Parse the Server-Timing header of a response.
+
+    :param response: The response
+    :return: A dictionary mapping each metric to its duration or description
+    """
+    metrics = {}
+    for metric in response.headers['Server-Timing'].split(', '):
+        name, value = metric.split(';')
+        metrics[name] = float(value.split('=')[1])
+    return metrics
+
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = FileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+        self.client = app.test_client()
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def test_server_timing(self):
+        response = self.client.post('/amenities/', json={'name': "Pool"})
+        self.assertEqual(response.status_code, 201)
+        timing = server_timing(response)
+        self.assertGreater(timing['total'], 0)
+        self.assertGreater(timing['serialize'], 0)
+        self.assertGreaterEqual(timing['save'], 1)
+        self.assertGreater(timing['bytes-written'], 0)
+        base_model.data_manager.identity_map.clear()
+        timing = server_timing(self.client.get(f"/amenities/{response.get_json()['id']}"))
+        self.assertGreaterEqual(timing['load'], 1)
+        self.assertEqual(timing['hydrated'], 1)
+        self.assertEqual(timing['bytes-written'], 0)
+        self.assertIsNone(instrumentation.current())
+
+    def test_metrics(self):
+        Amenity(name="Pool")
+        self.client.get('/amenities/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain; version=0.0.4'))
+        lines = response.data.decode().splitlines()
+        self.assertIn('# TYPE hbnb_request_duration_seconds histogram', lines)
+        self.assertTrue(any(line.startswith('hbnb_request_duration_seconds_count{method="GET",endpoint="/amenities/"}')
+                            for line in lines))
+        self.assertTrue(any(line.startswith('hbnb_request_data_manager_calls_bucket{method="GET",endpoint="/amenities/",'
+                                            'call="query",le="1"}') for line in lines))
+        self.assertTrue(any(line.startswith('hbnb_identity_map_hits_total ') for line in lines))
+        self.assertNotIn('Server-Timing', response.headers)
+
+    def test_histogram(self):
+        histogram = Histogram('test_seconds', "Test.", (0.1, 1.0), ('path',))
+        for value in (0.05, 0.1, 0.5, 5.0):
+            histogram.observe(value, '/a"b')
+        lines = histogram.render()
+        self.assertIn('test_seconds_bucket{path="/a\\"b",le="0.1"} 2', lines)
+        self.assertIn('test_seconds_bucket{path="/a\\"b",le="1.0"} 3', lines)
+        self.assertIn('test_seconds_bucket{path="/a\\"b",le="+Inf"} 4', lines)
+        self.assertIn('test_seconds_sum{path="/a\\"b"} 5.65', lines)
+        self.assertIn('test_seconds_count{path="/a\\"b"} 4', lines)
+
+    def test_profile(self):
+        Amenity(name="Pool")
+        self.assertFalse(app.config['PROFILING'])
+        response = self.client.get('/amenities/?profile=1')
+        self.assertEqual(response.get_json()[0]['name'], "Pool")
+        app.config['PROFILING'] = True
+        try:
+            response = self.client.get('/amenities/?profile=1')
+        finally:
+            app.config['PROFILING'] = False
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/plain')
+        self.assertIn('Ordered by: cumulative time', response.data.decode())
+        self.assertNotIn('ETag', response.headers)
+        self.assertIn('Server-Timing', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
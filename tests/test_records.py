@@ -0,0 +1,86 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import uuid
+from models import base_model
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.user import User
+from persistence.file_storage import FileStorage
+from persistence.wal_storage import WALFileStorage
+from persistence.sqlite_storage import SQLiteStorage
+from persistence.records import attributes, hydrate
+
+
+class TestRecords(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = FileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def test_models_have_no_dict(self):
+        for cls in (User, Place, Review, Amenity, City, Country):
+            with self.subTest(cls=cls.__name__):
+                self.assertEqual(cls.__dictoffset__, 0)
+                self.assertEqual(cls.__fields__[:3], ('id', 'created_at', 'updated_at'))
+        amenity = Amenity(name="Pool")
+        with self.assertRaises(AttributeError):
+            amenity.colour = "blue"
+
+    def test_attributes_follow_the_schema(self):
+        user = User(email="host@example.com", first_name="Host", last_name="User")
+        data = attributes(user)
+        self.assertEqual(list(data), list(User.__fields__))
+        self.assertEqual(data['email'], "host@example.com")
+        self.assertEqual(data['place_ids'], [])
+
+    def test_hydrate(self):
+        obj_id = str(uuid.uuid4())
+        review = hydrate(Review, {'id': obj_id, 'created_at': "2024-01-01T00:00:00", 'updated_at': "2024-01-02T00:00:00",
+                                  'place_id': "p", 'rating': 4, 'review_author': None})
+        self.assertEqual(review.id, uuid.UUID(obj_id))
+        self.assertEqual(review.updated_at.day, 2)
+        self.assertIsNone(review.user_id)
+        self.assertNotIn('review_author', attributes(review))
+
+    def test_classes_with_dict_keep_extra_attributes(self):
+        class Tagged(Review):
+            pass
+
+        review = hydrate(Tagged, {'id': str(uuid.uuid4()), 'created_at': "2024-01-01T00:00:00",
+                                  'updated_at': "2024-01-01T00:00:00", 'rating': 5, 'tag': "x"})
+        self.assertEqual(review.tag, "x")
+        self.assertEqual(attributes(review)['tag'], "x")
+        self.assertEqual(attributes(review)['rating'], 5)
+
+    def test_storages_round_trip(self):
+        backends = {
+            'file': lambda: FileStorage(os.path.join(self.tmp_dir, 'round_trip.json')),
+            'wal': lambda: WALFileStorage(os.path.join(self.tmp_dir, 'round_trip_wal.json')),
+            'sqlite': lambda: SQLiteStorage(os.path.join(self.tmp_dir, 'round_trip.db')),
+        }
+        place = Place(name="Loft", description="Nice", address="1 Main St", city_id="c1", latitude=1.5, longitude=2.5,
+                      host_id="h1", number_of_rooms=2, number_of_bathrooms=1, price_per_night=80.0, max_guests=3,
+                      amenity_ids=["a1"])
+        for name, create in backends.items():
+            with self.subTest(backend=name):
+                storage = create()
+                storage.save(place)
+                self.assertEqual(attributes(create().load(Place, place.id)), attributes(place))
+                if hasattr(storage, 'close'):
+                    storage.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import json
+from models import base_model
+from models.amenity import Amenity
+from models.city import City
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.user import User
+from persistence.file_storage import FileStorage
+from persistence.migrate_references import migrate
+
+
+class TestReferences(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'file_storage.json')
+        self.storage = FileStorage(self.path)
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def create_place(self, host, city, amenity_ids=None):
+        return Place(name="Loft", description="Nice", address="1 Main St", city_id=str(city.id),
+                     latitude=1.0, longitude=2.0, host_id=str(host.id), number_of_rooms=1,
+                     number_of_bathrooms=1, price_per_night=100, max_guests=2, amenity_ids=amenity_ids or [])
+
+    def test_parents_store_ids_only(self):
+        country = Country(name="United States", code="US")
+        city = City(name="Austin", country_code="US")
+        country.add_city(city)
+        host = User(email="host@example.com", first_name="Host", last_name="User")
+        guest = User(email="guest@example.com", first_name="Guest", last_name="User")
+        place = self.create_place(host, city)
+        host.add_place(place)
+        city.add_place(place)
+        place.add_amenity(Amenity(name="Pool"))
+        review = Review(place_id=str(place.id), user_id=str(guest.id), rating=5, comment="Great")
+        place.add_review(review)
+        guest.add_review(review)
+        place.add_review(review)
+
+        with open(self.path) as file:
+            data = json.load(file)
+        self.assertNotIn('object at 0x', json.dumps(data))
+        self.assertEqual(data['Place'][str(place.id)]['review_ids'], [str(review.id)])
+        self.assertEqual(data['User'][str(host.id)]['place_ids'], [str(place.id)])
+        self.assertEqual(data['Country'][str(country.id)]['city_ids'], [str(city.id)])
+
+        # Related objects are resolved through a fresh storage on access
+        base_model.data_manager.storage = FileStorage(self.path)
+        loaded = Place.load(place.id)
+        self.assertEqual([r.comment for r in loaded.reviews], ["Great"])
+        self.assertEqual([a.name for a in loaded.amenities], ["Pool"])
+        self.assertEqual([p.id for p in Amenity.find_one_by('name', "Pool").places], [place.id])
+        self.assertEqual([c.id for c in Country.load_by_code("US").cities], [city.id])
+        self.assertEqual(loaded.to_dict()['reviews'][0]['id'], str(review.id))
+
+    def test_missing_related_objects_are_skipped(self):
+        host = User(email="host@example.com", first_name="Host", last_name="User")
+        place = self.create_place(host, City(name="Austin", country_code="US"))
+        host.add_place(place)
+        Place.delete(str(place.id))
+        self.assertEqual(User.load(host.id).places, [])
+        self.assertEqual(User.load(host.id).place_ids, [str(place.id)])
+
+    def test_migration_rebuilds_relations(self):
+        host = User(email="host@example.com", first_name="Host", last_name="User")
+        city = City(name="Austin", country_code="US")
+        Country(name="United States", code="US")
+        amenity = Amenity(name="Pool")
+        place = self.create_place(host, city, amenity_ids=[str(amenity.id)])
+        review = Review(place_id=str(place.id), user_id=str(host.id), rating=5, comment="Great")
+        with open(self.path) as file:
+            data = json.load(file)
+        # Recreate the layout written by earlier versions, with embedded objects stored as their repr
+        embedded = repr(place)
+        for obj_data in data['User'].values():
+            obj_data.update(places=[embedded] * 50, reviews=[repr(review)] * 50)
+            del obj_data['place_ids'], obj_data['review_ids']
+        for obj_data in data['Place'].values():
+            obj_data.update(reviews=[repr(review)] * 50, amenities=[repr(amenity)] * 50)
+            del obj_data['review_ids']
+        for obj_data in data['City'].values():
+            obj_data['places'] = [embedded] * 50
+            del obj_data['place_ids']
+        legacy_path = os.path.join(self.tmp_dir, 'legacy.json')
+        with open(legacy_path, 'w') as file:
+            json.dump(data, file)
+
+        migrated_path = os.path.join(self.tmp_dir, 'migrated.json')
+        size_before, size_after = migrate(legacy_path, migrated_path)
+        self.assertLess(size_after, size_before / 5)
+        storage = FileStorage(migrated_path)
+        self.assertEqual(storage.load(User, host.id).place_ids, [str(place.id)])
+        self.assertEqual(storage.load(User, host.id).review_ids, [str(review.id)])
+        self.assertEqual(storage.load(Place, place.id).review_ids, [str(review.id)])
+        self.assertEqual(storage.load(City, city.id).place_ids, [str(place.id)])
+        self.assertEqual(storage.load(Amenity, amenity.id).place_ids, [str(place.id)])
+        self.assertEqual(storage.load(Country, Country.load_by_code("US").id).city_ids, [str(city.id)])
+        self.assertNotIn('places', storage.data['User'][str(host.id)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,14 +4,25 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 
 import unittest
+import tempfile
+import shutil
+from models import base_model
 from models.review import Review
 from models.user import User
 from models.place import Place
 from models.city import City
+from persistence.file_storage import FileStorage
 
 class TestReview(unittest.TestCase):
     def setUp(self):
         User.users = {}
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = FileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
 
     def test_create_review(self):
         user = User(email="test@example.com", password="password", first_name="Test", last_name="User")
@@ -0,0 +1,117 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+from unittest import mock
+from api import app
+from models import base_model
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+from models.user import User
+from models.serializer import load_batch, serialize, serializer
+from persistence.file_storage import FileStorage
+
+
+class TestSerializer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = FileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+        self.client = app.test_client()
+        self.host = User(email="host@example.com", first_name="Host", last_name="User")
+        self.place = Place(name="Loft", description="Nice", address="1 Main St", city_id="c1", latitude=1.0,
+                           longitude=2.0, host_id=str(self.host.id), number_of_rooms=1, number_of_bathrooms=1,
+                           price_per_night=80.0, max_guests=2, amenity_ids=[])
+        self.host.add_place(self.place)
+        self.review = Review(place_id=str(self.place.id), user_id="u1", rating=5, comment="Great")
+        self.place.add_review(self.review)
+        self.amenity = Amenity(name="Pool")
+        self.place.add_amenity(self.amenity)
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def test_fields_follow_the_schema(self):
+        data = serialize(self.review, ())
+        self.assertEqual(list(data), list(Review.__fields__))
+        self.assertEqual(data['id'], str(self.review.id))
+        self.assertEqual(data['created_at'], self.review.created_at.isoformat())
+        self.assertIs(serializer(Review), serializer(Review))
+
+    def test_relations_are_ids_unless_expanded(self):
+        data = serialize(self.place, ())
+        self.assertEqual(data['review_ids'], [str(self.review.id)])
+        self.assertNotIn('reviews', data)
+        data['review_ids'].append("x")
+        self.assertEqual(self.place.review_ids, [str(self.review.id)])
+        data = serialize(self.place, ('reviews',), 1)
+        self.assertEqual([review['comment'] for review in data['reviews']], ["Great"])
+        self.assertNotIn('amenities', data)
+
+    def test_depth_limits_expansion(self):
+        data = serialize(self.host, ('places', 'reviews'), 2)
+        self.assertEqual(data['places'][0]['reviews'][0]['id'], str(self.review.id))
+        data = serialize(self.host, ('places', 'reviews'), 1)
+        self.assertNotIn('reviews', data['places'][0])
+        self.assertEqual(data['places'][0]['review_ids'], [str(self.review.id)])
+
+    def test_only(self):
+        data = serialize(self.place, ('reviews',), 1, ['id', 'name'])
+        self.assertEqual(data, {'id': str(self.place.id), 'name': "Loft"})
+
+    def test_to_dict_expands_the_declared_relations(self):
+        data = self.host.to_dict()
+        place = data['places'][0]
+        self.assertEqual(place['reviews'][0]['comment'], "Great")
+        self.assertEqual(place['amenities'][0]['name'], "Pool")
+        self.assertEqual(place['amenities'][0]['place_ids'], [str(self.place.id)])
+        self.assertNotIn('places', place['amenities'][0])
+
+    def test_endpoint_representation(self):
+        body = self.client.get(f'/places/{self.place.id}').get_json()
+        self.assertEqual(body['review_ids'], [str(self.review.id)])
+        self.assertNotIn('reviews', body)
+        self.assertEqual(body['amenity_ids'], [str(self.amenity.id)])
+        body = self.client.get('/amenities/').get_json()
+        self.assertEqual(body[0]['place_ids'], [str(self.place.id)])
+        self.assertNotIn('places', body[0])
+
+    def test_expand(self):
+        body = self.client.get(f'/users/{self.host.id}?expand=places').get_json()
+        self.assertEqual(body['places'][0]['id'], str(self.place.id))
+        self.assertNotIn('reviews', body['places'][0])
+        body = self.client.get(f'/users/{self.host.id}?expand=places,reviews&depth=2').get_json()
+        self.assertEqual(body['places'][0]['reviews'][0]['comment'], "Great")
+        self.assertNotIn('amenities', body['places'][0])
+        body = self.client.get(f'/places/{self.place.id}?depth=1').get_json()
+        self.assertEqual([amenity['name'] for amenity in body['amenities']], ["Pool"])
+        self.assertNotIn('places', body['amenities'][0])
+        body = self.client.get('/places/?expand=reviews&fields=name,reviews').get_json()
+        self.assertEqual(set(body[0]), {'id', 'name', 'reviews'})
+        rows = self.client.get('/amenities/?stream=1&expand=places').data.splitlines()
+        self.assertIn(str(self.place.id), rows[0].decode())
+        for url in ['/places/?expand=cities', f'/reviews/{self.review.id}?expand=places', '/users/?depth=4',
+                    '/users/?depth=deep', '/places/?expand=places&depth=1']:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 400)
+
+    def test_relations_are_loaded_in_batches(self):
+        for i in range(4):
+            user = User(email=f"guest{i}@example.com", first_name="Guest", last_name="User")
+            user.add_place(self.place)
+            user.add_review(self.review)
+        with mock.patch('models.serializer.load_batch', wraps=load_batch) as batches:
+            body = self.client.get('/users/?expand=places,reviews&depth=2').get_json()
+        self.assertEqual(len(body), 5)
+        # Places and reviews of the users, then reviews of the places
+        self.assertEqual(batches.call_count, 3)
+        self.assertEqual(sorted(len(call.args[1]) for call in batches.call_args_list), [1, 4, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
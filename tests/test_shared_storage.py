@@ -0,0 +1,226 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import multiprocessing
+import threading
+from unittest import mock
+from models import base_model
+from models.amenity import Amenity
+from models.review import Review
+from models.user import User
+from persistence.indexes import UniqueConstraintError
+from persistence.records import attributes, hydrate
+from persistence.shared_storage import SharedFileStorage
+from persistence.sqlite_storage import SQLiteStorage
+
+WORKERS = 4
+WRITES_PER_WORKER = 50
+
+
+def write_reviews(file_path, worker):
+    """
+    Write reviews from a worker process sharing the storage, compacting the log along the way,
+    and race the other workers for a unique amenity name.
+    """
+    storage = SharedFileStorage(file_path, compact_threshold=30, fsync=False)
+    base_model.data_manager.storage = storage
+    for i in range(WRITES_PER_WORKER):
+        review = Review(place_id=f"worker-{worker}", user_id="u", rating=1 + i % 5, comment=f"Review {i}")
+        if i % 10 == 0:
+            review.update_details(comment=f"Updated {i}")
+    try:
+        Amenity(name="Pool")
+    except UniqueConstraintError:
+        pass
+    storage.close()
+
+
+class TestSharedFileStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'file_storage.json')
+        self.storage = SharedFileStorage(self.file_path, fsync=False)
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_concurrent_writers_lose_nothing(self):
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=write_reviews, args=(self.file_path, worker)) for worker in range(WORKERS)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(60)
+            self.assertEqual(worker.exitcode, 0)
+        for storage in (self.storage, SharedFileStorage(self.file_path, fsync=False)):
+            reviews = storage.load_all(Review)
+            self.assertEqual(len(reviews), WORKERS * WRITES_PER_WORKER)
+            self.assertEqual(len({review.id for review in reviews}), WORKERS * WRITES_PER_WORKER)
+            self.assertEqual(sum(review.comment.startswith("Updated") for review in reviews), WORKERS * 5)
+            self.assertEqual(len(storage.find_by(Amenity, 'name', "Pool")), 1)
+            self.assertEqual(storage.check_indexes(Amenity), [])
+
+    def test_other_process_writes_are_seen(self):
+        other = SharedFileStorage(self.file_path, fsync=False)
+        try:
+            review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+            loaded = Review.load(review.id)
+            version = base_model.data_manager.collection_version(Review)
+            changed = other.load(Review, review.id)
+            changed.comment = "Changed elsewhere"
+            other.save(changed)
+            self.assertNotEqual(base_model.data_manager.collection_version(Review), version)
+            reloaded = Review.load(review.id)
+            self.assertIsNot(reloaded, loaded)
+            self.assertEqual(reloaded.comment, "Changed elsewhere")
+            other.delete(changed)
+            self.assertIsNone(Review.load(review.id))
+        finally:
+            other.close()
+
+    def test_unique_index_across_processes(self):
+        other = SharedFileStorage(self.file_path, fsync=False)
+        try:
+            Amenity(name="Pool")
+            amenity = hydrate(Amenity, dict(attributes(Amenity.load_all()[0]), id="6c4ee7a2-2a5e-4d5c-9a39-0b9d5c0b8a11"))
+            with self.assertRaises(UniqueConstraintError):
+                other.save(amenity)
+        finally:
+            other.close()
+
+    def test_compaction_by_another_process(self):
+        other = SharedFileStorage(self.file_path, fsync=False)
+        try:
+            reviews = [Review(place_id="p", user_id="u", rating=5, comment="Great") for _ in range(3)]
+            Review.load(reviews[0].id)
+            other.delete(other.load(Review, reviews[1].id))
+            other.compact()
+            self.assertEqual(os.path.getsize(self.storage.log_path), 0)
+            self.assertEqual(sorted(r.id for r in Review.load_all()), sorted([reviews[0].id, reviews[2].id]))
+            Review(place_id="p", user_id="u", rating=4, comment="After")
+            self.assertEqual(len(other.load_all(Review)), 3)
+        finally:
+            other.close()
+
+    def test_writes_continue_during_compaction(self):
+        other = SharedFileStorage(self.file_path, fsync=False)
+        fresh = None
+        try:
+            reviews = [Review(place_id="p", user_id="u", rating=5, comment="Great") for _ in range(3)]
+            writing, release, written = threading.Event(), threading.Event(), threading.Event()
+            write_data = self.storage._write_data
+
+            def slow_write(file, data):
+                writing.set()
+                release.wait(5)
+                write_data(file, data)
+                written.set()
+
+            with mock.patch.object(self.storage, '_write_data', side_effect=slow_write):
+                compaction = threading.Thread(target=self.storage.compact)
+                compaction.start()
+                self.assertTrue(writing.wait(5))
+                # Both processes write and read while the snapshot is being written
+                reviews.append(Review(place_id="p", user_id="u", rating=4, comment="During"))
+                other.delete(other.load(Review, reviews[0].id))
+                self.assertEqual(len(other.load_all(Review)), 3)
+                fresh = SharedFileStorage(self.file_path, fsync=False)
+                self.assertEqual(len(fresh.load_all(Review)), 3)
+                self.assertFalse(written.is_set())
+                release.set()
+                compaction.join()
+            self.assertFalse(os.path.exists(self.storage.rotated_log_path))
+            expected = sorted(review.id for review in reviews[1:])
+            for storage in (self.storage, other, fresh, SharedFileStorage(self.file_path, fsync=False)):
+                self.assertEqual(sorted(review.id for review in storage.load_all(Review)), expected)
+        finally:
+            other.close()
+            if fresh:
+                fresh.close()
+
+    def test_interrupted_compaction_is_finished(self):
+        reviews = [Review(place_id="p", user_id="u", rating=5, comment="Great") for _ in range(2)]
+        # The process of a compaction died after rotating the log
+        os.replace(self.storage.log_path, self.storage.rotated_log_path)
+        open(self.storage.log_path, 'w').close()
+        reviews.append(Review(place_id="p", user_id="u", rating=4, comment="After"))
+        self.assertEqual(len(self.storage.load_all(Review)), 3)
+        self.storage.compact()
+        self.assertFalse(os.path.exists(self.storage.rotated_log_path))
+        other = SharedFileStorage(self.file_path, fsync=False)
+        try:
+            self.assertEqual(sorted(r.id for r in other.load_all(Review)), sorted(r.id for r in reviews))
+        finally:
+            other.close()
+
+    def test_torn_record_is_ignored(self):
+        Review(place_id="p", user_id="u", rating=5, comment="Great")
+        with open(self.storage.log_path, 'a') as log:
+            log.write('{"op": "save", "class": "Review"')
+        other = SharedFileStorage(self.file_path, fsync=False)
+        try:
+            self.assertEqual(len(other.load_all(Review)), 1)
+            Review(place_id="p", user_id="u", rating=4, comment="Next")
+            self.assertEqual(len(other.load_all(Review)), 2)
+        finally:
+            other.close()
+
+
+class TestSQLiteChanges(unittest.TestCase):
+    def test_other_connection_writes_are_seen(self):
+        tmp_dir = tempfile.mkdtemp()
+        db_path = os.path.join(tmp_dir, 'hbnb.sqlite3')
+        storage, other = SQLiteStorage(db_path), SQLiteStorage(db_path)
+        previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = storage
+        try:
+            review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+            loaded = Review.load(review.id)
+            self.assertIs(Review.load(review.id), loaded)
+            changed = other.load(Review, review.id)
+            changed.comment = "Changed elsewhere"
+            other.save(changed)
+            self.assertEqual(Review.load(review.id).comment, "Changed elsewhere")
+        finally:
+            base_model.data_manager.storage = previous_storage
+            storage.close()
+            other.close()
+            shutil.rmtree(tmp_dir)
+
+    def test_only_changed_objects_are_dropped(self):
+        tmp_dir = tempfile.mkdtemp()
+        db_path = os.path.join(tmp_dir, 'hbnb.sqlite3')
+        storage, other = SQLiteStorage(db_path), SQLiteStorage(db_path)
+        previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = storage
+        try:
+            changed, kept = [Review(place_id="p", user_id="u", rating=5, comment="Great") for _ in range(2)]
+            loaded = Review.load(kept.id)
+            user_version = base_model.data_manager.collection_version(User)
+            other.delete(other.load(Review, changed.id))
+            self.assertIsNone(Review.load(changed.id))
+            self.assertIs(Review.load(kept.id), loaded)
+            self.assertEqual(base_model.data_manager.collection_version(User), user_version)
+            with mock.patch('persistence.sqlite_storage.CHANGES_KEPT', 1):
+                for comment in ("First", "Second"):
+                    other.save(hydrate(Review, dict(attributes(loaded), comment=comment)))
+            # The first change was dropped before it was read
+            self.assertEqual(Review.load(kept.id).comment, "Second")
+            self.assertNotEqual(base_model.data_manager.collection_version(User), user_version)
+        finally:
+            base_model.data_manager.storage = previous_storage
+            storage.close()
+            other.close()
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import uuid
+from datetime import datetime
+from models import base_model
+from models.place import Place
+from models.review import Review
+from persistence.codecs import codec
+from persistence.file_storage import FileStorage
+from persistence.snapshot import MAGIC, SnapshotReader, is_snapshot, read_snapshot, to_binary, to_json, write_snapshot
+from persistence.wal_storage import WALFileStorage
+
+
+class TestSnapshotFormat(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'file_storage.hbnb')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, data):
+        with open(self.path, 'wb') as file:
+            write_snapshot(file, data)
+
+    def test_round_trip(self):
+        review_id = uuid.uuid4()
+        data = {
+            'Review': {
+                str(review_id): {'id': review_id, 'created_at': datetime(2024, 1, 2, 3, 4, 5, 6), 'rating': 5,
+                                 'comment': "Très bien", 'tags': ["a", "b"], 'score': None},
+                'legacy-key': {'id': "other-id", 'rating': 5, 'comment': "No tags"},
+            },
+            'Place': {str(uuid.uuid4()): {'name': f"Place {i}", 'price': 10.5 * (i % 3)} for i in range(50)},
+            'City': {},
+        }
+        self.write(data)
+        self.assertTrue(is_snapshot(self.path))
+        loaded = read_snapshot(self.path)
+        self.assertEqual(loaded, codec.loads(codec.dumps(data)))
+        self.assertNotIn('tags', loaded['Review']['legacy-key'])
+        self.assertEqual(list(loaded['Place']), list(data['Place']))
+
+    def test_classes_are_read_separately(self):
+        self.write({'Review': {"r1": {'id': "r1", 'rating': 5}}, 'Place': {"p1": {'id': "p1", 'name': "Loft"}}})
+        self.assertEqual(read_snapshot(self.path, ['Place']), {'Place': {"p1": {'id': "p1", 'name': "Loft"}}})
+        with SnapshotReader(self.path) as reader:
+            self.assertEqual(reader.classes(), ['Review', 'Place'])
+            self.assertEqual(reader.read_class('Country'), {})
+
+    def test_json_is_not_a_snapshot(self):
+        json_path = os.path.join(self.tmp_dir, 'file_storage.json')
+        with open(json_path, 'wb') as file:
+            file.write(codec.dumps({'Review': {}}))
+        self.assertFalse(is_snapshot(json_path))
+        self.assertFalse(is_snapshot(os.path.join(self.tmp_dir, 'missing')))
+        with self.assertRaises(ValueError):
+            SnapshotReader(json_path)
+
+    def test_converter(self):
+        json_path = os.path.join(self.tmp_dir, 'file_storage.json')
+        data = {'Review': {str(uuid.uuid4()): {'rating': i % 5, 'comment': "Same comment"} for i in range(100)}}
+        with open(json_path, 'wb') as file:
+            file.write(codec.dumps(data))
+        to_binary(json_path, self.path)
+        self.assertLess(os.path.getsize(self.path), os.path.getsize(json_path))
+        back_path = os.path.join(self.tmp_dir, 'back.json')
+        to_json(self.path, back_path)
+        with open(back_path, 'rb') as file:
+            self.assertEqual(codec.loads(file.read()), data)
+
+
+class TestBinaryFileStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'file_storage.json')
+        self.previous_storage = base_model.data_manager.storage
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def test_switching_an_existing_file_to_binary(self):
+        base_model.data_manager.storage = FileStorage(self.file_path)
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        self.assertFalse(is_snapshot(self.file_path))
+        storage = FileStorage(self.file_path, snapshot_format='binary')
+        base_model.data_manager.storage = storage
+        other = Review(place_id="p", user_id="u", rating=4, comment="Good")
+        with open(self.file_path, 'rb') as file:
+            self.assertEqual(file.read(len(MAGIC)), MAGIC)
+        reopened = FileStorage(self.file_path)
+        self.assertEqual(reopened.load(Review, review.id).created_at, review.created_at)
+        self.assertEqual(reopened.load(Review, other.id).comment, "Good")
+        self.assertEqual(reopened.load_all(Place), [])
+
+    def test_wal_compacts_to_binary(self):
+        storage = WALFileStorage(self.file_path, fsync=False, snapshot_format='binary')
+        base_model.data_manager.storage = storage
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        storage.compact()
+        storage.close()
+        self.assertTrue(is_snapshot(self.file_path))
+        reopened = WALFileStorage(self.file_path, fsync=False)
+        self.assertEqual(reopened.load(Review, review.id).rating, 5)
+        reopened.close()
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            FileStorage(self.file_path, snapshot_format='xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from unittest import mock
+from models import base_model
+from models.country import Country
+from models.place import Place
+from models.review import Review
+from models.user import User
+from persistence.config import create_storage
+from persistence.file_storage import FileStorage
+from persistence.indexes import UniqueConstraintError
+from persistence.migrate_to_sqlite import migrate
+from persistence.query import Condition
+from persistence.records import hydrate
+from persistence.snapshot import to_binary
+from persistence.sqlite_storage import SQLiteStorage
+from persistence.wal_storage import WALFileStorage
+
+
+class TestSQLiteStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmp_dir, 'hbnb.sqlite3')
+        self.storage = SQLiteStorage(self.db_path)
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_save_and_load(self):
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        loaded = self.storage.load(Review, review.id)
+        self.assertEqual(loaded.id, review.id)
+        self.assertEqual(loaded.created_at, review.created_at)
+        self.assertEqual(loaded.comment, "Great")
+
+    def test_load_all_keeps_insertion_order(self):
+        reviews = [Review(place_id="p", user_id="u", rating=i, comment="c") for i in range(1, 4)]
+        reviews[0].update_details(comment="updated")
+        self.assertEqual([r.id for r in self.storage.load_all(Review)], [r.id for r in reviews])
+
+    def test_delete(self):
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        Review.delete(str(review.id))
+        self.assertIsNone(self.storage.load(Review, review.id))
+
+    def test_schema(self):
+        for cls in (User, Place, Review, Country):
+            self.storage.load_all(cls)
+        conn = self.storage._connection()
+        self.assertEqual(conn.execute('PRAGMA journal_mode').fetchone()[0], 'wal')
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        for name in ('idx_User_email', 'idx_Place_host_id', 'idx_Place_city_id',
+                     'idx_Review_place_id', 'idx_Review_user_id', 'idx_Country_code'):
+            self.assertIn(name, indexes)
+
+    def test_range_conditions_match_file_storage(self):
+        def review(rating):
+            return hydrate(Review, {'id': str(uuid.uuid4()), 'created_at': datetime.now(), 'updated_at': datetime.now(),
+                                    'place_id': "p", 'user_id': "u", 'rating': rating, 'comment': "c"})
+
+        reviews = [review(rating) for rating in (2, 4.5, "5", " 3 ", "ten", None, True)]
+        file_storage = FileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+        for storage in (self.storage, file_storage):
+            storage.save_many(reviews)
+        for conditions in ([Condition('rating', 'gte', 3)], [Condition('rating', 'lte', 3)],
+                           [Condition('rating', 'gte', 1), Condition('rating', 'lte', 4.5)]):
+            with self.subTest(conditions=[(c.op, c.value) for c in conditions]):
+                expected = sorted(str(r.id) for r in file_storage.query(Review, conditions))
+                self.assertEqual(sorted(str(r.id) for r in self.storage.query(Review, conditions)), expected)
+
+    def test_delete_many_is_one_transaction(self):
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        user = User(email="kept@example.com", first_name="Kept", last_name="User")
+        conn = self.storage._connection()
+        with conn:
+            conn.execute('CREATE TRIGGER keep_users BEFORE DELETE ON "User" BEGIN SELECT RAISE(ABORT, \'kept\'); END')
+        # A storage that has not seen the tables yet
+        storage = SQLiteStorage(self.db_path)
+        try:
+            with self.assertRaises(sqlite3.IntegrityError):
+                storage.delete_many([review, user])
+        finally:
+            storage.close()
+        self.assertIsNotNone(self.storage.load(Review, review.id))
+
+    def test_connection_per_thread(self):
+        connections = []
+        thread = threading.Thread(target=lambda: connections.append(self.storage._connection()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(connections[0], self.storage._connection())
+
+    def test_migrate_from_json(self):
+        json_path = os.path.join(os.path.dirname(__file__), 'file_storage.json')
+        counts = migrate(json_path, self.db_path)
+        self.assertEqual(counts['User'], 3)
+        users = self.storage.load_all(User)
+        self.assertEqual(len(users), 3)
+        self.assertEqual(users[0].email, "test@example.com")
+
+    def test_migrate_from_binary_snapshot(self):
+        snapshot_path = os.path.join(self.tmp_dir, 'file_storage.hbnb')
+        to_binary(os.path.join(os.path.dirname(__file__), 'file_storage.json'), snapshot_path)
+        self.assertEqual(migrate(snapshot_path, self.db_path)['User'], 3)
+        self.assertEqual(self.storage.load_all(User)[0].email, "test@example.com")
+
+    def test_paging_after_migration(self):
+        json_path = os.path.join(self.tmp_dir, 'file_storage.json')
+        base_model.data_manager.storage = FileStorage(json_path)
+        users = [User(email=f"migrated{i}@example.com", first_name="Old", last_name="User") for i in range(3)]
+        migrate(json_path, self.db_path)
+        base_model.data_manager.storage = self.storage
+        users += [User(email=f"new{i}@example.com", first_name="New", last_name="User") for i in range(3)]
+        expected = [str(user.id) for user in sorted(users, key=lambda user: (user.created_at, str(user.id)))]
+        paged = []
+        after = None
+        while len(paged) <= len(users):
+            page = self.storage.query(User, after=after, limit=2)
+            if not page:
+                break
+            paged += [str(user.id) for user in page]
+            after = (page[-1].created_at, str(page[-1].id))
+        self.assertEqual(paged, expected)
+
+    def test_legacy_created_at_is_normalized(self):
+        reviews = [Review(place_id="p", user_id="u", rating=i, comment="c") for i in range(1, 4)]
+        conn = self.storage._connection()
+        with conn:
+            conn.execute('UPDATE "Review" SET created_at = replace(created_at, \'T\', \' \') WHERE id = ?',
+                         (str(reviews[0].id),))
+        storage = SQLiteStorage(self.db_path)
+        try:
+            page = storage.query(Review, after=(reviews[0].created_at, str(reviews[0].id)), limit=10)
+            self.assertEqual([review.id for review in page], [review.id for review in reviews[1:]])
+            stored = {row[0] for row in storage._connection().execute('SELECT created_at FROM "Review"')}
+            self.assertEqual(stored, {review.created_at.isoformat() for review in reviews})
+        finally:
+            storage.close()
+
+    def test_unique_check_and_write_are_atomic(self):
+        def user(first_name):
+            return hydrate(User, {'id': str(uuid.uuid4()), 'created_at': datetime.now(), 'updated_at': datetime.now(),
+                                  'email': "same@example.com", 'first_name': first_name, 'last_name': "User"})
+
+        other = SQLiteStorage(self.db_path)
+        other.load_all(User)
+        errors = []
+
+        def save_other():
+            try:
+                other.save(user("Other"))
+            except UniqueConstraintError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=save_other)
+        check_unique = self.storage._check_unique
+
+        def check_then_race(conn, cls, records):
+            check_unique(conn, cls, records)
+            # The other worker checks the same email between this check and this write
+            thread.start()
+            thread.join(0.2)
+
+        try:
+            with mock.patch.object(self.storage, '_check_unique', side_effect=check_then_race):
+                self.storage.save(user("First"))
+            thread.join()
+        finally:
+            other.close()
+        self.assertEqual(len(errors), 1)
+        self.assertEqual([u.first_name for u in self.storage.find_by(User, 'email', "same@example.com")], ["First"])
+
+    def test_storage_selected_from_environment(self):
+        with mock.patch.dict(os.environ, {'HBNB_STORAGE': 'sqlite', 'HBNB_STORAGE_PATH': self.db_path}):
+            storage = create_storage()
+            self.assertIsInstance(storage, SQLiteStorage)
+            storage.close()
+        wal_path = os.path.join(self.tmp_dir, 'file_storage.json')
+        with mock.patch.dict(os.environ, {'HBNB_STORAGE': 'wal', 'HBNB_STORAGE_PATH': wal_path}):
+            storage = create_storage()
+            self.assertIsInstance(storage, WALFileStorage)
+            storage.close()
+        with mock.patch.dict(os.environ, {'HBNB_STORAGE': 'unknown'}):
+            with self.assertRaises(ValueError):
+                create_storage()
+
+
+if __name__ == '__main__':
+    unittest.main()
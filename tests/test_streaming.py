@@ -0,0 +1,82 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import json
+from api import app
+from models import base_model
+from models.place import Place
+from models.review import Review
+from models.user import User
+from persistence.file_storage import FileStorage
+from persistence.sqlite_storage import SQLiteStorage
+
+
+class TestStreaming(unittest.TestCase):
+    storage_class = FileStorage
+    file_name = 'file_storage.json'
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.storage = self.storage_class(os.path.join(self.tmp_dir, self.file_name))
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+        self.client = app.test_client()
+        with base_model.data_manager.unit_of_work():
+            self.user = User(email="guest@example.com", first_name="Guest", last_name="User")
+            self.place = Place(name="Loft", description="Nice", address="1 Main St", city_id="c1", latitude=1.0,
+                               longitude=2.0, host_id="h1", number_of_rooms=1, number_of_bathrooms=1,
+                               price_per_night=100.0, max_guests=2, amenity_ids=[])
+            self.reviews = [Review(place_id=str(self.place.id) if i % 3 else "other", user_id=str(self.user.id),
+                                   rating=i % 5 + 1, comment=f"Review {i}") for i in range(250)]
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        if hasattr(self.storage, 'close'):
+            self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def read_rows(self, response):
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def test_stream_parameter_returns_every_object(self):
+        response = self.client.get(f'/users/{self.user.id}/reviews?stream=1&limit=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        rows = self.read_rows(response)
+        self.assertEqual([row['comment'] for row in rows], [review.comment for review in self.reviews])
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+    def test_accept_header_with_filters_and_fields(self):
+        response = self.client.get(f'/places/{self.place.id}/reviews?fields=rating&max_rating=2',
+                                   headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        rows = self.read_rows(response)
+        expected = [r for r in self.reviews if r.place_id == str(self.place.id) and r.rating <= 2]
+        self.assertEqual([row['id'] for row in rows], [str(r.id) for r in expected])
+        self.assertEqual(set(rows[0]), {'id', 'rating'})
+
+    def test_rows_are_produced_lazily(self):
+        response = self.client.get(f'/users/{self.user.id}/reviews?stream=1', buffered=False)
+        chunks = iter(response.response)
+        first = next(chunks)
+        self.assertEqual(len(first.splitlines()), 1)
+        self.assertEqual(len(next(chunks).splitlines()), 100)
+        response.close()
+
+    def test_clients_accepting_anything_get_pages(self):
+        response = self.client.get('/amenities/', headers={'Accept': '*/*'})
+        self.assertEqual(response.mimetype, 'application/json')
+        self.assertEqual(response.get_json(), [])
+
+
+class TestSQLiteStreaming(TestStreaming):
+    storage_class = SQLiteStorage
+    file_name = 'hbnb.sqlite3'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+from unittest import mock
+from api import app
+from models import base_model
+from models.amenity import Amenity
+from models.place import Place
+from models.review import Review
+from models.user import User
+from persistence.file_storage import FileStorage
+
+
+class CountingFileStorage(FileStorage):
+    def __init__(self, file_path):
+        self.writes = 0
+        super().__init__(file_path)
+
+    def _save_file(self):
+        self.writes += 1
+        super()._save_file()
+
+
+class TestUnitOfWork(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.storage = CountingFileStorage(os.path.join(self.tmp_dir, 'file_storage.json'))
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        shutil.rmtree(self.tmp_dir)
+
+    def test_constructor_flushes_once(self):
+        Review(place_id="p", user_id="u", rating=5, comment="Great")
+        self.assertEqual(self.storage.writes, 1)
+
+    def test_nested_units_flush_once(self):
+        with base_model.data_manager.unit_of_work() as uow:
+            user = User(email="guest@example.com", first_name="Guest", last_name="User")
+            review = Review(place_id="p", user_id=str(user.id), rating=5, comment="Great")
+            user.add_review(review)
+            self.assertEqual(self.storage.writes, 0)
+        self.assertEqual(self.storage.writes, 1)
+        self.assertEqual(uow.flushes, 1)
+        self.assertEqual(self.storage.load(Review, review.id).comment, "Great")
+
+    def test_pending_objects_are_visible(self):
+        with base_model.data_manager.unit_of_work():
+            review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+            self.assertIs(Review.load(str(review.id)), review)
+            self.assertIn(review, Review.load_all())
+            Review.delete(str(review.id))
+            self.assertIsNone(Review.load(str(review.id)))
+            self.assertNotIn(review, Review.load_all())
+
+    def test_restore_to_savepoint(self):
+        kept = Review(place_id="p", user_id="u", rating=5, comment="Kept")
+        with base_model.data_manager.unit_of_work() as uow:
+            first = Review(place_id="p", user_id="u", rating=4, comment="First")
+            savepoint = uow.savepoint()
+            Review(place_id="p", user_id="u", rating=3, comment="Dropped")
+            Review.delete(str(kept.id))
+            first.comment = "Changed"
+            first.save()
+            uow.restore(savepoint)
+            self.assertEqual(list(uow.dirty.values()), [first])
+            self.assertEqual(uow.deleted, {})
+        self.assertEqual(sorted(review.comment for review in self.storage.load_all(Review)), ["Changed", "Kept"])
+
+    def test_rollback_on_error(self):
+        with self.assertRaises(ValueError):
+            with base_model.data_manager.unit_of_work():
+                Review(place_id="p", user_id="u", rating=5, comment="Great")
+                raise ValueError("abort")
+        self.assertEqual(self.storage.writes, 0)
+        self.assertEqual(Review.load_all(), [])
+
+    def test_request_flush_counter(self):
+        client = app.test_client()
+        host = User(email="host@example.com", first_name="Host", last_name="User")
+        guest = User(email="guest@example.com", first_name="Guest", last_name="User")
+        place = Place(name="Loft", description="Nice", address="1 Main St", city_id="c", latitude=1.0, longitude=2.0,
+                      host_id=str(host.id), number_of_rooms=1, number_of_bathrooms=1, price_per_night=10.0,
+                      max_guests=2, amenity_ids=[])
+        self.storage.writes = 0
+        response = client.post(f'/places/{place.id}/reviews', json={
+            'place_id': str(place.id), 'user_id': str(guest.id), 'rating': 5, 'comment': 'Great'
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.headers['X-Storage-Flushes'], '1')
+        self.assertEqual(self.storage.writes, 1)
+        response = client.get(f'/places/{place.id}/reviews')
+        self.assertEqual(response.headers['X-Storage-Flushes'], '0')
+
+    def test_unique_conflict_found_at_commit(self):
+        client = app.test_client()
+        User(email="taken@example.com", first_name="First", last_name="User")
+        Amenity(name="Pool")
+        # A concurrent request claimed the value after the route checked it
+        with mock.patch.object(User, 'unique_email', return_value=True):
+            response = client.post('/users/', json={'email': "taken@example.com", 'first_name': "Second",
+                                                    'last_name': "User"})
+        self.assertEqual((response.status_code, response.get_json()), (400, {'message': "Email address is already in use"}))
+        with mock.patch.object(Amenity, 'find_one_by', return_value=None):
+            response = client.post('/amenities/', json={'name': "Pool"})
+        self.assertEqual((response.status_code, response.get_json()), (409, {'message': "Amenity name already exists"}))
+        self.assertEqual(len(User.load_all()), 1)
+        self.assertEqual(len(Amenity.load_all()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
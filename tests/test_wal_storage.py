@@ -0,0 +1,143 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import unittest
+import tempfile
+import shutil
+import json
+import time
+from unittest import mock
+from models import base_model
+from models.review import Review
+from persistence.config import flush_options
+from persistence.wal_storage import WALFileStorage
+
+
+class TestWALFileStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'file_storage.json')
+        self.storage = WALFileStorage(self.file_path, fsync=False)
+        self.previous_storage = base_model.data_manager.storage
+        base_model.data_manager.storage = self.storage
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def reopen(self):
+        self.storage.close()
+        self.storage = WALFileStorage(self.file_path, fsync=False)
+        base_model.data_manager.storage = self.storage
+        return self.storage
+
+    def test_save_appends_without_snapshot(self):
+        Review(place_id="p", user_id="u", rating=5, comment="Great")
+        self.assertFalse(os.path.exists(self.file_path))
+        self.assertGreater(self.storage.log_records, 0)
+
+    def test_replay_on_startup(self):
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        review.update_details(rating=3)
+        loaded = self.reopen().load(Review, review.id)
+        self.assertEqual(loaded.rating, 3)
+        self.assertEqual(loaded.id, review.id)
+
+    def test_replay_delete(self):
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        Review.delete(str(review.id))
+        self.assertIsNone(self.reopen().load(Review, review.id))
+
+    def test_compaction_writes_snapshot(self):
+        reviews = [Review(place_id="p", user_id="u", rating=i, comment="c") for i in range(1, 4)]
+        self.storage.compact()
+        self.assertTrue(os.path.exists(self.file_path))
+        self.assertEqual(os.path.getsize(self.storage.log_path), 0)
+        storage = self.reopen()
+        self.assertEqual(len(storage.load_all(Review)), 3)
+        self.assertEqual(storage.load(Review, reviews[1].id).rating, 2)
+
+    def test_background_compaction(self):
+        self.storage.compact_threshold = 5
+        for i in range(10):
+            Review(place_id="p", user_id="u", rating=1, comment=str(i))
+        self.storage.close()
+        self.assertTrue(os.path.exists(self.file_path))
+        self.assertEqual(len(self.reopen().load_all(Review)), 10)
+
+    def test_torn_record_is_ignored(self):
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        self.storage.close()
+        with open(self.storage.log_path, 'a') as log:
+            log.write('{"op": "save", "class": "Rev')
+        storage = self.reopen()
+        self.assertIsNotNone(storage.load(Review, review.id))
+        other = Review(place_id="p", user_id="u", rating=4, comment="Good")
+        self.assertIsNotNone(self.reopen().load(Review, other.id))
+
+
+class TestWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'file_storage.json')
+        self.previous_storage = base_model.data_manager.storage
+
+    def tearDown(self):
+        base_model.data_manager.storage = self.previous_storage
+        self.storage.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def open(self, **options):
+        self.storage = WALFileStorage(self.file_path, fsync=False, **options)
+        base_model.data_manager.storage = self.storage
+        return self.storage
+
+    def wait_for_flush(self):
+        deadline = time.monotonic() + 5
+        while self.storage.flushes == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreater(self.storage.flushes, 0)
+
+    def snapshot_reviews(self):
+        with open(self.file_path) as file:
+            return json.load(file)['Review']
+
+    def test_interval_flush(self):
+        self.open(flush_interval=0.05)
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        self.wait_for_flush()
+        self.assertIn(str(review.id), self.snapshot_reviews())
+        self.assertEqual(self.storage.flush_stats()['lag_seconds'], 0.0)
+
+    def test_threshold_wakes_the_flusher(self):
+        self.open(flush_interval=60, compact_threshold=5)
+        for i in range(5):
+            Review(place_id="p", user_id="u", rating=5, comment=str(i))
+        self.wait_for_flush()
+        self.assertEqual(len(self.snapshot_reviews()), 5)
+
+    def test_lag_and_shutdown_flush(self):
+        self.open(flush_interval=60)
+        review = Review(place_id="p", user_id="u", rating=5, comment="Great")
+        time.sleep(0.02)
+        stats = self.storage.flush_stats()
+        self.assertGreater(stats['pending_records'], 0)
+        self.assertGreaterEqual(stats['lag_seconds'], 0.02)
+        self.assertFalse(os.path.exists(self.file_path))
+        self.storage.close()
+        self.assertIn(str(review.id), self.snapshot_reviews())
+        self.assertEqual(os.path.getsize(self.storage.log_path), 0)
+
+    def test_options_from_environment(self):
+        self.open()
+        with mock.patch.dict(os.environ, {'HBNB_FLUSH_INTERVAL': '0.5', 'HBNB_FLUSH_THRESHOLD': '100'}):
+            self.assertEqual(flush_options(), {'compact_threshold': 100, 'flush_interval': 0.5})
+        with mock.patch.dict(os.environ, {'HBNB_FLUSH_INTERVAL': 'soon'}):
+            with self.assertRaises(ValueError):
+                flush_options()
+
+
+if __name__ == '__main__':
+    unittest.main()